@@ -0,0 +1,773 @@
+"""
+Local LLM generation daemon: one resident mlx_lm model behind a Unix socket, with prompt-prefix KV caching.
+
+The DeepSeek notebooks called mlx_lm.load() and generate() inline, so every kernel restart reloaded
+tens of GB of weights and every prompt prefilled the same chat template and system preamble again.
+Start this daemon once and the notebooks send their prompts here. The model stays loaded, tokens are
+streamed back as they are decoded, and the KV state of recent prompts is kept in an LRU cache. A new
+prompt that shares a prefix with one of them (the same system preamble, an earlier turn of the same
+chat) only prefills the tokens after the shared part.
+
+Example Usages:
+
+1. Start the daemon (keeps the model loaded until stopped):
+   python A_mlxLMDaemon.py serve --model mlx-community/DeepSeek-R1-Distill-Qwen-14B
+
+2. Generate through the daemon, printing tokens as they arrive:
+   python A_mlxLMDaemon.py generate "hello" --system "You are a concise assistant." --max-tokens 128
+
+3. Show what the daemon is doing (including prefix cache hits):
+   python A_mlxLMDaemon.py status
+
+4. Compare prefill with and without the prefix cache on prompts sharing a long system preamble,
+   with the tiny CPU backend:
+   python A_mlxLMDaemon.py benchmark --backend tiny --requests 6 --preamble-chars 3000
+
+From Python (the notebooks do this):
+   from A_mlxLMDaemon import generate
+   result = generate(messages=[{"role": "user", "content": "hello"}], model_id=MODEL_ID,
+                     on_token=lambda text: print(text, end="", flush=True))
+   print(result["prefill_tps"], result["decode_tps"])
+
+Notes:
+- Backends: mlx_lm (the real model) and tiny, a small numpy transformer with random weights and a byte
+  tokenizer. tiny needs no model download, but its prefill and decode do real attention work over a
+  real KV cache, so caching and throughput behave as they do with the real model.
+- Prefix cache size is limited both by entry count (--cache-entries) and by cached positions
+  (--cache-tokens). For Qwen-14B one position is about 0.2 MB of fp16 KV state (48 layers x 8 KV heads
+  x 128 dims x keys and values), so the default 16384 positions use about 3 GB. --cache-entries 0
+  turns the cache off.
+- Lower --priority values are served first. There is one model, so requests run one at a time.
+- If no daemon is listening, or it holds a different model or backend than generate() asked for, it
+  falls back to an in-process backend (loaded once per process, with its own prefix cache).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import codecs
+import socket
+import argparse
+import tempfile
+import threading
+import itertools
+import socketserver
+from collections import OrderedDict
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "LLM_DAEMON_SOCKET", os.path.join(tempfile.gettempdir(), "llm_daemon.sock")
+)
+DEFAULT_MODEL_ID = "mlx-community/DeepSeek-R1-Distill-Qwen-14B"
+DEFAULT_PRIORITY = 10
+DEFAULT_MAX_TOKENS = 256  # mlx_lm.generate()'s default
+
+PREFIX_CACHE_ENTRIES = 8
+PREFIX_CACHE_TOKENS = 16384
+PREFIX_MIN_TOKENS = 8   # shorter shared prefixes are not worth restoring
+PREFILL_STEP = 512      # prompt tokens per forward pass during prefill
+
+# The tiny backend: byte tokens plus two specials, and a DeepSeek-style chat template.
+TINY_BOS = 256
+TINY_EOS = 257
+TINY_VOCAB = 258
+TINY_BEGIN = "<｜begin▁of▁sentence｜>"
+TINY_USER = "<｜User｜>"
+TINY_ASSISTANT = "<｜Assistant｜>"
+TINY_END = "<｜end▁of▁sentence｜>"
+
+# --- Backends ---
+# Every backend exposes the pieces of a generation loop over an explicit KV cache:
+#   apply_chat_template(messages) -> prompt text     encode(text) -> [token ids]
+#   new_cache() -> empty cache                        restore(cache, length) -> copy of the first `length` positions
+#   forward(cache, tokens) -> logits of the last token, after appending `tokens` to the cache
+#   sample(logits, temperature) -> token id           decoder() -> incremental detokenizer
+#   eos_ids: tokens that end a reply
+
+class MlxLmBackend:
+    """
+    mlx_lm with the model pinned in memory. The KV cache is mlx_lm's per-layer prompt cache.
+    """
+    name = "mlx_lm"
+
+    def __init__(self, model_id):
+        import mlx.core as mx
+        from mlx_lm import load
+        from mlx_lm.models.cache import make_prompt_cache
+        self.model_id = model_id
+        self._mx = mx
+        self._make_prompt_cache = make_prompt_cache
+        self.model, self.tokenizer = load(model_id)
+        self.eos_ids = set(self.tokenizer.eos_token_ids)
+
+    def apply_chat_template(self, messages):
+        if self.tokenizer.chat_template is None:
+            return "\n".join(message["content"] for message in messages)
+        return self.tokenizer.apply_chat_template(messages, add_generation_prompt=True, tokenize=False)
+
+    def encode(self, text):
+        # The chat template already starts with the BOS token.
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def new_cache(self):
+        return self._make_prompt_cache(self.model)
+
+    def restore(self, cache, length):
+        copies = self.new_cache()
+        for source, target in zip(cache, copies):
+            keys, values = source.state
+            # Slices of the stored arrays: the copy grows by concatenation and never writes into them.
+            target.state = (keys[..., :length, :], values[..., :length, :])
+        return copies
+
+    def forward(self, cache, tokens):
+        mx = self._mx
+        for start in range(0, len(tokens), PREFILL_STEP):
+            logits = self.model(mx.array(tokens[start:start + PREFILL_STEP])[None], cache=cache)
+            mx.eval([c.state for c in cache])
+        return logits[:, -1, :]
+
+    def sample(self, logits, temperature):
+        mx = self._mx
+        if temperature <= 0:
+            return mx.argmax(logits, axis=-1).item()
+        return mx.random.categorical(logits * (1 / temperature)).item()
+
+    def decoder(self):
+        return _MlxTextStream(self.tokenizer.detokenizer)
+
+class _MlxTextStream:
+    def __init__(self, detokenizer):
+        self.detokenizer = detokenizer
+        self.detokenizer.reset()
+
+    def add(self, token):
+        self.detokenizer.add_token(token)
+        return self.detokenizer.last_segment
+
+    def flush(self):
+        self.detokenizer.finalize()
+        return self.detokenizer.last_segment
+
+class _TinyCache:
+    """
+    Per-layer keys and values, one row per position. Appending concatenates into new arrays, so a
+    restored copy can share the stored entry's rows.
+    """
+
+    def __init__(self, keys, values):
+        self.keys = keys
+        self.values = values
+
+    @property
+    def length(self):
+        return len(self.keys[0])
+
+class TinyBackend:
+    """
+    A small random-weight transformer in numpy for tests: byte tokens, `layers` blocks of
+    single-head causal attention and a tanh MLP, tied input/output embeddings. Weights are seeded
+    from model_id. Replies are sampled from printable ASCII, so they read as gibberish text.
+    """
+    name = "tiny"
+
+    def __init__(self, model_id, dim=256, layers=4):
+        import numpy as np
+        self.model_id = model_id
+        self._np = np
+        self.dim = dim
+        self.eos_ids = {TINY_EOS}
+        rng = np.random.default_rng(sum(model_id.encode("utf-8")))
+        scale = 1 / np.sqrt(dim)
+        self.embedding = rng.standard_normal((TINY_VOCAB, dim)).astype(np.float32)
+        self.layers = [
+            [(rng.standard_normal(shape) * scale).astype(np.float32)
+             for shape in ((dim, dim), (dim, dim), (dim, dim), (dim, dim), (dim, 4 * dim), (4 * dim, dim))]
+            for _ in range(layers)
+        ]
+        allowed = [ord("\n")] + list(range(32, 127)) + [TINY_EOS]
+        self._mask = np.full(TINY_VOCAB, -np.inf, dtype=np.float32)
+        self._mask[allowed] = 0.0
+        self._rng = np.random.default_rng(0)
+
+    def apply_chat_template(self, messages):
+        parts = [TINY_BEGIN]
+        parts += [m["content"] for m in messages if m["role"] == "system"]
+        for message in messages:
+            if message["role"] == "user":
+                parts.append(TINY_USER + message["content"])
+            elif message["role"] == "assistant":
+                parts.append(TINY_ASSISTANT + message["content"] + TINY_END)
+        parts.append(TINY_ASSISTANT)
+        return "".join(parts)
+
+    def encode(self, text):
+        return [TINY_BOS] + list(text.encode("utf-8"))
+
+    def new_cache(self):
+        empty = self._np.zeros((0, self.dim), dtype=self._np.float32)
+        return _TinyCache([empty] * len(self.layers), [empty] * len(self.layers))
+
+    def restore(self, cache, length):
+        return _TinyCache([k[:length] for k in cache.keys], [v[:length] for v in cache.values])
+
+    def _positions(self, positions):
+        np = self._np
+        rates = 1.0 / (10000 ** (np.arange(0, self.dim, 2) / self.dim))
+        angles = positions[:, None] * rates[None, :]
+        return np.concatenate([np.sin(angles), np.cos(angles)], axis=1).astype(np.float32)
+
+    def forward(self, cache, tokens):
+        np = self._np
+        for start in range(0, len(tokens), PREFILL_STEP):
+            chunk = tokens[start:start + PREFILL_STEP]
+            past = cache.length
+            positions = np.arange(past, past + len(chunk))
+            x = self.embedding[chunk] + self._positions(positions)
+            visible = np.arange(past + len(chunk))[None, :] <= positions[:, None]
+            for layer, (wq, wk, wv, wo, w1, w2) in enumerate(self.layers):
+                cache.keys[layer] = np.concatenate([cache.keys[layer], x @ wk])
+                cache.values[layer] = np.concatenate([cache.values[layer], x @ wv])
+                scores = (x @ wq) @ cache.keys[layer].T / np.sqrt(self.dim)
+                scores = np.where(visible, scores, -np.inf)
+                weights = np.exp(scores - scores.max(axis=1, keepdims=True))
+                weights /= weights.sum(axis=1, keepdims=True)
+                x = x + (weights @ cache.values[layer]) @ wo
+                x = x + np.tanh(x @ w1) @ w2
+                x = x / np.sqrt((x * x).mean(axis=1, keepdims=True) + 1e-6)
+        return x[-1] @ self.embedding.T
+
+    def sample(self, logits, temperature):
+        np = self._np
+        logits = logits + self._mask
+        if temperature <= 0:
+            return int(np.argmax(logits))
+        probs = np.exp((logits - logits.max()) / temperature)
+        return int(self._rng.choice(TINY_VOCAB, p=probs / probs.sum()))
+
+    def decoder(self):
+        return _ByteTextStream()
+
+class _ByteTextStream:
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def add(self, token):
+        return self._decoder.decode(bytes([token])) if token < 256 else ""
+
+    def flush(self):
+        return self._decoder.decode(b"", final=True)
+
+BACKENDS = {
+    "mlx_lm": MlxLmBackend,
+    "tiny": TinyBackend,
+}
+
+def make_backend(name, model_id, **backend_opts):
+    """
+    Instantiate the named backend. This is where the model gets loaded.
+    """
+    return BACKENDS[name](model_id, **backend_opts)
+
+# --- Prefix cache ---
+
+def common_prefix_length(a, b, limit):
+    """
+    Length of the longest common prefix of tuples a and b, at most `limit`.
+    """
+    n = min(len(a), len(b), limit)
+    if a[:n] == b[:n]:
+        return n
+    low, high = 0, n  # a[:low] == b[:low] and a[:high] != b[:high]
+    while high - low > 1:
+        middle = (low + high) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+class PrefixCache:
+    """
+    KV caches of recent requests keyed by the tokens they hold (prompt plus reply), least recently used
+    evicted first once there are more than max_entries or they hold more than max_tokens positions.
+    lookup() picks the entry sharing the longest prefix with a new prompt and returns a copy trimmed to
+    that prefix, so a prompt that only shares the system preamble with a cached chat still reuses it.
+    """
+
+    def __init__(self, backend, max_entries=PREFIX_CACHE_ENTRIES, max_tokens=PREFIX_CACHE_TOKENS,
+                 min_tokens=PREFIX_MIN_TOKENS):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.entries = OrderedDict()  # tuple of tokens -> backend cache
+        self.tokens = 0
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+
+    def lookup(self, tokens):
+        """
+        (cache copy, reused length) for the prompt `tokens`, or (None, 0) on a miss. At least one prompt
+        token is always left for the prefill, which is what produces the first logits.
+        """
+        tokens = tuple(tokens)
+        best_key, best = None, 0
+        for key in self.entries:
+            shared = common_prefix_length(key, tokens, len(tokens) - 1)
+            if shared > best:
+                best_key, best = key, shared
+        if best < self.min_tokens:
+            self.misses += 1
+            return None, 0
+        self.entries.move_to_end(best_key)
+        self.hits += 1
+        self.reused_tokens += best
+        return self.backend.restore(self.entries[best_key], best), best
+
+    def put(self, tokens, cache):
+        """
+        Keep `cache`, which holds exactly `tokens`; the caller must not extend it afterwards.
+        """
+        key = tuple(tokens)
+        if self.max_entries <= 0 or len(key) > self.max_tokens:
+            return
+        # Entries the new one extends are covered by it.
+        for old in [old for old in self.entries if len(old) <= len(key) and key[:len(old)] == old]:
+            self._drop(old)
+        self.entries[key] = cache
+        self.tokens += len(key)
+        while len(self.entries) > self.max_entries or self.tokens > self.max_tokens:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, key):
+        del self.entries[key]
+        self.tokens -= len(key)
+
+    def clear(self):
+        self.entries.clear()
+        self.tokens = 0
+
+    def stats(self):
+        return {"entries": len(self.entries), "tokens": self.tokens, "hits": self.hits,
+                "misses": self.misses, "reused_tokens": self.reused_tokens}
+
+# --- Generation ---
+
+class GenerationEngine:
+    """
+    The generation loop over one backend and its prefix cache: restore the longest cached prefix,
+    prefill the rest of the prompt, then sample and decode one token at a time.
+    """
+
+    def __init__(self, backend, cache_entries=PREFIX_CACHE_ENTRIES, cache_tokens=PREFIX_CACHE_TOKENS):
+        self.backend = backend
+        self.prefix_cache = PrefixCache(backend, cache_entries, cache_tokens)
+        self._lock = threading.Lock()  # one generation at a time on the model
+
+    def generate(self, prompt=None, messages=None, max_tokens=DEFAULT_MAX_TOKENS, temperature=0.0, on_token=None):
+        """
+        Reply to a raw prompt or to chat messages (formatted with the backend's chat template).
+        on_token, if given, is called with each piece of decoded text as soon as it is available.
+        Returns the text with token counts, timings and prefill/decode tokens per second.
+        """
+        backend = self.backend
+        if messages is not None:
+            prompt = backend.apply_chat_template(messages)
+        with self._lock:
+            start = time.perf_counter()
+            tokens = backend.encode(prompt)
+            cache, cached = self.prefix_cache.lookup(tokens)
+            if cache is None:
+                cache = backend.new_cache()
+            logits = backend.forward(cache, tokens[cached:])
+            prefilled = time.perf_counter()
+            fed = list(tokens)
+            generated = []
+            pieces = []
+            stream = backend.decoder()
+            finish_reason = "length"
+            first_token_seconds = None
+            while len(generated) < max_tokens:
+                token = backend.sample(logits, temperature)
+                if first_token_seconds is None:
+                    first_token_seconds = time.perf_counter() - start
+                if token in backend.eos_ids:
+                    finish_reason = "stop"
+                    break
+                generated.append(token)
+                piece = stream.add(token)
+                if piece:
+                    pieces.append(piece)
+                    if on_token:
+                        on_token(piece)
+                if len(generated) < max_tokens:
+                    logits = backend.forward(cache, [token])
+                    fed.append(token)
+            piece = stream.flush()
+            if piece:
+                pieces.append(piece)
+                if on_token:
+                    on_token(piece)
+            self.prefix_cache.put(fed, cache)
+            finished = time.perf_counter()
+
+        prefill_seconds = prefilled - start
+        decode_seconds = finished - prefilled
+        return {
+            "text": "".join(pieces),
+            "finish_reason": finish_reason,
+            "prompt_tokens": len(tokens),
+            "cached_tokens": cached,
+            "generated_tokens": len(generated),
+            "prefill_seconds": round(prefill_seconds, 4),
+            "decode_seconds": round(decode_seconds, 4),
+            "first_token_seconds": round(first_token_seconds or 0.0, 4),
+            "prefill_tps": round((len(tokens) - cached) / prefill_seconds, 1) if prefill_seconds else 0.0,
+            "decode_tps": round(len(generated) / decode_seconds, 1) if decode_seconds else 0.0,
+        }
+
+# --- Daemon ---
+
+class GenerationJob:
+    """
+    One queued request. The worker pushes events (dicts) into `events`; the connection that
+    submitted the job forwards them to its client. None marks the end of the stream.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, request, priority):
+        self.job_id = next(self._ids)
+        self.request = request
+        prompt = request.get("prompt") or request["messages"][-1]["content"]
+        self.label = repr(prompt[:60] + ("..." if len(prompt) > 60 else ""))
+        self.priority = priority
+        self.events = queue.Queue()
+        self.submitted = time.time()
+
+class GenerationDaemon:
+    """
+    Holds the one loaded backend and serves requests from a priority queue on a single worker thread.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.jobs = queue.PriorityQueue()
+        self._order = itertools.count()
+        self.active_job = None
+        self.jobs_done = 0
+        self.prefill_tokens = 0
+        self.prefill_seconds = 0.0
+        self.decode_tokens = 0
+        self.decode_seconds = 0.0
+        self.started = time.time()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def submit(self, request, priority=DEFAULT_PRIORITY):
+        job = GenerationJob(request, priority)
+        self.jobs.put((priority, next(self._order), job))
+        job.events.put({"type": "queued", "job_id": job.job_id, "position": self.jobs.qsize()})
+        return job
+
+    def status(self):
+        active = self.active_job
+        backend = self.engine.backend
+        return {
+            "type": "status",
+            "backend": backend.name,
+            "model": backend.model_id,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "queued_jobs": self.jobs.qsize(),
+            "active_job": active.label if active else None,
+            "jobs_done": self.jobs_done,
+            "prefill_tps": round(self.prefill_tokens / self.prefill_seconds, 1) if self.prefill_seconds else 0.0,
+            "decode_tps": round(self.decode_tokens / self.decode_seconds, 1) if self.decode_seconds else 0.0,
+            "prefix_cache": self.engine.prefix_cache.stats(),
+        }
+
+    def _work(self):
+        while True:
+            _, _, job = self.jobs.get()
+            self.active_job = job
+            print(f"[Daemon] Job {job.job_id} (priority {job.priority}): {job.label}")
+            job.events.put({"type": "started", "job_id": job.job_id, "wait_seconds": round(time.time() - job.submitted, 2)})
+            request = job.request
+            try:
+                result = self.engine.generate(
+                    prompt=request.get("prompt"), messages=request.get("messages"),
+                    on_token=lambda text: job.events.put({"type": "token", "text": text}),
+                    **request.get("options", {}),
+                )
+                job.events.put(dict(result, type="done", job_id=job.job_id))
+                self.jobs_done += 1
+                self.prefill_tokens += result["prompt_tokens"] - result["cached_tokens"]
+                self.prefill_seconds += result["prefill_seconds"]
+                self.decode_tokens += result["generated_tokens"]
+                self.decode_seconds += result["decode_seconds"]
+                print(f"[Daemon] Job {job.job_id}: {result['prompt_tokens']} prompt tokens "
+                      f"({result['cached_tokens']} cached) at {result['prefill_tps']:.0f} tok/s, "
+                      f"{result['generated_tokens']} generated at {result['decode_tps']:.1f} tok/s")
+            except Exception as e:
+                print(f"[Daemon] Error generating {job.label}: {e}")
+                job.events.put({"type": "error", "job_id": job.job_id, "message": str(e)})
+            finally:
+                job.events.put(None)
+                self.active_job = None
+                self.jobs.task_done()
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Newline-delimited JSON. A request is {"cmd": "generate", "prompt": text or "messages": [...],
+    "priority": n, "options": {"max_tokens", "temperature"}} or {"cmd": "status"}; the reply is a
+    stream of event lines ("queued", "started", "token"...) ending with "done", "error" or "status".
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self._send({"type": "error", "message": f"bad request: {e}"})
+            return
+        daemon = self.server.generation_daemon
+        if request.get("cmd") == "status":
+            self._send(daemon.status())
+            return
+        if not request.get("prompt") and not request.get("messages"):
+            self._send({"type": "error", "message": "request has neither prompt nor messages"})
+            return
+        job = daemon.submit(request, request.get("priority", DEFAULT_PRIORITY))
+        while True:
+            event = job.events.get()
+            if event is None:
+                break
+            try:
+                self._send(event)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away; let the job finish so its KV state still lands in the prefix cache.
+                continue
+
+    def _send(self, event):
+        self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(backend_name, model_id, socket_path=DEFAULT_SOCKET_PATH, cache_entries=PREFIX_CACHE_ENTRIES,
+          cache_tokens=PREFIX_CACHE_TOKENS, **backend_opts):
+    """
+    Load the backend once and serve generation requests on socket_path until interrupted.
+    """
+    if daemon_available(socket_path):
+        print(f"[Daemon] A daemon is already listening on {socket_path}.")
+        return
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # stale socket from a previous run
+    print(f"[Daemon] Loading {backend_name} backend for {model_id}...")
+    start = time.perf_counter()
+    backend = make_backend(backend_name, model_id, **backend_opts)
+    print(f"[Daemon] Model ready in {time.perf_counter() - start:.1f}s. Listening on {socket_path}")
+    server = _UnixServer(socket_path, _RequestHandler)
+    server.generation_daemon = GenerationDaemon(GenerationEngine(backend, cache_entries, cache_tokens))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Daemon] Shutting down.")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+# --- Client ---
+
+def _request(payload, socket_path=DEFAULT_SOCKET_PATH):
+    """
+    Send one request to the daemon and yield its reply events.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as reply:
+            for line in reply:
+                yield json.loads(line)
+
+def daemon_available(socket_path=DEFAULT_SOCKET_PATH):
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def daemon_status(socket_path=DEFAULT_SOCKET_PATH):
+    for event in _request({"cmd": "status"}, socket_path):
+        return event
+
+_mismatch_warned = set()  # (socket path, daemon (backend, model), requested model, requested backend) already reported
+
+def daemon_serves(model_id, backend_name="mlx_lm", socket_path=DEFAULT_SOCKET_PATH):
+    """
+    True if a daemon is listening on socket_path and holds model_id on backend_name (a tiny daemon
+    keeps the default model id, so the model alone is not enough). A daemon holding anything else
+    is reported once per process and then not used for that model.
+    """
+    if not daemon_available(socket_path):
+        return False
+    try:
+        status = daemon_status(socket_path)
+        loaded = (status["backend"], status["model"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    if loaded == (backend_name, model_id):
+        return True
+    if (socket_path, loaded, model_id, backend_name) not in _mismatch_warned:
+        _mismatch_warned.add((socket_path, loaded, model_id, backend_name))
+        print(f"[Daemon] The daemon on {socket_path} holds {loaded[1]} ({loaded[0]}), not {model_id} "
+              f"({backend_name}); generating in-process.")
+    return False
+
+def stream_generation(prompt=None, messages=None, priority=DEFAULT_PRIORITY, options=None,
+                      socket_path=DEFAULT_SOCKET_PATH):
+    """
+    Submit a raw prompt or chat messages to the daemon and yield its events ("queued", "started",
+    "token"..., "done"). Raises RuntimeError if the daemon reports an error.
+    """
+    payload = {"cmd": "generate", "priority": priority, "options": options or {}}
+    if messages is not None:
+        payload["messages"] = messages
+    else:
+        payload["prompt"] = prompt
+    for event in _request(payload, socket_path):
+        if event["type"] == "error":
+            raise RuntimeError(event["message"])
+        yield event
+
+_local_engines = {}  # (backend name, model id) -> in-process engine for the no-daemon fallback
+
+def generate(prompt=None, messages=None, model_id=DEFAULT_MODEL_ID, priority=DEFAULT_PRIORITY, on_token=None,
+             backend_name="mlx_lm", socket_path=DEFAULT_SOCKET_PATH, **options):
+    """
+    Generate a reply to a raw prompt or to chat messages; options are max_tokens and temperature.
+    Returns {"text", "finish_reason", token counts, timings, "prefill_tps", "decode_tps"}.
+    Goes through the daemon when one is listening with model_id loaded on backend_name, otherwise generates
+    in-process with an engine that stays loaded for the rest of this process.
+    on_token, if given, is called with each piece of text as soon as it arrives.
+    """
+    if not daemon_serves(model_id, backend_name, socket_path):
+        key = (backend_name, model_id)
+        if key not in _local_engines:
+            _local_engines[key] = GenerationEngine(make_backend(backend_name, model_id))
+        return _local_engines[key].generate(prompt, messages, on_token=on_token, **options)
+
+    for event in stream_generation(prompt, messages, priority, options, socket_path):
+        if event["type"] == "token":
+            if on_token:
+                on_token(event["text"])
+        elif event["type"] == "done":
+            return {key: value for key, value in event.items() if key not in ("type", "job_id")}
+    raise RuntimeError("Daemon closed the connection before finishing the reply")
+
+# --- Benchmark ---
+
+def run_benchmark(backend_name, model_id, requests, preamble_chars, max_tokens, backend_opts):
+    """
+    `requests` chat prompts that share one long system preamble and differ in the question, run once
+    with the prefix cache off and once with it on.
+    """
+    print(f"[Benchmark] Loading {backend_name} backend for {model_id}...")
+    backend = make_backend(backend_name, model_id, **backend_opts)
+    sentence = "Answer from the lecture notes below; quote timestamps where you can and say so when the notes are silent. "
+    preamble = (sentence * (preamble_chars // len(sentence) + 1))[:preamble_chars]
+    questions = [f"Question {index + 1}: what does the speaker say about topic number {index * 7 + 3}?"
+                 for index in range(requests)]
+    outputs = {}
+    for label, cache_entries in (("no prefix cache", 0), ("prefix cache", PREFIX_CACHE_ENTRIES)):
+        engine = GenerationEngine(backend, cache_entries=cache_entries)
+        results = []
+        start = time.perf_counter()
+        for question in questions:
+            messages = [{"role": "system", "content": preamble}, {"role": "user", "content": question}]
+            results.append(engine.generate(messages=messages, max_tokens=max_tokens))
+        total = time.perf_counter() - start
+        outputs[label] = [result["text"] for result in results]
+        prefilled = sum(r["prompt_tokens"] - r["cached_tokens"] for r in results)
+        prefill_seconds = sum(r["prefill_seconds"] for r in results)
+        decoded = sum(r["generated_tokens"] for r in results)
+        decode_seconds = sum(r["decode_seconds"] for r in results)
+        print(f"[Benchmark] {label:<16}: {total:6.2f}s for {requests} requests | prefilled {prefilled} of "
+              f"{sum(r['prompt_tokens'] for r in results)} prompt tokens in {prefill_seconds:.2f}s "
+              f"({prefilled / prefill_seconds:.0f} tok/s) | mean first token "
+              f"{sum(r['first_token_seconds'] for r in results) / requests * 1000:.0f} ms | "
+              f"decode {decoded / decode_seconds:.1f} tok/s")
+    same = outputs["no prefix cache"] == outputs["prefix cache"]
+    print(f"[Benchmark] Greedy replies identical with and without the cache: {'yes' if same else 'NO'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local LLM generation daemon with prompt-prefix KV caching over a Unix socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path of the daemon's Unix socket.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_backend_arguments(subparser):
+        subparser.add_argument("--backend", choices=sorted(BACKENDS), default="mlx_lm", help="Generation backend.")
+        subparser.add_argument("--model", default=DEFAULT_MODEL_ID, help="Model repository or path for the backend.")
+        subparser.add_argument("--tiny-dim", type=int, default=256, help="For --backend tiny: model width.")
+        subparser.add_argument("--tiny-layers", type=int, default=4, help="For --backend tiny: number of layers.")
+
+    serve_parser = subparsers.add_parser("serve", help="Load the model and serve requests until interrupted.")
+    add_backend_arguments(serve_parser)
+    serve_parser.add_argument("--cache-entries", type=int, default=PREFIX_CACHE_ENTRIES, help="Prefix cache entries (0 disables the cache).")
+    serve_parser.add_argument("--cache-tokens", type=int, default=PREFIX_CACHE_TOKENS, help="Prefix cache budget in cached positions.")
+
+    generate_parser = subparsers.add_parser("generate", help="Generate through the daemon and print tokens as they arrive.")
+    generate_parser.add_argument("prompt", help="User message (or the whole prompt with --raw).")
+    generate_parser.add_argument("--system", help="System message placed before the user message.")
+    generate_parser.add_argument("--raw", action="store_true", help="Send the prompt as is, without the chat template.")
+    generate_parser.add_argument("--max-tokens", type=int, default=DEFAULT_MAX_TOKENS, help="Maximum tokens to generate.")
+    generate_parser.add_argument("--temperature", type=float, default=0.0, help="Sampling temperature (0 is greedy).")
+    generate_parser.add_argument("--priority", type=int, default=DEFAULT_PRIORITY, help="Lower values are served first.")
+
+    subparsers.add_parser("status", help="Print the daemon's status.")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Compare prefill with and without the prefix cache, in-process.")
+    add_backend_arguments(benchmark_parser)
+    benchmark_parser.add_argument("--requests", type=int, default=6, help="Prompts sharing the system preamble.")
+    benchmark_parser.add_argument("--preamble-chars", type=int, default=3000, help="Length of the shared system preamble.")
+    benchmark_parser.add_argument("--max-tokens", type=int, default=32, help="Tokens to generate per request.")
+    args = parser.parse_args()
+
+    backend_opts = {}
+    if getattr(args, "backend", None) == "tiny":
+        backend_opts = {"dim": args.tiny_dim, "layers": args.tiny_layers}
+
+    if args.command == "serve":
+        serve(args.backend, args.model, args.socket, args.cache_entries, args.cache_tokens, **backend_opts)
+    elif args.command == "generate":
+        if not daemon_available(args.socket):
+            sys.exit(f"No daemon listening on {args.socket}. Start one with: python A_mlxLMDaemon.py serve")
+        messages = None
+        if not args.raw:
+            messages = [{"role": "system", "content": args.system}] if args.system else []
+            messages.append({"role": "user", "content": args.prompt})
+        options = {"max_tokens": args.max_tokens, "temperature": args.temperature}
+        for event in stream_generation(args.prompt if args.raw else None, messages, args.priority, options, args.socket):
+            if event["type"] == "token":
+                print(event["text"], end="", flush=True)
+            elif event["type"] in ("queued", "started", "done"):
+                details = {k: v for k, v in event.items() if k not in ("type", "text")}
+                print(f"{chr(10) if event['type'] == 'done' else ''}[Client] {event['type']}: {details}")
+    elif args.command == "status":
+        if not daemon_available(args.socket):
+            sys.exit(f"No daemon listening on {args.socket}.")
+        print(json.dumps(daemon_status(args.socket), indent=2))
+    elif args.command == "benchmark":
+        run_benchmark(args.backend, args.model, args.requests, args.preamble_chars, args.max_tokens, backend_opts)
+
+if __name__ == "__main__":
+    main()
@@ -21,111 +21,891 @@ Example Usages:
 7. Using Clean Text Output:
    python A_mlxOlmOCR.py --image-file /path/to/your/image.png --clean_txt --output-dir ./outputs
 
+8. Comparing per-page latency of the resident engine against the old subprocess-per-page path:
+   python A_mlxOlmOCR.py --pdfs /path/to/file1.pdf --benchmark-pages 5
+
+9. Benchmarking the pipelined PDF path on a synthetic 200-page PDF with the CPU stand-in:
+   python A_mlxOlmOCR.py --benchmark-pipeline 200 --backend standin --standin-page-seconds 0.05
+
+10. Spreading all pages of a PDF folder over 8 worker processes (e.g. CPU backend on a many-core box):
+   python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --workers 8 --output-dir ./outputs
+
+11. Measuring how much the in-memory page hand-off saves per page:
+   python A_mlxOlmOCR.py --benchmark-handoff 20
+
+12. Resuming a run that was interrupted (finished pages are skipped):
+   python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --resume --output-dir ./outputs
+
+13. Always running the model, even on PDFs with an embedded text layer:
+   python A_mlxOlmOCR.py --pdfs /path/to/file1.pdf --text-layer never --output-dir ./outputs
+
+14. OCR in micro-batches of up to 8 pages, and sweeping batch sizes on the CPU stand-in:
+   python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --batch-size 8 --output-dir ./outputs
+   python A_mlxOlmOCR.py --benchmark-batch 64 --backend standin --standin-page-seconds 0.05
+
+15. Making the outputs searchable as they finish (python transcriptIndex.py search "..."):
+   python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --index --output-dir ./outputs
+
 Notes:
+- With --text-layer auto (default), PDF pages that already carry a usable text layer are extracted
+  with pdftotext instead of going through the model; the rest are rasterized at the DPI that makes
+  their longest side --resize-shape pixels.
+- Each output is written page by page to <name>.txt.partial with a <name>.txt.journal.jsonl checkpoint
+  and renamed to <name>.txt only when complete.
+- Raw model output per page is cached under ~/.cache/A_mlxOlmOCR (see --cache-dir / --cache-max-mb / --no-cache),
+  so re-runs and toggling --clean_txt only re-run inference for pages that actually changed.
+- The model is loaded once per run (--backend mlx_vlm); --backend subprocess restores the old one-interpreter-per-page behaviour.
 - Use the --help flag to display this usage information and additional details.
 """
 import os
 import sys
 import glob
+import time
+import hashlib
 import argparse
 import subprocess
 import tempfile
+import statistics
+import threading
+import queue
+import multiprocessing
+import re
 import json  # Added for JSON parsing in --clean_txt feature
 
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 Image.MAX_IMAGE_PIXELS = None  # Disable the decompression bomb protection (adjust as needed)
 
-def process_image_file(image_path, model, max_tokens, temp_val, prompt, resize_shape, clean=False):
+# PDF pipeline settings
+RASTER_DPI = 200          # fallback DPI when a page's size is unknown
+MIN_RASTER_DPI = 36
+MAX_RASTER_DPI = 300
+MIN_TEXT_LAYER_CHARS = 100        # embedded text shorter than this is treated as "no text layer"
+MIN_TEXT_LAYER_ALNUM_RATIO = 0.6  # and so is text that is mostly symbols / replacement characters
+RASTER_BATCH_PAGES = 4     # pages rasterized per pdf2image call
+PIPELINE_QUEUE_SIZE = 4    # max pages waiting between pipeline stages
+_PIPELINE_DONE = object()  # sentinel that closes a pipeline queue
+
+# Finished outputs are pushed into this transcriptIndex.TranscriptIndex when --index is given.
+search_index = None
+
+# Batched inference settings
+BATCH_BYTES_PER_PIXEL = 48       # rough model memory per input pixel (after resize), used to size micro-batches
+STANDIN_BATCH_FIXED_SHARE = 0.6  # share of the standin backend's per-page cost that is paid once per batch
+
+# --- OCR Backends ---
+# Every backend exposes generate(image, prompt, max_tokens, temp_val, resize_shape) -> raw model text,
+# where image is either an image file path or an in-memory PIL image, and
+# generate_batch(images, ...) -> one raw text per image for a micro-batch.
+
+def load_image(image):
     """
-    Process a single image file with the OCR model by calling the command-line tool.
-    Returns the extracted text output.
+    Return a decoded PIL image for a file path; in-memory PIL images are returned as-is.
     """
-    cmd = [
-        "python", "-m", "mlx_vlm.generate",
-        "--model", model,
-        "--max-tokens", str(max_tokens),
-        "--temp", str(temp_val),
-        "--prompt", prompt,
-        "--image", image_path,
-        "--resize-shape", str(resize_shape)
-    ]
-    try:
+    if isinstance(image, Image.Image):
+        return image
+    with Image.open(image) as img:
+        img.load()
+        return img
+
+def resize_to_shape(image, resize_shape):
+    """
+    Scale an image so that its longest side equals resize_shape (same rule as mlx_vlm's --resize-shape).
+    """
+    ratio = min(resize_shape / image.width, resize_shape / image.height)
+    if ratio == 1:
+        return image
+    return image.resize((int(image.width * ratio), int(image.height * ratio)))
+
+class OCRBackend:
+    """
+    Base class of the OCR backends. Backends without native batching run a micro-batch one image at a time.
+    """
+    name = None
+
+    def generate_batch(self, images, prompt, max_tokens, temp_val, resize_shape):
+        return [self.generate(image, prompt, max_tokens, temp_val, resize_shape) for image in images]
+
+class SubprocessBackend(OCRBackend):
+    """
+    The original path: start `python -m mlx_vlm.generate` for every page.
+    Each call spins up a new interpreter and reloads the model weights.
+    """
+    name = "subprocess"
+
+    def __init__(self, model):
+        self.model = model
+
+    def generate(self, image, prompt, max_tokens, temp_val, resize_shape):
+        if isinstance(image, Image.Image):
+            # The CLI can only read files, so in-memory pages are written out (losslessly) for this backend only.
+            with tempfile.TemporaryDirectory() as temp_dir:
+                image_path = os.path.join(temp_dir, "page.png")
+                image.save(image_path, "PNG")
+                return self.generate(image_path, prompt, max_tokens, temp_val, resize_shape)
+        cmd = [
+            "python", "-m", "mlx_vlm.generate",
+            "--model", self.model,
+            "--max-tokens", str(max_tokens),
+            "--temp", str(temp_val),
+            "--prompt", prompt,
+            "--image", image,
+            "--resize-shape", str(resize_shape)
+        ]
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        if clean:
+        return result.stdout
+
+class MlxVlmBackend(OCRBackend):
+    """
+    Load the mlx_vlm model and processor once and call generate() in-process for each page.
+    PIL images are passed straight through, so rasterized pages are never re-encoded.
+    """
+    name = "mlx_vlm"
+
+    def __init__(self, model):
+        from mlx_vlm import load
+        from mlx_vlm.prompt_utils import apply_chat_template
+        from mlx_vlm.utils import load_config
+        self.model_path = model
+        self.model, self.processor = load(model)
+        self.config = load_config(model)
+        self._apply_chat_template = apply_chat_template
+        self._formatted_prompts = {}  # prompt -> chat-templated prompt
+
+    def _format_prompt(self, prompt, num_images=1):
+        key = (prompt, num_images)
+        if key not in self._formatted_prompts:
+            self._formatted_prompts[key] = self._apply_chat_template(
+                self.processor, self.config, prompt, num_images=num_images
+            )
+        return self._formatted_prompts[key]
+
+    def generate(self, image, prompt, max_tokens, temp_val, resize_shape):
+        from mlx_vlm import generate
+        output = generate(
+            self.model, self.processor, self._format_prompt(prompt), [image],
+            max_tokens=max_tokens,
+            temperature=temp_val,
+            resize_shape=(resize_shape, resize_shape),
+            verbose=False,
+        )
+        # Newer mlx_vlm releases return a GenerationResult, older ones a plain string.
+        return getattr(output, "text", output)
+
+    def generate_batch(self, images, prompt, max_tokens, temp_val, resize_shape):
+        try:
+            from mlx_vlm import batch_generate
+        except ImportError:
+            # Older mlx_vlm releases have no batched generation.
+            return super().generate_batch(images, prompt, max_tokens, temp_val, resize_shape)
+        result = batch_generate(
+            self.model, self.processor,
+            images=list(images),
+            prompts=[self._format_prompt(prompt)] * len(images),
+            max_tokens=max_tokens,
+            temperature=temp_val,
+            resize_shape=(resize_shape, resize_shape),
+            verbose=False,
+        )
+        texts = list(getattr(result, "texts", result))
+        if len(texts) != len(images):
+            raise RuntimeError(f"batch_generate returned {len(texts)} outputs for {len(images)} images")
+        return texts
+
+class StandInBackend(OCRBackend):
+    """
+    Deterministic CPU stand-in for the OCR model, used for tests and benchmarks.
+    No weights are loaded; load_seconds / page_seconds simulate the real costs.
+    The output mimics olmOCR's JSON response so --clean_txt behaves the same.
+    A micro-batch of n pages costs page_seconds * (STANDIN_BATCH_FIXED_SHARE + (1 - STANDIN_BATCH_FIXED_SHARE) * n),
+    i.e. part of a forward pass is paid once per batch, like on real hardware.
+    """
+    name = "standin"
+
+    def __init__(self, model, load_seconds=0.0, page_seconds=0.0):
+        self.model_path = model
+        self.page_seconds = page_seconds
+        time.sleep(load_seconds)
+
+    def _describe(self, image, prompt, max_tokens, resize_shape):
+        img = load_image(image).convert("RGB")
+        img.thumbnail((resize_shape, resize_shape))
+        digest = hashlib.sha256(img.tobytes()).hexdigest()[:16]
+        width, height = img.size
+        text = f"[standin {width}x{height} {digest}] {prompt}"[:max_tokens]
+        return json.dumps({"primary_language": "en", "is_table": False, "natural_text": text})
+
+    def generate(self, image, prompt, max_tokens, temp_val, resize_shape):
+        time.sleep(self.page_seconds)
+        return self._describe(image, prompt, max_tokens, resize_shape)
+
+    def generate_batch(self, images, prompt, max_tokens, temp_val, resize_shape):
+        time.sleep(self.page_seconds * (STANDIN_BATCH_FIXED_SHARE + (1 - STANDIN_BATCH_FIXED_SHARE) * len(images)))
+        return [self._describe(image, prompt, max_tokens, resize_shape) for image in images]
+
+BACKENDS = {
+    "mlx_vlm": MlxVlmBackend,
+    "subprocess": SubprocessBackend,
+    "standin": StandInBackend,
+}
+
+def make_backend(name, model, standin_load_seconds=0.0, standin_page_seconds=0.0):
+    """
+    Instantiate the named OCR backend. This is where the model weights get loaded.
+    """
+    if name == "standin":
+        return StandInBackend(model, load_seconds=standin_load_seconds, page_seconds=standin_page_seconds)
+    return BACKENDS[name](model)
+
+def page_fingerprint(image):
+    """
+    Hash the decoded pixels of a page image (file path or PIL image), so the same rendered
+    page gets the same fingerprint no matter where it came from.
+    """
+    img = load_image(image)
+    digest = hashlib.sha256(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode("utf-8"))
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+class OCRCache:
+    """
+    Content-addressed on-disk cache of raw model output, one file per page.
+    Keys cover the page pixels and every generation setting that changes the output
+    (backend, model, prompt, max tokens, temperature, resize shape); --clean_txt is applied
+    on top of the cached raw text, so it is not part of the key.
+    Total size is bounded; the least recently used entries (by file mtime) are evicted first.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def make_key(fingerprint, backend_name, model, prompt, max_tokens, temp_val, resize_shape):
+        settings = json.dumps([backend_name, model, prompt, max_tokens, temp_val, resize_shape])
+        return hashlib.sha256(f"{fingerprint}\n{settings}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".txt")
+
+    def _entries(self):
+        for path in glob.glob(os.path.join(self.cache_dir, "??", "*.txt")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw_text = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as most recently used
+        except OSError:
+            pass  # evicted by another worker process since the read; the text is still good
+        with self._lock:
+            self.hits += 1
+        return raw_text
+
+    def put(self, key, raw_text):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(raw_text)
+        size = os.path.getsize(temp_path)
+        try:
+            replaced = os.path.getsize(path)  # same key written before (or by another worker)
+        except OSError:
+            replaced = 0
+        os.replace(temp_path, path)
+        with self._lock:
+            self.total_bytes += size - replaced
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache is back under 90% of its budget.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if self.total_bytes <= target:
+                break
             try:
-                output_dict = json.loads(result.stdout)
-                cleaned_text = output_dict.get("natural_text", result.stdout)
-                return cleaned_text
-            except json.JSONDecodeError:
-                return result.stdout
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def take_counts(self):
+        """
+        Return (hits, misses, evictions) since the last call and reset them; workers report these per task.
+        """
+        with self._lock:
+            counts = (self.hits, self.misses, self.evictions)
+            self.hits = self.misses = self.evictions = 0
+        return counts
+
+    def stats_summary(self):
+        lookups = self.hits + self.misses
+        hit_rate = (100.0 * self.hits / lookups) if lookups else 0.0
+        return (
+            f"[cache] {self.hits} hits / {self.misses} misses ({hit_rate:.0f}% hit rate), "
+            f"{self.evictions} evictions, {self.total_bytes / 1e6:.1f} MB in {self.cache_dir}"
+        )
+
+class OCREngine:
+    """
+    Long-lived OCR engine. The backend (and therefore the model) is created once
+    and every page goes through a plain Python call. Per-page latencies are kept for the run report.
+    With a cache attached, pages whose raw output is already known skip inference entirely.
+    """
+
+    def __init__(self, backend, model, max_tokens, temp_val, prompt, resize_shape, load_seconds=0.0, cache=None,
+                 max_batch_size=1, batch_memory_bytes=4 * 1024 ** 3):
+        self.backend = backend
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temp_val = temp_val
+        self.prompt = prompt
+        self.resize_shape = resize_shape
+        self.load_seconds = load_seconds
+        self.cache = cache
+        self.max_batch_size = max_batch_size
+        self.batch_memory_bytes = batch_memory_bytes
+        self.latencies = []
+        self.text_layer_pages = 0  # pages answered from the PDF's text layer without inference
+
+    @classmethod
+    def create(cls, backend_name, model, max_tokens, temp_val, prompt, resize_shape, cache=None,
+               max_batch_size=1, batch_memory_bytes=4 * 1024 ** 3, **backend_opts):
+        start = time.perf_counter()
+        backend = make_backend(backend_name, model, **backend_opts)
+        load_seconds = time.perf_counter() - start
+        return cls(backend, model, max_tokens, temp_val, prompt, resize_shape, load_seconds=load_seconds, cache=cache,
+                   max_batch_size=max_batch_size, batch_memory_bytes=batch_memory_bytes)
+
+    def cache_key(self, image):
+        return OCRCache.make_key(
+            page_fingerprint(image), self.backend.name, self.model,
+            self.prompt, self.max_tokens, self.temp_val, self.resize_shape
+        )
+
+    def ocr(self, image):
+        """
+        Run the model on one image (file path or in-memory PIL image) and return the raw model output
+        (served from the cache when possible).
+        """
+        result = self.ocr_batch([image])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def estimated_bytes(self, image):
+        """
+        Rough model memory for one image once it is scaled to resize_shape (only the header is read for files).
+        """
+        if isinstance(image, Image.Image):
+            width, height = image.size
         else:
-            return result.stdout
-    except subprocess.CalledProcessError as e:
-        sys.stderr.write(f"\nError processing image {image_path}:\n{e.stderr}\n")
+            with Image.open(image) as img:
+                width, height = img.size
+        ratio = self.resize_shape / max(width, height)
+        return int(width * height * ratio * ratio * BATCH_BYTES_PER_PIXEL)
+
+    def micro_batches(self, indices, images):
+        """
+        Group image indices into micro-batches of at most max_batch_size images whose
+        estimated memory stays within batch_memory_bytes (a batch always holds at least one image).
+        """
+        batch, batch_bytes = [], 0
+        for i in indices:
+            image_bytes = self.estimated_bytes(images[i])
+            if batch and (len(batch) >= self.max_batch_size or batch_bytes + image_bytes > self.batch_memory_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(i)
+            batch_bytes += image_bytes
+        if batch:
+            yield batch
+
+    def _generate(self, images):
+        start = time.perf_counter()
+        try:
+            if len(images) == 1:
+                return [self.backend.generate(images[0], self.prompt, self.max_tokens, self.temp_val, self.resize_shape)]
+            return self.backend.generate_batch(images, self.prompt, self.max_tokens, self.temp_val, self.resize_shape)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.latencies.extend([elapsed / len(images)] * len(images))
+
+    def ocr_batch(self, images):
+        """
+        Run the model on a list of images in micro-batches and return, per image, the raw model
+        output or the exception that page raised. Cached pages skip inference; when a whole
+        micro-batch fails, its pages are retried one at a time.
+        """
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        todo = []
+        for i, image in enumerate(images):
+            if self.cache is not None:
+                keys[i] = self.cache_key(image)
+                raw_text = self.cache.get(keys[i])
+                if raw_text is not None:
+                    results[i] = raw_text
+                    continue
+            todo.append(i)
+
+        for batch in self.micro_batches(todo, images):
+            try:
+                texts = self._generate([images[i] for i in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    results[batch[0]] = e
+                    continue
+                sys.stderr.write(f"\nBatch of {len(batch)} pages failed ({e}); retrying them one page at a time.\n")
+                texts = []
+                for i in batch:
+                    try:
+                        texts.extend(self._generate([images[i]]))
+                    except Exception as page_error:
+                        texts.append(page_error)
+            for i, raw_text in zip(batch, texts):
+                results[i] = raw_text
+                if keys[i] is not None and not isinstance(raw_text, Exception):
+                    self.cache.put(keys[i], raw_text)
+        return results
+
+    def latency_summary(self):
+        return latency_summary(self.backend.name, self.load_seconds, self.latencies, self.text_layer_pages)
+
+def latency_summary(backend_name, load_seconds, latencies, text_layer_pages=0):
+    """
+    One-line report of model load time and per-page latency (also used for the --workers totals).
+    """
+    skipped = f", {text_layer_pages} pages skipped inference (text layer)" if text_layer_pages else ""
+    if not latencies:
+        return f"[{backend_name}] no pages processed by the model{skipped}"
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return (
+        f"[{backend_name}] load {load_seconds:.2f}s, {len(ordered)} pages, "
+        f"per-page mean {statistics.mean(ordered):.3f}s / median {statistics.median(ordered):.3f}s / p95 {p95:.3f}s{skipped}"
+    )
+
+def clean_output(raw_text):
+    """
+    Extract the "natural_text" field from the model's JSON response (--clean_txt).
+    Falls back to the raw output when it is not valid JSON.
+    """
+    try:
+        output_dict = json.loads(raw_text)
+        return output_dict.get("natural_text", raw_text)
+    except (json.JSONDecodeError, AttributeError):
+        return raw_text
+
+def process_image_file(image_path, engine, clean=False, label=None):
+    """
+    Process a single image with the resident OCR engine. image_path may also be an
+    in-memory PIL image (e.g. a rasterized PDF page); label names it in error messages.
+    Returns the extracted text output.
+    """
+    try:
+        raw_text = engine.ocr(image_path)
+    except Exception as e:
+        details = e.stderr if isinstance(e, subprocess.CalledProcessError) else e
+        sys.stderr.write(f"\nError processing image {label or image_path}:\n{details}\n")
         return ""
+    return clean_output(raw_text) if clean else raw_text
+
+def process_image_batch(images, engine, clean=False, labels=None):
+    """
+    Batched counterpart of process_image_file: OCR a list of images (paths or PIL images)
+    through the engine's micro-batches and return one text per image ("" for failed pages).
+    """
+    texts = []
+    for i, result in enumerate(engine.ocr_batch(images)):
+        if isinstance(result, Exception):
+            details = result.stderr if isinstance(result, subprocess.CalledProcessError) else result
+            label = labels[i] if labels else images[i]
+            sys.stderr.write(f"\nError processing image {label}:\n{details}\n")
+            texts.append("")
+        else:
+            texts.append(clean_output(result) if clean else result)
+    return texts
+
+def format_page_section(page_number, page_text):
+    return f"--- Page {page_number} ---\n" + page_text + "\n"
+
+def format_file_section(file_name, file_text):
+    return f"--- File: {file_name} ---\n" + file_text + "\n"
+
+def list_image_files(folder_path):
+    """
+    Return the image files of a folder (common image extensions) in alphabetical order.
+    """
+    image_extensions = ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tif', '*.tiff')
+    image_files = []
+    for ext in image_extensions:
+        image_files.extend(glob.glob(os.path.join(folder_path, ext)))
+    image_files.sort()
+    return image_files
+
+def write_text_atomic(output_file, text):
+    """
+    Write a whole text file under a temporary name and rename it into place,
+    so readers never see a half-written output.
+    """
+    partial_path = output_file + ".partial"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(partial_path, output_file)
+    if search_index is not None:
+        search_index.push(output_file, kind="ocr")
+
+class CheckpointedOutput:
+    """
+    Streams the sections of one output file to disk as they finish.
+
+    Text goes to <output>.partial and every finished section is recorded in a JSONL journal
+    (<output>.journal.jsonl) with the byte offset where it ends. With resume=True a previous
+    run's journal is replayed: finished sections are reported by is_done() and anything written
+    after the last journaled section is truncated. commit() renames the partial file into place
+    atomically and drops the journal.
+    """
+
+    def __init__(self, output_file, resume=False):
+        self.output_file = output_file
+        self.partial_path = output_file + ".partial"
+        self.journal_path = output_file + ".journal.jsonl"
+        self.done = set()
+        end_offset = 0
+        if resume:
+            end_offset = self._load_journal()
+        else:
+            for path in (self.partial_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._file = open(self.partial_path, "ab")
+        self._file.truncate(end_offset)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _load_journal(self):
+        """
+        Replay the journal and return the offset where the last fully written section ends.
+        """
+        if not (os.path.exists(self.journal_path) and os.path.exists(self.partial_path)):
+            return 0
+        partial_size = os.path.getsize(self.partial_path)
+        end_offset = 0
+        valid_lines = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn last line from a crash
+                if entry["end"] > partial_size:
+                    break
+                self.done.add(entry["key"])
+                end_offset = entry["end"]
+                valid_lines.append(line if line.endswith("\n") else line + "\n")
+        with open(self.journal_path, "w", encoding="utf-8") as f:
+            f.writelines(valid_lines)
+        return end_offset
+
+    def is_done(self, key):
+        return str(key) in self.done
+
+    def write(self, key, text):
+        self._file.write(text.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._journal.write(json.dumps({"key": str(key), "end": self._file.tell()}) + "\n")
+        self._journal.flush()
+        self.done.add(str(key))
+
+    def close(self):
+        self._file.close()
+        self._journal.close()
+
+    def commit(self):
+        self.close()
+        os.replace(self.partial_path, self.output_file)
+        os.remove(self.journal_path)
+        if search_index is not None:
+            search_index.push(self.output_file, kind="ocr")
+
+def count_pdf_pages(pdf_path):
+    """
+    Return the number of pages in a PDF without rasterizing anything.
+    """
+    return pdfinfo_from_path(pdf_path)["Pages"]
+
+def pdf_page_sizes(pdf_path, total_pages):
+    """
+    Return {page_number: (width_pt, height_pt)} for every page, parsed from `pdfinfo -f 1 -l N`.
+    """
+    result = subprocess.run(
+        ["pdfinfo", "-f", "1", "-l", str(total_pages), pdf_path],
+        capture_output=True, text=True, check=True
+    )
+    sizes = {}
+    for match in re.finditer(r"^Page\s+(\d+) size:\s+([\d.]+) x ([\d.]+) pts", result.stdout, re.MULTILINE):
+        sizes[int(match.group(1))] = (float(match.group(2)), float(match.group(3)))
+    return sizes
+
+def page_dpi(page_size, resize_shape):
+    """
+    Pick the rasterization DPI that makes the page's longest side come out at resize_shape pixels,
+    clamped to [MIN_RASTER_DPI, MAX_RASTER_DPI]. Unknown page sizes fall back to RASTER_DPI.
+    """
+    if not page_size:
+        return RASTER_DPI
+    dpi = resize_shape * 72.0 / max(page_size)
+    return int(round(min(max(dpi, MIN_RASTER_DPI), MAX_RASTER_DPI)))
+
+def extract_text_layer(pdf_path):
+    """
+    Return the embedded text of every page as a list (pdftotext separates pages with form feeds).
+    """
+    result = subprocess.run(["pdftotext", "-layout", "-enc", "UTF-8", pdf_path, "-"], capture_output=True, check=True)
+    return result.stdout.decode("utf-8", errors="replace").split("\f")
+
+def has_usable_text(text):
+    """
+    A page's text layer is usable when it has enough characters and most of them are
+    letters or digits (broken font encodings tend to come out as symbols or U+FFFD).
+    """
+    chars = "".join(text.split())
+    if len(chars) < MIN_TEXT_LAYER_CHARS:
+        return False
+    return sum(ch.isalnum() for ch in chars) / len(chars) >= MIN_TEXT_LAYER_ALNUM_RATIO
+
+def plan_pdf_pages(pdf_path, total_pages, resize_shape, text_layer="auto"):
+    """
+    Pre-pass over a PDF. For every page decide whether its embedded text layer can be used
+    as-is or it needs OCR, and at which DPI to rasterize it. Returns a list of
+    (page_number, "text", page_text) and (page_number, "ocr", dpi) entries in page order.
+    text_layer is "auto" (text layer where usable), "never" (always OCR) or "only" (never OCR).
+    """
+    page_texts = []
+    if text_layer != "never":
+        try:
+            page_texts = extract_text_layer(pdf_path)
+        except Exception as e:
+            sys.stderr.write(f"\nCould not read the text layer of {pdf_path}: {e}\n")
+    try:
+        sizes = pdf_page_sizes(pdf_path, total_pages) if text_layer != "only" else {}
+    except Exception as e:
+        sys.stderr.write(f"\nCould not read page sizes of {pdf_path}, using {RASTER_DPI} dpi: {e}\n")
+        sizes = {}
+
+    plan = []
+    for page_number in range(1, total_pages + 1):
+        page_text = page_texts[page_number - 1].rstrip() if page_number <= len(page_texts) else ""
+        if text_layer == "only" or (text_layer == "auto" and has_usable_text(page_text)):
+            plan.append((page_number, "text", page_text))
+        else:
+            plan.append((page_number, "ocr", page_dpi(sizes.get(page_number), resize_shape)))
+    return plan
+
+def rasterize_pages(pdf_path, ocr_pages, batch_pages=RASTER_BATCH_PAGES):
+    """
+    Lazily yield (page_number, PIL image) for the (page_number, dpi) pairs in ocr_pages.
+    Runs of consecutive pages with the same DPI are rendered together, at most batch_pages
+    per pdf2image call, so memory does not grow with the page count.
+    """
+    i = 0
+    while i < len(ocr_pages):
+        first_page, dpi = ocr_pages[i]
+        j = i + 1
+        while j < len(ocr_pages) and j - i < batch_pages and ocr_pages[j] == (first_page + (j - i), dpi):
+            j += 1
+        pages = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=first_page + (j - i) - 1)
+        for offset, page in enumerate(pages):
+            yield first_page + offset, page
+        i = j
 
-def process_pdf(pdf_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean=False):
+def process_pdf(pdf_path, engine, output_dir, clean=False, resume=False, text_layer="auto"):
     """
     Convert a PDF into images (one per page) and process each image.
     The outputs are concatenated and saved to a text file whose name is the PDF's base name.
+
+    The work runs as a three-stage pipeline joined by bounded queues:
+    rasterize (background thread) -> OCR (this thread) -> write (background thread).
+    Rasterizing page N+1 overlaps inference on page N, and each page is checkpointed to disk
+    as soon as it is done; with resume=True pages finished by an earlier run are skipped.
+    A pre-pass (plan_pdf_pages) takes pages with a usable embedded text layer directly,
+    without any model call, and picks the rasterization DPI of the others.
     """
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
     output_file = os.path.join(output_dir, base_name + ".txt")
     print(f"\nProcessing PDF: {pdf_path}")
-    
-    # Convert PDF pages to images (using 300 dpi for clarity)
+    if resume and os.path.exists(output_file) and not os.path.exists(output_file + ".journal.jsonl"):
+        print(f"Output {output_file} already complete. Skipping.")
+        return
+
     try:
-        pages = convert_from_path(pdf_path, dpi=200)
+        total_pages = count_pdf_pages(pdf_path)
     except Exception as e:
         sys.stderr.write(f"\nFailed to convert {pdf_path} to images: {e}\n")
         return
 
+    output = CheckpointedOutput(output_file, resume=resume)
+    plan = [entry for entry in plan_pdf_pages(pdf_path, total_pages, engine.resize_shape, text_layer) if not output.is_done(entry[0])]
+    if plan and plan[0][0] > 1:
+        print(f"  Resuming at page {plan[0][0]}/{total_pages}")
+    ocr_pages = [(page_number, dpi) for page_number, kind, dpi in plan if kind == "ocr"]
+    text_pages = len(plan) - len(ocr_pages)
+    if text_pages:
+        print(f"  {text_pages}/{len(plan)} pages use the embedded text layer (inference skipped)")
+    engine.text_layer_pages += text_pages
+    rasterize_failed = []
+
+    page_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    text_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    # Pages stay in memory between stages; only the final text touches the disk.
+    def rasterize_stage():
+        try:
+            for page_number, page in rasterize_pages(pdf_path, ocr_pages):
+                page_queue.put((page_number, page))
+        except Exception as e:
+            sys.stderr.write(f"\nFailed to convert {pdf_path} to images: {e}\n")
+            rasterize_failed.append(e)
+        finally:
+            page_queue.put(_PIPELINE_DONE)
+
+    def write_stage():
+        while True:
+            item = text_queue.get()
+            if item is _PIPELINE_DONE:
+                break
+            page_number, page_text = item
+            output.write(page_number, format_page_section(page_number, page_text))
+
+    rasterizer = threading.Thread(target=rasterize_stage, daemon=True)
+    writer = threading.Thread(target=write_stage, daemon=True)
+    rasterizer.start()
+    writer.start()
+
+    def run_batch(entries):
+        # OCR the rasterized pages among entries in one engine call, then queue every entry in page order.
+        pages = [value for _, kind, value in entries if kind == "page"]
+        labels = [f"{pdf_path} page {page_number}" for page_number, kind, _ in entries if kind == "page"]
+        texts = iter(process_image_batch(pages, engine, clean, labels=labels))
+        for page in pages:
+            page.close()
+        for page_number, kind, value in entries:
+            text_queue.put((page_number, next(texts) if kind == "page" else value))
+
+    pending = []  # entries waiting for the current micro-batch, in page order
+    pending_pages = 0
+    for page_number, kind, value in plan:
+        if kind == "ocr":
+            item = page_queue.get()
+            if item is _PIPELINE_DONE:
+                break  # rasterization failed; the checkpoint keeps what is done
+            page_number, page = item
+            print(f"  Processing page {page_number}/{total_pages}...")
+            pending.append((page_number, "page", page))
+            pending_pages += 1
+        else:
+            pending.append((page_number, "text", value))
+        if pending_pages >= engine.max_batch_size or pending_pages == 0:
+            run_batch(pending)
+            pending, pending_pages = [], 0
+    if pending:
+        run_batch(pending)
+
+    text_queue.put(_PIPELINE_DONE)
+    rasterizer.join()
+    writer.join()
+    if rasterize_failed:
+        output.close()
+        print(f"Partial output kept in {output.partial_path}; re-run with --resume to finish it.")
+        return
+    output.commit()
+    print(f"Output saved to: {output_file}")
+
+def process_pdf_serial(pdf_path, engine, output_dir, clean=False, text_layer="auto"):
+    """
+    The previous, non-pipelined process_pdf: rasterize the whole PDF up front, OCR the pages one
+    at a time, then write everything at the end. It uses the same page plan (text layer and
+    per-page DPI) and in-memory hand-off as process_pdf, so both write byte-identical output.
+    Kept as the baseline for --benchmark-pipeline.
+    """
+    base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    output_file = os.path.join(output_dir, base_name + ".txt")
+    plan = plan_pdf_pages(pdf_path, count_pdf_pages(pdf_path), engine.resize_shape, text_layer)
+    pages = dict(rasterize_pages(pdf_path, [(page_number, dpi) for page_number, kind, dpi in plan if kind == "ocr"]))
     combined_text = ""
-    # Use a temporary directory to store the page images
-    with tempfile.TemporaryDirectory() as temp_dir:
-        for i, page in enumerate(pages):
-            temp_image_path = os.path.join(temp_dir, f"page_{i+1}.jpeg")
-            page.save(temp_image_path, "JPEG")
-            print(f"  Processing page {i+1}...")
-            page_text = process_image_file(temp_image_path, model, max_tokens, temp_val, prompt, resize_shape, clean)
-            combined_text += f"--- Page {i+1} ---\n" + page_text + "\n"
-    
-    # Save the combined text output to a file
+    for page_number, kind, value in plan:
+        if kind == "ocr":
+            page_text = process_image_file(pages[page_number], engine, clean, label=f"{pdf_path} page {page_number}")
+        else:
+            page_text = value
+        combined_text += format_page_section(page_number, page_text)
     with open(output_file, "w", encoding="utf-8") as f:
         f.write(combined_text)
+
+def process_image_list(image_paths, engine, output_file, clean=False, resume=False):
+    """
+    OCR a list of images into one output file with a "--- File: name ---" section per image,
+    checkpointing each section as it finishes (see CheckpointedOutput).
+    """
+    if resume and os.path.exists(output_file) and not os.path.exists(output_file + ".journal.jsonl"):
+        print(f"Output {output_file} already complete. Skipping.")
+        return
+    output = CheckpointedOutput(output_file, resume=resume)
+    pending = [image_path for image_path in image_paths if not output.is_done(os.path.basename(image_path))]
+    for start in range(0, len(pending), engine.max_batch_size):
+        batch = pending[start:start + engine.max_batch_size]
+        for image_path in batch:
+            print(f"Processing image: {os.path.basename(image_path)}")
+        for image_path, file_text in zip(batch, process_image_batch(batch, engine, clean)):
+            file_name = os.path.basename(image_path)
+            output.write(file_name, format_file_section(file_name, file_text))
+    output.commit()
     print(f"Output saved to: {output_file}")
 
-def process_image_folder(folder_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean=False):
+def process_image_folder(folder_path, engine, output_dir, clean=False, resume=False):
     """
     Process all image files in a folder in alphabetical order and combine the OCR outputs
     into a single text file named after the folder.
     """
     folder_name = os.path.basename(os.path.normpath(folder_path))
     output_file = os.path.join(output_dir, folder_name + ".txt")
-    
-    # Consider common image extensions
-    image_extensions = ('*.jpg', '*.jpeg', '*.png', '*.bmp', '*.tif', '*.tiff')
-    image_files = []
-    for ext in image_extensions:
-        image_files.extend(glob.glob(os.path.join(folder_path, ext)))
-    image_files.sort()
+
+    image_files = list_image_files(folder_path)
 
     if not image_files:
         print(f"No image files found in folder: {folder_path}")
         return
 
-    combined_text = ""
-    for image_path in image_files:
-        print(f"Processing image: {os.path.basename(image_path)}")
-        file_text = process_image_file(image_path, model, max_tokens, temp_val, prompt, resize_shape, clean)
-        combined_text += f"--- File: {os.path.basename(image_path)} ---\n" + file_text + "\n"
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(combined_text)
-    print(f"Output saved to: {output_file}")
+    process_image_list(image_files, engine, output_file, clean, resume)
 
-def process_pdf_folder(folder_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean=False):
+def process_pdf_folder(folder_path, engine, output_dir, clean=False, resume=False, text_layer="auto"):
     """
     Process all PDF files in a given folder individually.
     Each PDF is processed by converting its pages to images and saving the results in a separate text file.
@@ -136,40 +916,441 @@ def process_pdf_folder(folder_path, model, max_tokens, temp_val, prompt, resize_
         return
     for pdf_path in sorted(pdf_files):
         print(f"Processing PDF: {pdf_path}")
-        process_pdf(pdf_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean)
+        process_pdf(pdf_path, engine, output_dir, clean, resume, text_layer)
 
-def process_single_image(image_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean=False):
+def process_single_image(image_path, engine, output_dir, clean=False, resume=False):
     """
     Process a single image file with the OCR model and save the output to a text file named after the image.
     """
     base_name = os.path.splitext(os.path.basename(image_path))[0]
     output_file = os.path.join(output_dir, base_name + ".txt")
     print(f"\nProcessing Image: {image_path}")
+    if resume and os.path.exists(output_file):
+        print(f"Output {output_file} already complete. Skipping.")
+        return
 
-    text_output = process_image_file(image_path, model, max_tokens, temp_val, prompt, resize_shape, clean)
+    text_output = process_image_file(image_path, engine, clean)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(text_output)
+    write_text_atomic(output_file, text_output)
     print(f"Output saved to: {output_file}")
 
-def process_multiple_images(image_paths, model, max_tokens, temp_val, prompt, resize_shape, output_dir, merge=False, clean=False):
+def process_multiple_images(image_paths, engine, output_dir, merge=False, clean=False, resume=False):
     """
     Process a list of image files. If merge is True, combine the outputs into a single text file.
     Otherwise, process each image individually and save separate text files.
     """
     if merge:
-        combined_text = ""
-        for image_path in image_paths:
-            text_out = process_image_file(image_path, model, max_tokens, temp_val, prompt, resize_shape, clean)
-            combined_text += f"--- File: {os.path.basename(image_path)} ---\n" + text_out + "\n"
         base_name = os.path.splitext(os.path.basename(image_paths[0]))[0]
         output_file = os.path.join(output_dir, base_name + ".txt")
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(combined_text)
-        print(f"Output saved to: {output_file}")
+        process_image_list(image_paths, engine, output_file, clean, resume)
     else:
         for image_path in image_paths:
-            process_single_image(image_path, model, max_tokens, temp_val, prompt, resize_shape, output_dir, clean)
+            process_single_image(image_path, engine, output_dir, clean, resume)
+
+# --- Multi-worker scheduler ---
+# All pages of all documents go into one global queue served by a pool of worker processes,
+# each holding its own loaded model. Results are reassembled per document in page order and
+# rendered with the same section formatting as the serial path, so the output files are identical.
+
+_WORKER_ENGINE = None  # per-process engine, created by _init_ocr_worker
+
+class ScheduledDocument:
+    """
+    One output file of the scheduler: its page sources and section labels.
+    kind is "pdf" (--- Page N --- sections), "files" (--- File: name --- sections) or "single" (raw text).
+    Pages come back in any order; each section is checkpointed (CheckpointedOutput, keyed by its label
+    like the serial path) as soon as every page before it is in, so --resume works here too.
+    """
+
+    def __init__(self, kind, output_file, sources, labels):
+        self.kind = kind
+        self.output_file = output_file
+        self.sources = sources
+        self.labels = labels
+        self.texts = {}      # page index -> text, until its section is written
+        self.next_index = 0  # first page whose section is not written yet
+        self.failed = False
+        self.output = None   # CheckpointedOutput, opened at the first section
+
+    def pending_indices(self, resume=False):
+        """
+        Indices of the pages still to OCR. With resume, sections journaled by an earlier run are skipped.
+        """
+        if resume and self.kind != "single":
+            output = CheckpointedOutput(self.output_file, resume=True)
+            output.close()
+            while self.next_index < len(self.labels) and output.is_done(self.labels[self.next_index]):
+                self.next_index += 1
+            if self.next_index:
+                print(f"  Resuming {os.path.basename(self.output_file)} at section {self.next_index + 1}/{len(self.labels)}")
+        return list(range(self.next_index, len(self.sources)))
+
+    def add(self, page_index, text, resume=False):
+        """
+        Record one finished page, checkpoint the sections that are now in order, and commit the
+        output once every page is in. text None (the page could not be rasterized) fails the document;
+        the sections written so far stay in the partial output for --resume.
+        """
+        if self.failed:
+            return
+        if text is None:
+            self.failed = True
+            if self.output is not None:
+                self.output.close()
+            return
+        self.texts[page_index] = text
+        self.flush(resume)
+
+    def flush(self, resume=False):
+        if self.kind == "single":
+            if 0 in self.texts:
+                write_text_atomic(self.output_file, self.texts.pop(0))
+                self.next_index = 1
+                print(f"Output saved to: {self.output_file}")
+            return
+        format_section = format_page_section if self.kind == "pdf" else format_file_section
+        while self.next_index in self.texts:
+            if self.output is None:
+                self.output = CheckpointedOutput(self.output_file, resume=resume)
+            label = self.labels[self.next_index]
+            self.output.write(label, format_section(label, self.texts.pop(self.next_index)))
+            self.next_index += 1
+        if self.next_index == len(self.sources):
+            if self.output is None:  # every section was journaled by an earlier run
+                self.output = CheckpointedOutput(self.output_file, resume=True)
+            self.output.commit()
+            print(f"Output saved to: {self.output_file}")
+
+def build_scheduled_documents(args):
+    """
+    Translate the command-line inputs into ScheduledDocuments, mirroring the serial entry points.
+    """
+    documents = []
+
+    def already_done(output_file):
+        # Same test as the serial paths: an output with a journal next to it is an interrupted rerun.
+        if args.resume and os.path.exists(output_file) and not os.path.exists(output_file + ".journal.jsonl"):
+            print(f"Output {output_file} already complete. Skipping.")
+            return True
+        return False
+
+    def add_pdf(pdf_path):
+        base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+        if already_done(os.path.join(args.output_dir, base_name + ".txt")):
+            return
+        try:
+            total_pages = count_pdf_pages(pdf_path)
+        except Exception as e:
+            sys.stderr.write(f"\nFailed to convert {pdf_path} to images: {e}\n")
+            return
+        page_numbers = list(range(1, total_pages + 1))
+        sources = [
+            ("text", value) if kind == "text" else ("pdf", pdf_path, page_number, value)
+            for page_number, kind, value in plan_pdf_pages(pdf_path, total_pages, args.resize_shape, args.text_layer)
+        ]
+        documents.append(ScheduledDocument("pdf", os.path.join(args.output_dir, base_name + ".txt"), sources, page_numbers))
+
+    def add_images(kind, output_name, image_paths):
+        if already_done(os.path.join(args.output_dir, output_name + ".txt")):
+            return
+        sources = [("image", image_path) for image_path in image_paths]
+        labels = [os.path.basename(image_path) for image_path in image_paths]
+        documents.append(ScheduledDocument(kind, os.path.join(args.output_dir, output_name + ".txt"), sources, labels))
+
+    if args.pdfs:
+        for pdf_path in args.pdfs:
+            if os.path.isfile(pdf_path) and pdf_path.lower().endswith(".pdf"):
+                add_pdf(pdf_path)
+            else:
+                print(f"Skipping non-PDF file: {pdf_path}")
+    elif args.pdf_folder:
+        pdf_files = glob.glob(os.path.join(args.pdf_folder, "*.pdf"))
+        if not pdf_files:
+            print(f"No PDF files found in folder: {args.pdf_folder}")
+        for pdf_path in sorted(pdf_files):
+            add_pdf(pdf_path)
+    elif args.image_folder:
+        image_files = list_image_files(args.image_folder)
+        if image_files:
+            add_images("files", os.path.basename(os.path.normpath(args.image_folder)), image_files)
+        else:
+            print(f"No image files found in folder: {args.image_folder}")
+    elif args.image_file:
+        add_images("single", os.path.splitext(os.path.basename(args.image_file))[0], [args.image_file])
+    elif args.image_files:
+        if args.merge:
+            add_images("files", os.path.splitext(os.path.basename(args.image_files[0]))[0], args.image_files)
+        else:
+            for image_path in args.image_files:
+                add_images("single", os.path.splitext(os.path.basename(image_path))[0], [image_path])
+    return documents
+
+def _init_ocr_worker(engine_settings):
+    """
+    Pool initializer: load this worker's own copy of the model.
+    """
+    global _WORKER_ENGINE
+    (backend_name, model, max_tokens, temp_val, prompt, resize_shape, cache_settings,
+     max_batch_size, batch_memory_bytes, backend_opts) = engine_settings
+    cache = OCRCache(*cache_settings) if cache_settings else None
+    _WORKER_ENGINE = OCREngine.create(backend_name, model, max_tokens, temp_val, prompt, resize_shape, cache=cache,
+                                      max_batch_size=max_batch_size, batch_memory_bytes=batch_memory_bytes, **backend_opts)
+
+def _ocr_worker_task(task):
+    """
+    OCR a group of pages from one document in a worker process, as micro-batches of the worker's
+    engine. PDF pages are rasterized by the worker itself, so only paths and page numbers cross
+    the process boundary. Returns ([(doc_index, page_index, text or None on rasterization failure), ...],
+    stats) where stats holds the worker's load time, the per-page latencies and cache counts of this task.
+    """
+    doc_index, pages, clean = task
+    texts = {}
+    images, image_indices, labels = [], [], []
+    for page_index, source in pages:
+        if source[0] == "text":
+            texts[page_index] = source[1]
+        elif source[0] == "image":
+            images.append(source[1])
+            image_indices.append(page_index)
+            labels.append(source[1])
+        else:
+            _, pdf_path, page_number, dpi = source
+            try:
+                images.append(convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)[0])
+            except Exception as e:
+                sys.stderr.write(f"\nFailed to convert {pdf_path} to images: {e}\n")
+                texts[page_index] = None
+                continue
+            image_indices.append(page_index)
+            labels.append(f"{pdf_path} page {page_number}")
+    for page_index, text in zip(image_indices, process_image_batch(images, _WORKER_ENGINE, clean, labels=labels)):
+        texts[page_index] = text
+    for image in images:
+        if isinstance(image, Image.Image):
+            image.close()
+    engine = _WORKER_ENGINE
+    latencies, engine.latencies = engine.latencies, []
+    stats = {
+        "load_seconds": engine.load_seconds,
+        "latencies": latencies,
+        "cache": engine.cache.take_counts() if engine.cache is not None else (0, 0, 0),
+    }
+    return [(doc_index, page_index, texts[page_index]) for page_index, _ in pages], stats
+
+def schedule_tasks(documents, batch_size, clean=False, resume=False):
+    """
+    Split the pending pages of every document into tasks of consecutive pages holding at most
+    batch_size pages to OCR (pages answered by the text layer ride along).
+    """
+    tasks = []
+    for doc_index, document in enumerate(documents):
+        pending = document.pending_indices(resume)
+        if not pending:
+            document.flush(resume)  # finished by an earlier run, only the commit was missing
+        group, group_ocr = [], 0
+        for page_index in pending:
+            source = document.sources[page_index]
+            if source[0] != "text" and group_ocr == batch_size:
+                tasks.append((doc_index, group, clean))
+                group, group_ocr = [], 0
+            group.append((page_index, source))
+            group_ocr += source[0] != "text"
+        if group:
+            tasks.append((doc_index, group, clean))
+    return tasks
+
+def run_scheduler(documents, engine_settings, workers, clean=False, resume=False):
+    """
+    Serve every page of every document from one shared queue with `workers` processes (in groups
+    of up to the engine's batch size, see schedule_tasks), checkpointing each document's sections
+    in page order and committing it as soon as its last page is back. Documents with a page that
+    could not be rasterized are listed at the end, followed by the workers' combined latency and
+    cache report.
+    """
+    backend_name, cache_settings, max_batch_size = engine_settings[0], engine_settings[6], engine_settings[7]
+    tasks = schedule_tasks(documents, max_batch_size, clean, resume)
+    if not tasks:
+        return
+    total_pages = sum(len(pages) for _, pages, _ in tasks)
+    text_layer_pages = sum(1 for _, pages, _ in tasks for _, source in pages if source[0] == "text")
+    print(f"\nScheduling {total_pages} pages from {len(documents)} documents on {workers} workers"
+          + (f" in batches of up to {max_batch_size}" if max_batch_size > 1 else ""))
+    if text_layer_pages:
+        print(f"  {text_layer_pages} pages use the embedded text layer (inference skipped)")
+    start = time.perf_counter()
+    done = failed_pages = 0
+    load_seconds, latencies, cache_counts = 0.0, [], [0, 0, 0]
+    with multiprocessing.Pool(workers, initializer=_init_ocr_worker, initargs=(engine_settings,)) as pool:
+        for results, stats in pool.imap_unordered(_ocr_worker_task, tasks):
+            # The workers load their models in parallel, so the slowest load is what the run waited for.
+            load_seconds = max(load_seconds, stats["load_seconds"])
+            latencies.extend(stats["latencies"])
+            cache_counts = [total + count for total, count in zip(cache_counts, stats["cache"])]
+            for doc_index, page_index, text in results:
+                done += 1
+                failed_pages += text is None
+                documents[doc_index].add(page_index, text, resume)
+                if done % 10 == 0 or done == total_pages:
+                    elapsed = time.perf_counter() - start
+                    print(f"  {done}/{total_pages} pages done ({done / max(elapsed, 1e-9):.2f} pages/sec)")
+    elapsed = time.perf_counter() - start
+    failed = [document for document in documents if document.failed]
+    print(f"\nScheduler finished {total_pages - failed_pages}/{total_pages} pages in {elapsed:.2f}s: "
+          f"{total_pages / max(elapsed, 1e-9):.2f} pages/sec with {workers} workers")
+    if failed:
+        print(f"{len(failed)} of {len(documents)} documents could not be finished (pages failed to rasterize):")
+        for document in failed:
+            if document.output is not None:
+                print(f"  {document.output_file}: {document.next_index}/{len(document.sources)} sections kept in "
+                      f"{document.output.partial_path}; re-run with --resume to finish it.")
+            else:
+                print(f"  {document.output_file}: nothing written")
+
+    print("\n" + latency_summary(backend_name, load_seconds, latencies, text_layer_pages))
+    if cache_settings:
+        cache = OCRCache(*cache_settings)  # picks up the size the workers left on disk
+        cache.hits, cache.misses, cache.evictions = cache_counts
+        print(cache.stats_summary())
+
+def collect_sample_images(args, limit, temp_dir):
+    """
+    Gather up to `limit` page images from the selected input (rasterizing PDF pages into temp_dir).
+    Used by --benchmark-pages.
+    """
+    if args.pdfs or args.pdf_folder:
+        pdf_files = args.pdfs or sorted(glob.glob(os.path.join(args.pdf_folder, "*.pdf")))
+        image_paths = []
+        for pdf_path in pdf_files:
+            remaining = limit - len(image_paths)
+            if remaining <= 0:
+                break
+            pages = convert_from_path(pdf_path, dpi=200, first_page=1, last_page=remaining)
+            for i, page in enumerate(pages):
+                temp_image_path = os.path.join(temp_dir, f"bench_{len(image_paths)}_{i+1}.jpeg")
+                page.save(temp_image_path, "JPEG")
+                image_paths.append(temp_image_path)
+        return image_paths
+    if args.image_folder:
+        return list_image_files(args.image_folder)[:limit]
+    if args.image_file:
+        return [args.image_file]
+    return list(args.image_files)[:limit]
+
+def benchmark_subprocess_path(engine, image_paths, model):
+    """
+    OCR the same pages through the resident engine and through the per-page subprocess path
+    and print the per-page latency of both.
+    """
+    subprocess_engine = OCREngine(
+        SubprocessBackend(model), model, engine.max_tokens, engine.temp_val, engine.prompt, engine.resize_shape
+    )
+    for image_path in image_paths:
+        print(f"  Benchmarking {os.path.basename(image_path)}...")
+        process_image_file(image_path, engine)
+        process_image_file(image_path, subprocess_engine)
+    print("\nPer-page latency:")
+    print("  in-process: " + engine.latency_summary())
+    print("  subprocess: " + subprocess_engine.latency_summary())
+    if engine.latencies and subprocess_engine.latencies:
+        speedup = statistics.mean(subprocess_engine.latencies) / max(statistics.mean(engine.latencies), 1e-9)
+        print(f"  in-process engine is {speedup:.1f}x faster per page")
+
+def make_synthetic_page(page_number, size=(612, 792)):
+    """
+    A white page with a few lines of black text (letter size at 72 dpi by default).
+    """
+    from PIL import ImageDraw
+
+    page = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(page)
+    for line in range(20):
+        draw.text((50, 60 + line * 30), f"Synthetic page {page_number}, line {line + 1}: the quick brown fox.", fill="black")
+    return page
+
+def make_synthetic_pdf(pdf_path, num_pages):
+    """
+    Write a simple text-on-white PDF with num_pages letter-size pages (for benchmarks).
+    """
+    page_iter = (make_synthetic_page(i) for i in range(1, num_pages + 1))
+    first = next(page_iter)
+    first.save(pdf_path, "PDF", resolution=72.0, save_all=True, append_images=page_iter)
+
+def benchmark_pipeline(engine, num_pages, clean=False):
+    """
+    Time the serial process_pdf against the pipelined one on a synthetic num_pages PDF.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, num_pages)
+        serial_dir = os.path.join(temp_dir, "serial")
+        pipelined_dir = os.path.join(temp_dir, "pipelined")
+        os.makedirs(serial_dir)
+        os.makedirs(pipelined_dir)
+
+        start = time.perf_counter()
+        process_pdf_serial(pdf_path, engine, serial_dir, clean)
+        serial_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        process_pdf(pdf_path, engine, pipelined_dir, clean)
+        pipelined_seconds = time.perf_counter() - start
+
+        with open(os.path.join(serial_dir, "synthetic.txt"), "rb") as a, open(os.path.join(pipelined_dir, "synthetic.txt"), "rb") as b:
+            identical = a.read() == b.read()
+
+    print(f"\nPipeline benchmark ({num_pages}-page synthetic PDF, {engine.backend.name} backend):")
+    print(f"  serial:    {serial_seconds:.2f}s ({num_pages} pages held in memory)")
+    print(f"  pipelined: {pipelined_seconds:.2f}s (at most {RASTER_BATCH_PAGES + PIPELINE_QUEUE_SIZE} pages in flight)")
+    print(f"  speedup:   {serial_seconds / max(pipelined_seconds, 1e-9):.2f}x, outputs identical: {identical}")
+
+def benchmark_handoff(resize_shape, num_pages=20):
+    """
+    Micro-benchmark of the per-page hand-off to the model. The temp-file path rasterizes at RASTER_DPI,
+    saves a JPEG, reads and decodes it again and resizes it; the in-memory path has poppler render
+    straight at the DPI that yields --resize-shape and passes the PIL image on.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "synthetic.pdf")
+        make_synthetic_pdf(pdf_path, num_pages)
+
+        bytes_written = 0
+        start = time.perf_counter()
+        for page_number in range(1, num_pages + 1):
+            page = convert_from_path(pdf_path, dpi=RASTER_DPI, first_page=page_number, last_page=page_number)[0]
+            temp_image_path = os.path.join(temp_dir, f"page_{page_number}.jpeg")
+            page.save(temp_image_path, "JPEG")
+            bytes_written += os.path.getsize(temp_image_path)
+            resize_to_shape(load_image(temp_image_path).convert("RGB"), resize_shape)
+            os.remove(temp_image_path)
+        temp_file_seconds = (time.perf_counter() - start) / num_pages
+
+        start = time.perf_counter()
+        for page_number in range(1, num_pages + 1):
+            convert_from_path(pdf_path, dpi=page_dpi((612, 792), resize_shape), first_page=page_number, last_page=page_number)[0].convert("RGB")
+        in_memory_seconds = (time.perf_counter() - start) / num_pages
+
+    print(f"\nPage hand-off micro-benchmark ({num_pages} pages, resize shape {resize_shape}):")
+    print(f"  temp JPEG:  {temp_file_seconds * 1000:.1f} ms/page, {bytes_written / num_pages / 1024:.0f} KiB written per page")
+    print(f"  in memory:  {in_memory_seconds * 1000:.1f} ms/page, 0 bytes written")
+    print(f"  saved:      {(temp_file_seconds - in_memory_seconds) * 1000:.1f} ms/page")
+
+def benchmark_batch_sizes(engine, num_pages, batch_sizes=(1, 2, 4, 8, 16)):
+    """
+    OCR the same synthetic pages with each micro-batch size and report pages/sec,
+    checking that every page's output matches the batch-size-1 result.
+    """
+    pages = [resize_to_shape(make_synthetic_page(i, size=(1275, 1650)), engine.resize_shape) for i in range(1, num_pages + 1)]
+    reference = None
+    print(f"\nBatch size sweep ({num_pages} pages, {engine.backend.name} backend, memory budget {engine.batch_memory_bytes / 1024 ** 2:.0f} MB):")
+    for batch_size in batch_sizes:
+        engine.max_batch_size = batch_size
+        start = time.perf_counter()
+        results = engine.ocr_batch(pages)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = results
+        identical = results == reference
+        print(f"  batch {batch_size:>3}: {elapsed:.2f}s, {num_pages / max(elapsed, 1e-9):.2f} pages/sec, identical to batch 1: {identical}")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -196,9 +1377,34 @@ Processing Multiple Image Files (separate):
 
 Using Clean Text Output:
     python A_mlxOlmOCR.py --image-file /path/to/your/image.png --clean_txt --output-dir ./outputs
+
+Benchmarking the Resident Engine Against the Subprocess Path:
+    python A_mlxOlmOCR.py --pdfs /path/to/file1.pdf --benchmark-pages 5
+
+Benchmarking the Pipelined PDF Path:
+    python A_mlxOlmOCR.py --benchmark-pipeline 200 --backend standin --standin-page-seconds 0.05
+
+Processing a PDF Folder with Several Worker Processes:
+    python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --workers 8 --output-dir ./outputs
+
+Micro-benchmarking the In-Memory Page Hand-off:
+    python A_mlxOlmOCR.py --benchmark-handoff 20
+
+Resuming an Interrupted Run:
+    python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --resume --output-dir ./outputs
+
+Always OCR, Ignoring Embedded PDF Text:
+    python A_mlxOlmOCR.py --pdfs /path/to/file1.pdf --text-layer never --output-dir ./outputs
+
+Batched Inference and a Batch Size Sweep:
+    python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --batch-size 8 --output-dir ./outputs
+    python A_mlxOlmOCR.py --benchmark-batch 64 --backend standin --standin-page-seconds 0.05
+
+Adding Finished Outputs to the Search Index:
+    python A_mlxOlmOCR.py --pdf-folder /path/to/pdf_folder --index --output-dir ./outputs
 """
     )
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument("--pdfs", nargs="+", help="List of PDF file paths to process.")
     group.add_argument("--pdf-folder", help="Path to a folder containing PDF files to process individually.")
     group.add_argument("--image-folder", help="Path to a folder containing images to process.")
@@ -213,34 +1419,98 @@ Using Clean Text Output:
     parser.add_argument("--output-dir", default=".", help="Directory to save the output text files.")
     parser.add_argument("--merge", action="store_true", help="If processing multiple image files with --image-files, merge outputs into one text file. Otherwise, create separate files.")
     parser.add_argument("--clean_txt", action="store_true", help="If set, output text files will contain only the actual model outputs (cleaned), extracted from the JSON response.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mlx_vlm", help="OCR backend: mlx_vlm keeps the model loaded in-process, subprocess runs one mlx_vlm.generate per page, standin is a CPU stand-in for tests.")
+    parser.add_argument("--standin-load-seconds", type=float, default=0.0, help="Simulated model load time for the standin backend.")
+    parser.add_argument("--standin-page-seconds", type=float, default=0.0, help="Simulated per-page inference time for the standin backend.")
+    parser.add_argument("--benchmark-pages", type=int, default=0, help="Instead of writing outputs, OCR this many pages through both the in-process engine and the subprocess path and report per-page latency.")
+    parser.add_argument("--cache-dir", default=os.path.join(os.path.expanduser("~"), ".cache", "A_mlxOlmOCR"), help="Directory for the on-disk cache of raw model output per page.")
+    parser.add_argument("--cache-max-mb", type=float, default=512, help="Size limit of the page cache in MB; least recently used pages are evicted first.")
+    parser.add_argument("--no-cache", action="store_true", help="Always run inference, ignoring and not updating the page cache.")
+    parser.add_argument("--benchmark-handoff", type=int, default=0, metavar="PAGES", help="Micro-benchmark the temp-JPEG page hand-off against the in-memory one on a synthetic PDF with this many pages (no input needed).")
+    parser.add_argument("--resume", action="store_true", help="Continue interrupted outputs from their .journal.jsonl checkpoint and skip outputs that are already complete.")
+    parser.add_argument("--text-layer", choices=("auto", "never", "only"), default="auto", help="PDF pages with a usable embedded text layer: auto = take that text and skip the model, never = always OCR, only = never run the model.")
+    parser.add_argument("--batch-size", type=int, default=1, help="Maximum number of pages per model call (micro-batch). Batches shrink automatically to fit --batch-memory-mb.")
+    parser.add_argument("--batch-memory-mb", type=float, default=4096, help="Estimated memory budget for one micro-batch of page images.")
+    parser.add_argument("--benchmark-batch", type=int, default=0, metavar="PAGES", help="Sweep micro-batch sizes 1-16 over this many synthetic pages and report pages/sec (no input needed).")
+    parser.add_argument("--workers", type=int, default=1, help="Number of OCR worker processes, each with its own loaded model. Above 1, pages from all inputs are served from one shared queue.")
+    parser.add_argument("--index", action="store_true", help="Add every finished output to the local full-text search index (see transcriptIndex.py).")
+    parser.add_argument("--benchmark-pipeline", type=int, default=0, metavar="PAGES", help="Benchmark the serial vs. pipelined PDF path on a synthetic PDF with this many pages (no input needed).")
     args = parser.parse_args()
+    if not (args.benchmark_pipeline or args.benchmark_handoff or args.benchmark_batch) and not (args.pdfs or args.pdf_folder or args.image_folder or args.image_file or args.image_files):
+        parser.error("one of the arguments --pdfs --pdf-folder --image-folder --image-file --image-files is required")
 
     # Ensure the output directory exists
     os.makedirs(args.output_dir, exist_ok=True)
+    if args.index:
+        from transcriptIndex import TranscriptIndex
+        global search_index
+        search_index = TranscriptIndex()
+
+    if args.benchmark_handoff > 0:
+        benchmark_handoff(args.resize_shape, args.benchmark_handoff)
+        return
+
+    # Load the model once; every page below goes through this engine.
+    backend_opts = {}
+    if args.backend == "standin":
+        backend_opts = dict(standin_load_seconds=args.standin_load_seconds, standin_page_seconds=args.standin_page_seconds)
+    # Benchmarks must measure inference, so they never use the page cache.
+    benchmarking = args.benchmark_pages > 0 or args.benchmark_pipeline > 0 or args.benchmark_batch > 0
+    cache_settings = None
+    if not (args.no_cache or benchmarking):
+        cache_settings = (args.cache_dir, int(args.cache_max_mb * 1024 * 1024))
+
+    if args.workers > 1 and not benchmarking:
+        # Each worker process loads its own model; pages from all inputs share one queue.
+        engine_settings = (args.backend, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, cache_settings,
+                           args.batch_size, int(args.batch_memory_mb * 1024 * 1024), backend_opts)
+        run_scheduler(build_scheduled_documents(args), engine_settings, args.workers, clean=args.clean_txt, resume=args.resume)
+        return
+
+    cache = OCRCache(*cache_settings) if cache_settings else None
+    engine = OCREngine.create(args.backend, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, cache=cache,
+                              max_batch_size=args.batch_size, batch_memory_bytes=int(args.batch_memory_mb * 1024 * 1024), **backend_opts)
+    print(f"Loaded {args.backend} backend for {args.model} in {engine.load_seconds:.2f}s")
+
+    if args.benchmark_pages > 0:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image_paths = collect_sample_images(args, args.benchmark_pages, temp_dir)
+            benchmark_subprocess_path(engine, image_paths, args.model)
+        return
+    if args.benchmark_pipeline > 0:
+        benchmark_pipeline(engine, args.benchmark_pipeline, clean=args.clean_txt)
+        return
+    if args.benchmark_batch > 0:
+        benchmark_batch_sizes(engine, args.benchmark_batch)
+        return
 
     if args.pdfs:
         for pdf_path in args.pdfs:
             if os.path.isfile(pdf_path) and pdf_path.lower().endswith(".pdf"):
-                process_pdf(pdf_path, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, args.output_dir, clean=args.clean_txt)
+                process_pdf(pdf_path, engine, args.output_dir, clean=args.clean_txt, resume=args.resume, text_layer=args.text_layer)
             else:
                 print(f"Skipping non-PDF file: {pdf_path}")
     elif args.pdf_folder:
         if os.path.isdir(args.pdf_folder):
-            process_pdf_folder(args.pdf_folder, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, args.output_dir, clean=args.clean_txt)
+            process_pdf_folder(args.pdf_folder, engine, args.output_dir, clean=args.clean_txt, resume=args.resume, text_layer=args.text_layer)
         else:
             print(f"Provided PDF folder is not a directory: {args.pdf_folder}")
     elif args.image_folder:
         if os.path.isdir(args.image_folder):
-            process_image_folder(args.image_folder, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, args.output_dir, clean=args.clean_txt)
+            process_image_folder(args.image_folder, engine, args.output_dir, clean=args.clean_txt, resume=args.resume)
         else:
             print(f"Provided image folder is not a directory: {args.image_folder}")
     elif args.image_file:
         if os.path.isfile(args.image_file):
-            process_single_image(args.image_file, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, args.output_dir, clean=args.clean_txt)
+            process_single_image(args.image_file, engine, args.output_dir, clean=args.clean_txt, resume=args.resume)
         else:
             print(f"Provided image file does not exist: {args.image_file}")
     elif args.image_files:
-        process_multiple_images(args.image_files, args.model, args.max_tokens, args.temp, args.prompt, args.resize_shape, args.output_dir, merge=args.merge, clean=args.clean_txt)
+        process_multiple_images(args.image_files, engine, args.output_dir, merge=args.merge, clean=args.clean_txt, resume=args.resume)
+
+    print("\n" + engine.latency_summary())
+    if cache is not None:
+        print(cache.stats_summary())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
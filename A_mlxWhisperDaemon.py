@@ -0,0 +1,515 @@
+"""
+Shared local transcription daemon: one warm Whisper model behind a Unix socket.
+
+Every Whisper script used to call mlx_whisper.transcribe() itself, so each running script
+loaded its own copy of whisper-large-v3-turbo. Start this daemon once and the scripts send
+their files here instead; jobs from all of them go through one priority queue and segments
+are streamed back as soon as the backend produces them.
+
+Example Usages:
+
+1. Start the daemon (keeps the model loaded until stopped):
+   python A_mlxWhisperDaemon.py serve --backend mlx_whisper --model mlx-community/whisper-large-v3-turbo
+
+2. Transcribe a file through the daemon, printing segments as they arrive:
+   python A_mlxWhisperDaemon.py transcribe /path/to/audio.mp3 --priority 5
+
+3. Show what the daemon is doing:
+   python A_mlxWhisperDaemon.py status
+
+From Python (the other scripts do this):
+   from A_mlxWhisperDaemon import transcribe
+   result = transcribe(path, model_id=MODEL_ID)   # same shape as mlx_whisper.transcribe()
+
+Notes:
+- Backends: mlx_whisper, faster_whisper (WhisperModel), and two without a model for tests: fake
+  (placeholder text) and tones (decodes the tone-coded fixture audio made by A_whisperAudio).
+- Lower --priority values are served first; equal priorities are served in arrival order.
+- If no daemon is listening, or it holds a different model or backend than transcribe() asked for, it
+  falls back to an in-process backend (loaded once per process).
+- transcribe() also takes 16 kHz mono float32 arrays (e.g. speech-only audio from A_whisperAudio);
+  they are sent to the daemon as raw samples after the request line.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import tempfile
+import threading
+import itertools
+import socketserver
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    "WHISPER_DAEMON_SOCKET", os.path.join(tempfile.gettempdir(), "whisper_daemon.sock")
+)
+DEFAULT_MODEL_ID = "mlx-community/whisper-large-v3-turbo"
+DEFAULT_PRIORITY = 10
+
+# The fake backend pretends every FAKE_BYTES_PER_SECOND bytes of input are one second of speech.
+FAKE_BYTES_PER_SECOND = 16000
+FAKE_SEGMENT_SECONDS = 5.0
+
+# The tones backend reads word i of TONE_WORDS as a steady tone at TONE_BASE_HZ + i * TONE_STEP_HZ.
+TONE_WORDS = [
+    "alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel", "india", "juliett",
+    "kilo", "lima", "mike", "november", "oscar", "papa", "quebec", "romeo", "sierra", "tango",
+    "uniform", "victor", "whiskey", "xray", "yankee", "zulu",
+]
+TONE_BASE_HZ = 400.0
+TONE_STEP_HZ = 60.0
+TONE_MIN_WORD_SECONDS = 0.12  # shorter bursts (e.g. a word cut at a window edge) are not decoded
+TONE_SEGMENT_GAP_SECONDS = 0.5  # a longer pause starts a new segment
+
+# --- Backends ---
+# Every backend exposes transcribe(audio, **options) -> (iterator of segment dicts, info dict).
+# A segment dict has "id", "start", "end" and "text"; info may carry "language" and the full "text".
+
+class MlxWhisperBackend:
+    """
+    mlx_whisper with the model pinned in memory. mlx_whisper keeps the last model it loaded,
+    so one warm-up call at start-up makes every later job skip the load.
+    """
+    name = "mlx_whisper"
+
+    def __init__(self, model_id):
+        import numpy as np
+        import mlx_whisper
+        self.model_id = model_id
+        self._mlx_whisper = mlx_whisper
+        # One second of silence loads the weights now instead of on the first real job.
+        mlx_whisper.transcribe(np.zeros(16000, dtype=np.float32), path_or_hf_repo=model_id)
+
+    def transcribe(self, audio, **options):
+        result = self._mlx_whisper.transcribe(audio, path_or_hf_repo=self.model_id, **options)
+        segments = (
+            {"id": seg.get("id", i), "start": seg["start"], "end": seg["end"], "text": seg["text"]}
+            for i, seg in enumerate(result.get("segments", []))
+        )
+        return segments, {"language": result.get("language"), "text": result.get("text", "")}
+
+class FasterWhisperBackend:
+    """
+    faster_whisper's WhisperModel. Its segments are a lazy generator, so they stream while decoding runs.
+    """
+    name = "faster_whisper"
+
+    def __init__(self, model_id):
+        from faster_whisper import WhisperModel
+        self.model_id = model_id
+        self.model = WhisperModel(model_id)
+
+    def transcribe(self, audio, **options):
+        segments, info = self.model.transcribe(audio, **options)
+        stream = (
+            {"id": seg.id, "start": seg.start, "end": seg.end, "text": seg.text}
+            for seg in segments
+        )
+        return stream, {"language": getattr(info, "language", None)}
+
+class FakeBackend:
+    """
+    No model at all: emits one FAKE_SEGMENT_SECONDS segment per chunk of the input's duration
+    (file size / FAKE_BYTES_PER_SECOND, or len(array) / 16000 for in-memory audio).
+    realtime_factor > 0 sleeps that fraction of each segment's duration to mimic decoding.
+    """
+    name = "fake"
+
+    def __init__(self, model_id, realtime_factor=0.0):
+        self.model_id = model_id
+        self.realtime_factor = realtime_factor
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            duration = os.path.getsize(audio) / FAKE_BYTES_PER_SECOND
+            label = os.path.basename(audio)
+        else:
+            duration = len(audio) / 16000
+            label = "array"
+
+        def segments():
+            start, index = 0.0, 0
+            while start < duration:
+                end = min(start + FAKE_SEGMENT_SECONDS, duration)
+                time.sleep((end - start) * self.realtime_factor)
+                yield {"id": index, "start": start, "end": end, "text": f" [{label} {start:.0f}-{end:.0f}s]"}
+                start, index = end, index + 1
+
+        return segments(), {"language": options.get("language", "en")}
+
+class ToneBackend:
+    """
+    A real (if trivial) CPU recognizer for fixtures: finds tone bursts by frame energy, names each by its
+    FFT peak and groups words into segments at pauses. Works on 16 kHz arrays or files (via ffmpeg).
+    work_factor repeats a full-length spectrogram that many times, so decoding costs CPU in proportion
+    to the audio length like a real model does.
+    """
+    name = "tones"
+
+    def __init__(self, model_id, work_factor=0):
+        self.model_id = model_id
+        self.work_factor = work_factor
+
+    def transcribe(self, audio, **options):
+        import numpy as np
+        if isinstance(audio, str):
+            from A_whisperAudio import load_audio
+            audio = load_audio(audio)
+        audio = np.asarray(audio, dtype=np.float32)
+        frame = 160  # 10 ms
+        count = len(audio) // frame
+        frames = audio[:count * frame].reshape(count, frame)
+        for _ in range(self.work_factor):
+            np.abs(np.fft.rfft(frames, axis=1))
+        voiced = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-10) > -35
+        edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+
+        words = []  # (start, end, word)
+        for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+            if (end - start) * frame < TONE_MIN_WORD_SECONDS * 16000:
+                continue
+            burst = audio[start * frame:end * frame]
+            spectrum = np.abs(np.fft.rfft(burst * np.hanning(len(burst))))
+            frequency = np.argmax(spectrum) * 16000 / len(burst)
+            index = int(round((frequency - TONE_BASE_HZ) / TONE_STEP_HZ))
+            if 0 <= index < len(TONE_WORDS):
+                words.append((start * frame / 16000, end * frame / 16000, TONE_WORDS[index]))
+
+        groups = []
+        for word in words:
+            if groups and word[0] - groups[-1][-1][1] <= TONE_SEGMENT_GAP_SECONDS:
+                groups[-1].append(word)
+            else:
+                groups.append([word])
+        segments = (
+            {"id": i, "start": round(group[0][0], 3), "end": round(group[-1][1], 3),
+             "text": " " + " ".join(w[2] for w in group)}
+            for i, group in enumerate(groups)
+        )
+        return segments, {"language": "en"}
+
+BACKENDS = {
+    "mlx_whisper": MlxWhisperBackend,
+    "faster_whisper": FasterWhisperBackend,
+    "fake": FakeBackend,
+    "tones": ToneBackend,
+}
+
+def make_backend(name, model_id, **backend_opts):
+    """
+    Instantiate the named backend. This is where the model gets loaded.
+    """
+    return BACKENDS[name](model_id, **backend_opts)
+
+# --- Daemon ---
+
+class TranscriptionJob:
+    """
+    One queued file. The worker pushes events (dicts) into `events`; the connection that
+    submitted the job forwards them to its client. None marks the end of the stream.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, audio, priority, options):
+        self.job_id = next(self._ids)
+        self.audio = audio
+        self.label = audio if isinstance(audio, str) else f"<{len(audio) / 16000:.1f}s of samples>"
+        self.priority = priority
+        self.options = options
+        self.events = queue.Queue()
+        self.submitted = time.time()
+
+class TranscriptionDaemon:
+    """
+    Holds the one loaded backend and serves jobs from a priority queue on a single worker thread.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.jobs = queue.PriorityQueue()
+        self._order = itertools.count()
+        self.active_job = None
+        self.jobs_done = 0
+        self.audio_seconds_done = 0.0
+        self.started = time.time()
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def submit(self, audio, priority=DEFAULT_PRIORITY, options=None):
+        job = TranscriptionJob(audio, priority, options or {})
+        self.jobs.put((priority, next(self._order), job))
+        job.events.put({"type": "queued", "job_id": job.job_id, "position": self.jobs.qsize()})
+        return job
+
+    def status(self):
+        active = self.active_job
+        return {
+            "type": "status",
+            "backend": self.backend.name,
+            "model": self.backend.model_id,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "queued_jobs": self.jobs.qsize(),
+            "active_job": active.label if active else None,
+            "jobs_done": self.jobs_done,
+            "audio_seconds_done": round(self.audio_seconds_done, 1),
+        }
+
+    def _work(self):
+        while True:
+            _, _, job = self.jobs.get()
+            self.active_job = job
+            print(f"[Daemon] Job {job.job_id} (priority {job.priority}): {job.label}")
+            job.events.put({"type": "started", "job_id": job.job_id, "wait_seconds": round(time.time() - job.submitted, 2)})
+            start = time.perf_counter()
+            try:
+                segments, info = self.backend.transcribe(job.audio, **job.options)
+                texts = []
+                last_end = 0.0
+                for segment in segments:
+                    texts.append(segment["text"])
+                    last_end = segment["end"]
+                    job.events.put(dict(segment, type="segment"))
+                job.events.put({
+                    "type": "done",
+                    "job_id": job.job_id,
+                    "text": info.get("text") or "".join(texts),
+                    "language": info.get("language"),
+                    "seconds": round(time.perf_counter() - start, 2),
+                })
+                self.jobs_done += 1
+                self.audio_seconds_done += last_end
+            except Exception as e:
+                print(f"[Daemon] Error transcribing {job.label}: {e}")
+                job.events.put({"type": "error", "job_id": job.job_id, "message": str(e)})
+            finally:
+                job.events.put(None)
+                self.active_job = None
+                self.jobs.task_done()
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Newline-delimited JSON. A request is {"cmd": "transcribe", "audio": path, "priority": n, "options": {...}}
+    or {"cmd": "status"}; the reply is a stream of event lines ending with "done", "error" or "status".
+    In-memory audio replaces "audio" with "samples": n, followed by n little-endian float32 samples.
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            self._send({"type": "error", "message": f"bad request: {e}"})
+            return
+        daemon = self.server.transcription_daemon
+        if request.get("cmd") == "status":
+            self._send(daemon.status())
+            return
+        if "samples" in request:
+            import numpy as np
+            audio = np.frombuffer(self.rfile.read(4 * request["samples"]), dtype="<f4")
+            if len(audio) != request["samples"]:
+                self._send({"type": "error", "message": "connection closed while sending samples"})
+                return
+        else:
+            audio = request["audio"]
+        job = daemon.submit(audio, request.get("priority", DEFAULT_PRIORITY), request.get("options"))
+        while True:
+            event = job.events.get()
+            if event is None:
+                break
+            try:
+                self._send(event)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away; let the job finish so the queue keeps moving.
+                continue
+
+    def _send(self, event):
+        self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(backend_name, model_id, socket_path=DEFAULT_SOCKET_PATH, **backend_opts):
+    """
+    Load the backend once and serve transcription jobs on socket_path until interrupted.
+    """
+    if daemon_available(socket_path):
+        print(f"[Daemon] A daemon is already listening on {socket_path}.")
+        return
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # stale socket from a previous run
+    print(f"[Daemon] Loading {backend_name} backend for {model_id}...")
+    start = time.perf_counter()
+    backend = make_backend(backend_name, model_id, **backend_opts)
+    print(f"[Daemon] Model ready in {time.perf_counter() - start:.1f}s. Listening on {socket_path}")
+    server = _UnixServer(socket_path, _RequestHandler)
+    server.transcription_daemon = TranscriptionDaemon(backend)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[Daemon] Shutting down.")
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+# --- Client ---
+
+def _request(payload, socket_path=DEFAULT_SOCKET_PATH, body=b""):
+    """
+    Send one request (plus an optional binary body) to the daemon and yield its reply events.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        if body:
+            sock.sendall(body)
+        with sock.makefile("r", encoding="utf-8") as reply:
+            for line in reply:
+                yield json.loads(line)
+
+def daemon_available(socket_path=DEFAULT_SOCKET_PATH):
+    if not os.path.exists(socket_path):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def daemon_status(socket_path=DEFAULT_SOCKET_PATH):
+    for event in _request({"cmd": "status"}, socket_path):
+        return event
+
+_mismatch_warned = set()  # (socket path, daemon (backend, model), requested model, requested backend) already reported
+
+def daemon_serves(model_id, backend_name="mlx_whisper", socket_path=DEFAULT_SOCKET_PATH):
+    """
+    True if a daemon is listening on socket_path and holds model_id on backend_name (a fake or
+    tones daemon keeps the default model id, so the model alone is not enough). A daemon holding
+    anything else is reported once per process and then not used for that model.
+    """
+    if not daemon_available(socket_path):
+        return False
+    try:
+        status = daemon_status(socket_path)
+        loaded = (status["backend"], status["model"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+    if loaded == (backend_name, model_id):
+        return True
+    if (socket_path, loaded, model_id, backend_name) not in _mismatch_warned:
+        _mismatch_warned.add((socket_path, loaded, model_id, backend_name))
+        print(f"[Daemon] The daemon on {socket_path} holds {loaded[1]} ({loaded[0]}), not {model_id} "
+              f"({backend_name}); transcribing in-process.")
+    return False
+
+def stream_transcription(audio, priority=DEFAULT_PRIORITY, options=None, socket_path=DEFAULT_SOCKET_PATH):
+    """
+    Submit a file (or a 16 kHz float32 array) to the daemon and yield its events
+    ("queued", "started", "segment"..., "done"). Raises RuntimeError if the daemon reports an error.
+    """
+    payload = {"cmd": "transcribe", "priority": priority, "options": options or {}}
+    body = b""
+    if isinstance(audio, str):
+        payload["audio"] = os.path.abspath(audio)
+    else:
+        import numpy as np
+        body = np.ascontiguousarray(audio, dtype="<f4").tobytes()
+        payload["samples"] = len(body) // 4
+    for event in _request(payload, socket_path, body):
+        if event["type"] == "error":
+            raise RuntimeError(event["message"])
+        yield event
+
+_local_backends = {}  # (backend name, model id) -> in-process backend for the no-daemon fallback
+
+def _local_transcribe(audio, model_id, backend_name, options):
+    key = (backend_name, model_id)
+    if key not in _local_backends:
+        _local_backends[key] = make_backend(backend_name, model_id)
+    segments, info = _local_backends[key].transcribe(audio, **options)
+    segments = list(segments)
+    return {
+        "text": info.get("text") or "".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "language": info.get("language"),
+    }
+
+def transcribe(audio_path, model_id=DEFAULT_MODEL_ID, priority=DEFAULT_PRIORITY, on_segment=None,
+               backend_name="mlx_whisper", socket_path=DEFAULT_SOCKET_PATH, **options):
+    """
+    Drop-in replacement for mlx_whisper.transcribe(): returns {"text", "segments", "language"}.
+    audio_path may also be a 16 kHz mono float32 array.
+    Goes through the daemon when one is listening with model_id loaded on backend_name, otherwise transcribes
+    in-process with a backend that stays loaded for the rest of this process.
+    on_segment, if given, is called with each segment dict as soon as it arrives.
+    """
+    if not daemon_serves(model_id, backend_name, socket_path):
+        result = _local_transcribe(audio_path, model_id, backend_name, options)
+        if on_segment:
+            for segment in result["segments"]:
+                on_segment(segment)
+        return result
+
+    segments = []
+    for event in stream_transcription(audio_path, priority, options, socket_path):
+        if event["type"] == "segment":
+            segment = {key: event[key] for key in ("id", "start", "end", "text")}
+            segments.append(segment)
+            if on_segment:
+                on_segment(segment)
+        elif event["type"] == "done":
+            return {"text": event["text"], "segments": segments, "language": event.get("language")}
+    label = audio_path if isinstance(audio_path, str) else "in-memory audio"
+    raise RuntimeError(f"Daemon closed the connection before finishing {label}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared Whisper transcription daemon over a Unix socket.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path of the daemon's Unix socket.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Load the model and serve jobs until interrupted.")
+    serve_parser.add_argument("--backend", choices=sorted(BACKENDS), default="mlx_whisper", help="Transcription backend.")
+    serve_parser.add_argument("--model", default=DEFAULT_MODEL_ID, help="Model repository or path for the backend.")
+    serve_parser.add_argument("--fake-realtime-factor", type=float, default=0.0, help="For --backend fake: seconds of sleep per second of audio.")
+    serve_parser.add_argument("--tone-work-factor", type=int, default=0, help="For --backend tones: extra spectrogram passes per job (CPU load).")
+
+    transcribe_parser = subparsers.add_parser("transcribe", help="Transcribe a file through the daemon and print its segments.")
+    transcribe_parser.add_argument("audio", help="Audio or video file to transcribe.")
+    transcribe_parser.add_argument("--priority", type=int, default=DEFAULT_PRIORITY, help="Lower values are served first.")
+    transcribe_parser.add_argument("--language", help="Language code passed to the backend.")
+
+    subparsers.add_parser("status", help="Print the daemon's status.")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        backend_opts = {}
+        if args.backend == "fake":
+            backend_opts = {"realtime_factor": args.fake_realtime_factor}
+        elif args.backend == "tones":
+            backend_opts = {"work_factor": args.tone_work_factor}
+        serve(args.backend, args.model, args.socket, **backend_opts)
+    elif args.command == "transcribe":
+        if not daemon_available(args.socket):
+            sys.exit(f"No daemon listening on {args.socket}. Start one with: python A_mlxWhisperDaemon.py serve")
+        options = {"language": args.language} if args.language else {}
+        for event in stream_transcription(args.audio, args.priority, options, args.socket):
+            if event["type"] == "segment":
+                print(f"[{event['start']:8.2f} -> {event['end']:8.2f}] {event['text'].strip()}")
+            elif event["type"] in ("queued", "started", "done"):
+                details = {k: v for k, v in event.items() if k not in ("type", "text")}
+                print(f"[Client] {event['type']}: {details}")
+    elif args.command == "status":
+        if not daemon_available(args.socket):
+            sys.exit(f"No daemon listening on {args.socket}.")
+        print(json.dumps(daemon_status(args.socket), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,71 @@
 import os
 import sys
+import json
+import shutil
 import threading
 import queue
 import time
 import yt_dlp
 import subprocess
 import concurrent.futures
+from downloadController import DownloadController
+from playlistMetadata import MetadataCache, extract_playlist, extract_video, sanitize_title
+from playlistSync import SyncState, find_transcripts
+from conversionScheduler import ConversionScheduler, FFMPEG_THREADS_PER_JOB
+from audioDownload import download_audio
 import re
-import mlx_whisper
+import random
+import argparse
+from A_mlxWhisperDaemon import transcribe  # goes through the shared daemon when it is running
+from transcriptionPool import TranscriptionPool
+from transcriptIndex import TranscriptIndex
+from transcriptEmbeddings import EmbeddingStore
+from segmentWriters import TranscriptWriter
 
 # Concurrency limits for different groups
+# Downloads start at DOWNLOAD_CONCURRENCY; DownloadController raises that up to DOWNLOAD_CONCURRENCY_MAX
+# while throughput holds up and cuts it on HTTP 429s or slow-downs.
 DOWNLOAD_CONCURRENCY = 10
-CONVERSION_CONCURRENCY = 8
+DOWNLOAD_CONCURRENCY_MAX = 32
+# None sizes the conversion pool from os.cpu_count() // FFMPEG_THREADS_PER_JOB; ConversionScheduler
+# then lowers or raises it at runtime from the load average (and the downstream queue).
+CONVERSION_CONCURRENCY = None
 METADATA_CONCURRENCY = 50
+# Files allowed to wait between stages. When a queue is full the stage feeding it pauses,
+# so downloads cannot run far ahead of Whisper and fill the disk.
+CONVERSION_QUEUE_SIZE = 8
+TRANSCRIPTION_QUEUE_SIZE = 4
+
+# Download only an audio stream and stream-copy it instead of fetching the video and re-encoding
+# to MP3 (see audioDownload.py). False restores the old MP4 download + 192k MP3 conversion.
+AUDIO_ONLY = True
+
+# Playlist and video metadata cached on disk (see playlistMetadata.METADATA_CACHE_DIR): re-runs skip the
+# playlist extraction, and downloads reuse a video's info dict while it is fresh.
+metadata_cache = MetadataCache()
 
 # Whisper model identifier
 MODEL_ID = "mlx-community/whisper-large-v3-turbo"
+# Priority of this script's jobs in the shared transcription daemon (lower is served first).
+TRANSCRIPTION_PRIORITY = 10
+# 1 sends every file to the shared daemon (one warm model for all scripts). More starts a TranscriptionPool
+# of that many private model-holding workers, longest audio first; each worker loads its own model.
+TRANSCRIPTION_WORKERS = 1
+TRANSCRIPTION_BACKEND = "mlx_whisper"
+# Outputs next to each video, written segment by segment ("txt", "jsonl", "srt", "vtt"; see segmentWriters).
+# "txt" is required: the sync state and the merged transcript are built from it.
+OUTPUT_FORMATS = ["txt", "jsonl", "srt", "vtt"]
+# Add each finished transcript to the local search index (see transcriptIndex).
+SEARCH_INDEX = True
+# ...and embed it into the semantic search store (see transcriptEmbeddings) without waiting for an `update` run.
+EMBEDDINGS = True
+search_index = TranscriptIndex() if SEARCH_INDEX else None
+embedding_store = EmbeddingStore() if EMBEDDINGS else None
+
+# Merged transcript per playlist, its byte-offset index (one entry per video) and the copy chunk size.
+MERGED_TRANSCRIPT_NAME = "merged_transcript.txt"
+MERGED_INDEX_NAME = "merged_transcript.index.json"
+MERGE_CHUNK_BYTES = 1024 * 1024
 
 def canonical_input(prompt):
     """
@@ -24,70 +74,29 @@ def canonical_input(prompt):
     os.system("stty sane")
     return input(prompt)
 
-def get_playlist_title(playlist_url):
-    """
-    Retrieve the playlist title using yt-dlp with --skip-download, --no-warnings,
-    and --print playlist_title. Returns a sanitized title safe for a folder name.
-    """
-    try:
-        cmd = [
-            "yt-dlp",
-            playlist_url,
-            "-I", "1:1",
-            "--skip-download",
-            "--no-warnings",
-            "--print", "playlist_title"
-        ]
-        output = subprocess.check_output(cmd, universal_newlines=True)
-        title = output.strip()
-        # Sanitize: allow alphanumerics, spaces, underscore, dash.
-        safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
-        return safe_title if safe_title else "playlist_unknown"
-    except Exception as e:
-        print(f"[Title] Error retrieving playlist title for {playlist_url}: {e}")
-        return "playlist_unknown"
-
-def get_playlist_video_urls(playlist_url):
+def extract_and_download(ydl, video):
     """
-    Extract a list of video URLs from the given playlist using yt-dlp.
+    Run yt-dlp on a video URL (reusing its cached info dict when fresh), or on an already extracted
+    info dict (the fixture benchmark builds those).
     """
-    video_urls = []
-    ydl_opts = {'skip_download': True, 'ignoreerrors': True}
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_url, download=False)
-            if info and 'entries' in info:
-                for entry in info['entries']:
-                    if entry and entry.get("webpage_url"):
-                        video_urls.append(entry["webpage_url"])
-    except Exception as e:
-        print(f"[Playlist] Error extracting video URLs from {playlist_url}: {e}")
-    return video_urls
-
-def process_playlist_metadata(playlist_url):
-    """
-    Retrieve metadata for a given playlist: its title and list of video URLs.
-    """
-    title = get_playlist_title(playlist_url)
-    video_urls = get_playlist_video_urls(playlist_url)
-    return title, video_urls
+    return extract_video(ydl, video, metadata_cache)
 
 def download_video(video_url, output_folder):
     """
     Download a single video (merged into an MP4 file) using yt-dlp.
-    Returns the filename of the downloaded video (or None on failure).
+    Returns the filename of the downloaded video; raises on a failed download.
     """
     outtmpl = os.path.join(output_folder, "%(title)s [%(id)s].%(ext)s")
     ydl_opts = {
         'format': 'best',  # downloads the best merged format
         'outtmpl': outtmpl,
-        'ignoreerrors': True,
+        'ignoreerrors': False,  # errors must reach DownloadController so it can retry or report them
         'merge_output_format': 'mp4',
         'keepvideo': True,  # we need the merged MP4 for conversion
     }
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
+            info = extract_and_download(ydl, video_url)
             if info is None:
                 print(f"[Download] No info for video: {video_url}")
                 return None
@@ -96,29 +105,33 @@ def download_video(video_url, output_folder):
             return video_file
     except Exception as e:
         print(f"[Download] Error downloading video {video_url}: {e}")
-        return None
+        raise
 
-def download_task(video_url, folder, download_queue):
+def download_task(video_url, folder):
     """
-    Download a single video and, if successful, immediately put its filename into the download_queue.
+    Download a single video. With AUDIO_ONLY the result is already the final (stream-copied) audio
+    file; otherwise it is the MP4 that convert_to_mp3 still has to process. Raises on failure
+    (run_pipeline calls it through DownloadController).
     """
-    video_file = download_video(video_url, folder)
-    if video_file:
-        download_queue.put(video_file)
+    if AUDIO_ONLY:
+        return download_audio(video_url, folder, metadata_cache)
+    return download_video(video_url, folder)
 
-def convert_to_mp3(video_file):
+def convert_to_mp3(video_file, threads=None):
     """
     Convert a downloaded merged video (MP4) to MP3 using FFmpeg.
+    threads caps ffmpeg's decoder and encoder threads (the conversion scheduler passes its per-job budget).
     On success, delete the original MP4 file.
     Returns the path to the MP3 file.
     """
     base, _ = os.path.splitext(video_file)
     mp3_file = base + ".mp3"
+    limit = ["-threads", str(threads)] if threads else []
     print(f"[Conversion] Converting {video_file} to MP3...")
     try:
         subprocess.run([
-            "ffmpeg", "-y", "-i", video_file,
-            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k",
+            "ffmpeg", "-y", *limit, "-i", video_file,
+            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k", *limit,
             mp3_file
         ], check=True)
         print(f"[Conversion] Conversion complete: {mp3_file}")
@@ -128,79 +141,322 @@ def convert_to_mp3(video_file):
         print(f"[Conversion] Error converting {video_file}: {e}")
     return mp3_file
 
-def conversion_worker(download_queue):
+# --- Whisper Transcription Section ---
+
+def transcribe_file(audio_path, future=None):
     """
-    Continuously pull a downloaded video filename from download_queue and convert it to MP3.
-    When a sentinel value (None) is encountered, exit.
+    Transcribe one audio file into a .txt (and the other OUTPUT_FORMATS) next to it, writing each segment
+    as it arrives, then delete the intermediate audio file.
+    With a future (from TranscriptionPool.submit), save the pool's result instead of transcribing here.
     """
-    while True:
-        video_file = download_queue.get()
-        if video_file is None:
-            download_queue.task_done()
-            break
-        convert_to_mp3(video_file)
-        download_queue.task_done()
-
-# --- Whisper Transcription Section ---
+    if future is None:
+        print(f"[Transcription] Starting transcription for: {audio_path}")
+    try:
+        with TranscriptWriter(os.path.splitext(audio_path)[0], OUTPUT_FORMATS, index=search_index, embeddings=embedding_store) as writer:
+            if future is None:
+                transcribe(audio_path, model_id=MODEL_ID, priority=TRANSCRIPTION_PRIORITY, on_segment=writer.write)
+            else:
+                writer.write_all(future.result()["segments"])
+        print(f"[Transcription] Finished transcription for: {audio_path}")
+        print(f"[Transcription] Transcript saved to: {writer.paths[0]}")
+    except Exception as e:
+        print(f"[Transcription] Error transcribing {audio_path}: {e}")
+    try:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+            print(f"[Transcription] Deleted intermediate audio file: {audio_path}")
+    except Exception as e:
+        print(f"[Transcription] Error deleting {audio_path}: {e}")
 
-# Global transcription queue for Whisper tasks.
-transcription_queue = queue.Queue()
+# --- Download -> Conversion -> Transcription Pipeline ---
 
-def transcription_worker():
+class StageStats:
     """
-    Worker thread that processes transcription tasks serially.
-    Each task is a tuple: (audio_filepath, transcript_filepath).
-    After a successful transcription, the intermediate MP3 file is deleted.
+    Busy time, items and time spent blocked on a full downstream queue for one pipeline stage.
     """
-    while True:
-        task = transcription_queue.get()
-        if task is None:
-            transcription_queue.task_done()
-            break
-        audio_path, transcript_path = task
-        print(f"[Transcription] Starting transcription for: {audio_path}")
-        try:
-            result = mlx_whisper.transcribe(audio_path, path_or_hf_repo=MODEL_ID)
-            transcript_text = result.get("text", "")
-            with open(transcript_path, "w", encoding="utf-8") as f:
-                f.write(transcript_text)
-            print(f"[Transcription] Finished transcription for: {audio_path}")
-            print(f"[Transcription] Transcript saved to: {transcript_path}")
-        except Exception as e:
-            print(f"[Transcription] Error transcribing {audio_path}: {e}")
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def timed(self, fn, *args):
+        start = time.perf_counter()
         try:
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-                print(f"[Transcription] Deleted intermediate MP3 file: {audio_path}")
-        except Exception as e:
-            print(f"[Transcription] Error deleting {audio_path}: {e}")
-        transcription_queue.task_done()
-
-def merge_transcripts_for_playlist(playlist_folder):
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.busy += time.perf_counter() - start
+                self.items += 1
+
+    def put(self, next_queue, item):
+        """
+        Hand an item to the next stage; waiting here is backpressure from a full queue.
+        """
+        start = time.perf_counter()
+        next_queue.put(item)
+        with self._lock:
+            self.blocked += time.perf_counter() - start
+
+    def report(self, makespan):
+        utilization = self.busy / (self.workers * makespan) if makespan else 0.0
+        print(f"[Pipeline] {self.name:<13}: {self.items:4d} files on {self.workers:2d} worker(s), "
+              f"{utilization:6.1%} utilized, {self.blocked:7.1f}s blocked by the next stage")
+
+def run_pipeline(tasks, download_fn, convert_fn, transcribe_fn, streaming=True, controller=None, pool=None):
     """
-    Merge all individual transcript (.txt) files in a playlist folder into one file.
-    The merged file is named 'merged_transcript.txt' and placed in the same folder.
-    Each transcript is preceded by a header with the video title (derived from its filename).
+    Push (video_url, folder) tasks through download -> conversion -> transcription.
+    convert_fn=None skips the conversion stage (AUDIO_ONLY downloads are already final).
+    Downloads run through `controller` (a DownloadController), which adapts their concurrency and
+    retries failures; videos that still fail are left out and listed in its failure report.
+    With a TranscriptionPool, files are submitted to it (waiting while its queue is full) and
+    transcribe_fn(audio_path, future) is called as each one finishes; otherwise one thread calls
+    transcribe_fn(audio_path) per file.
+
+    streaming=True joins the stages with bounded queues, so each file moves on the moment it is ready
+    and Whisper starts on the first finished download. A full queue blocks the stage feeding it, which
+    caps how many files wait on disk. streaming=False is the old phased run: every download, then every
+    conversion, then every transcription.
+    Returns (makespan in seconds, [StageStats...]).
     """
-    transcript_files = []
-    for file in os.listdir(playlist_folder):
-        if file.lower().endswith(".txt") and file != "merged_transcript.txt":
-            transcript_files.append(file)
-    if not transcript_files:
+    conversion_workers = CONVERSION_CONCURRENCY or max(1, (os.cpu_count() or 1) // FFMPEG_THREADS_PER_JOB)
+    controller = controller or DownloadController(initial=DOWNLOAD_CONCURRENCY, max_concurrency=DOWNLOAD_CONCURRENCY_MAX)
+    download_stats = StageStats("download", DOWNLOAD_CONCURRENCY)
+    convert_stats = StageStats("conversion", conversion_workers) if convert_fn else None
+    transcribe_stats = StageStats("transcription", pool.workers if pool else 1)
+    stages = [stats for stats in (download_stats, convert_stats, transcribe_stats) if stats]
+    start = time.perf_counter()
+
+    if not streaming:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_concurrency) as executor:
+            files = list(executor.map(lambda task: download_stats.timed(controller.run, download_fn, *task), tasks))
+        if convert_fn:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=conversion_workers) as executor:
+                files = list(executor.map(lambda f: convert_stats.timed(convert_fn, f, FFMPEG_THREADS_PER_JOB),
+                                          [f for f in files if f]))
+        for f in files:
+            if f:
+                transcribe_stats.timed(transcribe_fn, f)
+        return time.perf_counter() - start, stages
+
+    transcription_queue = queue.Queue(maxsize=TRANSCRIPTION_QUEUE_SIZE)
+
+    def convert(downloaded, threads):
+        converted = convert_stats.timed(convert_fn, downloaded, threads)
+        if converted:
+            convert_stats.put(transcription_queue, converted)
+
+    def download(video_url, folder):
+        downloaded = download_stats.timed(controller.run, download_fn, video_url, folder)
+        if downloaded:
+            download_stats.put(next_queue, downloaded)
+
+    def transcription_worker():
+        while True:
+            audio_path = transcription_queue.get()
+            if audio_path is None:
+                break
+            if pool:
+                # The pool runs the longest waiting file first on the next free worker.
+                future = pool.submit(audio_path)
+                future.add_done_callback(lambda done, path=audio_path: transcribe_fn(path, done))
+            else:
+                transcribe_stats.timed(transcribe_fn, audio_path)
+
+    # Start the downstream workers BEFORE the downloads. The conversion scheduler also backs off
+    # while the transcription queue is nearly full: converting faster than Whisper only fills the disk.
+    transcription_thread = threading.Thread(target=transcription_worker)
+    transcription_thread.start()
+    scheduler = None
+    next_queue = transcription_queue
+    if convert_fn:
+        scheduler = ConversionScheduler(convert, max_jobs=conversion_workers,
+                                        input_queue_size=CONVERSION_QUEUE_SIZE, downstream=transcription_queue)
+        next_queue = scheduler.jobs
+
+    # The pool has a thread per possible slot; the controller decides how many of them download at once.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_concurrency) as download_executor:
+        futures = [download_executor.submit(download, video_url, folder) for video_url, folder in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            future.result()
+
+    # Drain the stages in order: conversions first, then the transcription worker.
+    if scheduler:
+        scheduler.close()
+    transcription_queue.put(None)
+    transcription_thread.join()
+    if pool:
+        pool.wait()
+        transcribe_stats.busy, transcribe_stats.items = pool.busy, pool.done
+    return time.perf_counter() - start, stages
+
+def report_pipeline(makespan, stages):
+    print(f"[Pipeline] Makespan: {makespan:.1f}s")
+    for stats in stages:
+        stats.report(makespan)
+    # Each stage's work run back to back with perfect balance inside the stage: the best a phased run could do.
+    phased = sum(stats.busy / stats.workers for stats in stages)
+    print(f"[Pipeline] A phased run (one stage after another) would need at least {phased:.1f}s.")
+
+def run_pipeline_benchmark(videos):
+    """
+    Phased vs streaming on simulated stages: sleeps stand in for the network, ffmpeg and Whisper.
+    """
+    rng = random.Random(0)
+    durations = [(rng.uniform(1.0, 4.0), rng.uniform(0.3, 1.0), rng.uniform(0.5, 1.5)) for _ in range(videos)]
+    tasks = [(index, None) for index in range(videos)]
+
+    def fake_download(index, folder):
+        time.sleep(durations[index][0])
+        return (index, "downloaded")
+
+    def fake_convert(item, threads):
+        time.sleep(durations[item[0]][1])
+        return (item[0], "converted")
+
+    def fake_transcribe(item):
+        time.sleep(durations[item[0]][2])
+
+    results = {}
+    for streaming in (False, True):
+        label = "streaming" if streaming else "phased"
+        print(f"\n[Benchmark] {label} run, {videos} simulated videos:")
+        makespan, stages = run_pipeline(tasks, fake_download, fake_convert, fake_transcribe, streaming)
+        report_pipeline(makespan, stages)
+        results[label] = makespan
+    print(f"\n[Benchmark] Makespan phased {results['phased']:.1f}s vs streaming {results['streaming']:.1f}s "
+          f"({results['phased'] / results['streaming']:.2f}x)")
+
+def _copy_into(merged_file, path):
+    """
+    Write a file's bytes at merged_file's position (opened unbuffered, not in append mode) without
+    holding it in memory: os.sendfile where the kernel takes a file as its target (Linux),
+    MERGE_CHUNK_BYTES at a time otherwise. Returns the number of bytes copied.
+    """
+    with open(path, "rb") as src:
+        size = os.fstat(src.fileno()).st_size
+        copied = 0
+        if sys.platform.startswith("linux"):
+            try:
+                while copied < size:
+                    sent = os.sendfile(merged_file.fileno(), src.fileno(), copied, min(MERGE_CHUNK_BYTES, size - copied))
+                    if not sent:
+                        break
+                    copied += sent
+                return copied
+            except OSError:
+                pass  # e.g. a filesystem without sendfile support; finish with plain reads
+        src.seek(copied)
+        shutil.copyfileobj(src, merged_file, MERGE_CHUNK_BYTES)
+        return size
+
+def write_transcript_section(merged_file, playlist_folder, transcript_filename):
+    """
+    Write one transcript into the merged file (binary, unbuffered), preceded by a header with the video
+    title (from its filename). Returns the section's length in bytes.
+    """
+    title = os.path.splitext(transcript_filename)[0]
+    header = f"=== {title} ===\n\n".encode("utf-8")
+    merged_file.write(header)
+    copied = _copy_into(merged_file, os.path.join(playlist_folder, transcript_filename))
+    merged_file.write(b"\n\n")
+    return len(header) + copied + 2
+
+def ordered_transcripts(playlist_folder, entries=None):
+    """
+    [(key, transcript filename), ...] in playlist order: transcripts of `entries` by their index in the
+    playlist, keyed by video ID, then any other .txt files keyed by filename, sorted by name.
+    """
+    by_id = find_transcripts(playlist_folder)
+    ordered = [(entry["id"], by_id.pop(entry["id"])) for entry in entries or [] if entry["id"] in by_id]
+    listed = {filename for _, filename in ordered}
+    others = sorted(name for name in os.listdir(playlist_folder)
+                    if name.lower().endswith(".txt") and name != MERGED_TRANSCRIPT_NAME and name not in listed)
+    ids = {filename: vid for vid, filename in by_id.items()}
+    return ordered + [(ids.get(name, name), name) for name in others]
+
+def load_merge_index(playlist_folder):
+    """
+    The sidecar index of merged_transcript.txt: {key: {"title", "offset", "length"}} in file order,
+    or None if it is missing or does not match the merged file.
+    """
+    merged_path = os.path.join(playlist_folder, MERGED_TRANSCRIPT_NAME)
+    try:
+        with open(os.path.join(playlist_folder, MERGED_INDEX_NAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index["size"] != os.path.getsize(merged_path):
+            return None
+        return index["sections"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def read_transcript_section(playlist_folder, key):
+    """
+    One video's section of merged_transcript.txt (by video ID or filename), read with a single seek.
+    """
+    section = load_merge_index(playlist_folder)[key]
+    with open(os.path.join(playlist_folder, MERGED_TRANSCRIPT_NAME), "rb") as f:
+        f.seek(section["offset"])
+        return f.read(section["length"]).decode("utf-8")
+
+def merge_transcripts_for_playlist(playlist_folder, entries=None):
+    """
+    Merge the individual transcript (.txt) files of a playlist folder into 'merged_transcript.txt', in
+    playlist order (`entries`, from extract_playlist; filename order without them). Each transcript is
+    preceded by a header with the video title (derived from its filename) and copied in chunks.
+    When the merged file and its index already exist and every new transcript comes after the merged
+    ones in the playlist, only the new ones are appended; otherwise the file is rebuilt.
+    The byte offset and length of every section go to 'merged_transcript.index.json'.
+    """
+    transcripts = ordered_transcripts(playlist_folder, entries)
+    if not transcripts:
         return
-    transcript_files.sort()
-    merged_path = os.path.join(playlist_folder, "merged_transcript.txt")
-    with open(merged_path, "w", encoding="utf-8") as merged_file:
-        for transcript_filename in transcript_files:
-            title = os.path.splitext(transcript_filename)[0]
-            merged_file.write(f"=== {title} ===\n\n")
-            transcript_path = os.path.join(playlist_folder, transcript_filename)
-            with open(transcript_path, "r", encoding="utf-8") as f:
-                merged_file.write(f.read())
-            merged_file.write("\n\n")
-    print(f"[Merge] Created merged transcript file: {merged_path}")
+    merged_path = os.path.join(playlist_folder, MERGED_TRANSCRIPT_NAME)
+    sections = load_merge_index(playlist_folder) if os.path.exists(merged_path) else None
+    if sections is not None:
+        new = [(key, filename) for key, filename in transcripts if key not in sections]
+        if not new:
+            return
+        positions = {key: position for position, (key, _) in enumerate(transcripts)}
+        last_merged = max((positions.get(key, -1) for key in sections), default=-1)
+        if positions[new[0][0]] < last_merged:
+            print(f"[Merge] New transcript(s) belong before merged ones; rebuilding {merged_path}")
+            sections = None
+    if sections is None:
+        sections, new, mode = {}, transcripts, "wb"
+    else:
+        mode = "r+b"  # not "ab": sendfile refuses O_APPEND targets
+    with open(merged_path, mode, buffering=0) as merged_file:
+        offset = merged_file.seek(0, os.SEEK_END)
+        for key, transcript_filename in new:
+            length = write_transcript_section(merged_file, playlist_folder, transcript_filename)
+            sections[key] = {"title": os.path.splitext(transcript_filename)[0], "offset": offset, "length": length}
+            offset += length
+    index_path = os.path.join(playlist_folder, MERGED_INDEX_NAME)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"size": offset, "sections": sections}, f, ensure_ascii=False, indent=1)
+    os.replace(index_path + ".tmp", index_path)
+    action = "Created merged transcript file" if mode == "wb" else f"Appended {len(new)} transcript(s) to"
+    print(f"[Merge] {action}: {merged_path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Download YouTube playlists, transcribe every video with Whisper and merge the transcripts per playlist.")
+    parser.add_argument("--benchmark", type=int, metavar="VIDEOS",
+                        help="Instead of downloading, compare the phased and streaming pipelines on this many "
+                             "simulated videos and report makespan and per-stage utilization.")
+    parser.add_argument("--transcription-workers", type=int, default=TRANSCRIPTION_WORKERS,
+                        help="Model-holding transcription workers (1 uses the shared daemon).")
+    parser.add_argument("--full", action="store_true",
+                        help="Transcribe every video again into a fresh '<title>_N' folder instead of syncing "
+                             "only the videos not transcribed yet (the default).")
+    args = parser.parse_args()
+    if args.benchmark:
+        run_pipeline_benchmark(args.benchmark)
+        return
+
     # --- Input Phase ---
     playlist_urls = []
     while True:
@@ -217,93 +473,72 @@ def main():
     print(f"[Main] Using main download folder: {download_folder}")
 
     # --- Metadata Retrieval (Parallel) ---
-    playlist_info_list = []  # Each entry: (playlist_url, title, video_urls)
+    # Always a fresh playlist extraction (refresh=True): the cached copy could hide this week's uploads.
+    playlists = []  # extract_playlist() results: {"id", "title", "entries"}
     with concurrent.futures.ThreadPoolExecutor(max_workers=METADATA_CONCURRENCY) as executor:
         future_to_url = {
-            executor.submit(process_playlist_metadata, p_url): p_url
+            executor.submit(extract_playlist, p_url, metadata_cache, refresh=True): p_url
             for p_url in playlist_urls
         }
         for future in concurrent.futures.as_completed(future_to_url):
             p_url = future_to_url[future]
             try:
-                title, video_urls = future.result()
-                playlist_info_list.append((p_url, title, video_urls))
+                playlists.append(future.result())
             except Exception as exc:
                 print(f"[Metadata] Retrieval for {p_url} generated an exception: {exc}")
 
+    # --- Sync: pick each playlist's folder and the videos it still needs ---
+    state = SyncState(download_folder)
     tasks = []  # List of (video_url, target_folder)
-    playlist_folders = []
-    for p_url, title, video_urls in playlist_info_list:
-        playlist_folder = os.path.join(download_folder, title)
-        base_folder = playlist_folder
-        counter = 1
-        while os.path.exists(playlist_folder):
-            playlist_folder = f"{base_folder}_{counter}"
-            counter += 1
-        os.makedirs(playlist_folder, exist_ok=True)
-        playlist_folders.append(playlist_folder)
-        print(f"[Metadata] Playlist '{title}' has {len(video_urls)} videos.")
-        for video_url in video_urls:
-            tasks.append((video_url, playlist_folder))
-
-    # --- Download & Conversion Pipeline ---
-
-    # Create a global queue for conversion tasks.
-    downloaded_queue = queue.Queue()
-
-    # Start conversion worker threads BEFORE download tasks.
-    conversion_threads = []
-    for _ in range(CONVERSION_CONCURRENCY):
-        t = threading.Thread(target=conversion_worker, args=(downloaded_queue,))
-        t.start()
-        conversion_threads.append(t)
-
-    # Start download tasks concurrently using a ThreadPoolExecutor.
-    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY) as download_executor:
-        futures = [
-            download_executor.submit(download_task, video_url, folder, downloaded_queue)
-            for video_url, folder in tasks
-        ]
-        for future in concurrent.futures.as_completed(futures):
-            future.result()
-
-    # Signal conversion workers that no more files will be added.
-    for _ in range(CONVERSION_CONCURRENCY):
-        downloaded_queue.put(None)
-    downloaded_queue.join()
-    for t in conversion_threads:
-        t.join()
-
-    print("[Main] All download and conversion tasks are complete.")
-
-    # --- Whisper Transcription Phase ---
-    # Gather all MP3 files from the download folder.
-    mp3_files = []
-    for root, dirs, files in os.walk(download_folder):
-        for file in files:
-            if file.lower().endswith(".mp3"):
-                mp3_files.append(os.path.join(root, file))
-    print(f"[Main] Found {len(mp3_files)} MP3 files for transcription.")
-
-    # Start a transcription worker thread.
-    transcription_thread = threading.Thread(target=transcription_worker, daemon=True)
-    transcription_thread.start()
+    synced = []  # (playlist, folder, entries to transcribe)
+    for playlist in playlists:
+        title = sanitize_title(playlist["title"])
+        if args.full:
+            playlist_folder = os.path.join(download_folder, title)
+            base_folder = playlist_folder
+            counter = 1
+            while os.path.exists(playlist_folder):
+                playlist_folder = f"{base_folder}_{counter}"
+                counter += 1
+            os.makedirs(playlist_folder, exist_ok=True)
+            entries = playlist["entries"]
+        else:
+            playlist_folder = state.playlist_folder(playlist["id"], os.path.join(download_folder, title))
+            entries = state.new_entries(playlist, playlist_folder)
+        synced.append((playlist, playlist_folder, entries))
+        print(f"[Metadata] Playlist '{title}' has {len(playlist['entries'])} videos, {len(entries)} to transcribe.")
+        for entry in entries:
+            tasks.append((entry["url"], playlist_folder))
 
-    for mp3_file in mp3_files:
-        base, _ = os.path.splitext(mp3_file)
-        transcript_filename = base + ".txt"
-        print(f"[Main] Enqueuing transcription task for: {mp3_file}")
-        transcription_queue.put((mp3_file, transcript_filename))
-
-    transcription_queue.join()
-    transcription_queue.put(None)
-    transcription_thread.join()
-
-    print("[Main] All transcriptions completed. Only transcript text files remain.")
+    # --- Download -> Conversion -> Transcription (streaming) ---
+    makespan = 0.0
+    if tasks:
+        controller = DownloadController(initial=DOWNLOAD_CONCURRENCY, max_concurrency=DOWNLOAD_CONCURRENCY_MAX)
+        pool = None
+        if args.transcription_workers > 1:
+            pool = TranscriptionPool(args.transcription_workers, backend_name=TRANSCRIPTION_BACKEND, model_id=MODEL_ID)
+        try:
+            makespan, stages = run_pipeline(tasks, download_task, None if AUDIO_ONLY else convert_to_mp3,
+                                            transcribe_file, controller=controller, pool=pool)
+        finally:
+            if pool:
+                pool.close()
+        print("[Main] All downloads and transcriptions completed. Only transcript text files remain.")
+        report_pipeline(makespan, stages)
+        controller.write_failure_report(download_folder)
+    else:
+        print("[Main] Nothing new to transcribe.")
 
-    # --- Merge Transcripts ---
-    for folder in playlist_folders:
-        merge_transcripts_for_playlist(folder)
+    # --- Record the sync and merge transcripts ---
+    seconds_per_video = makespan / len(tasks) if tasks else 0.0
+    for playlist, playlist_folder, entries in synced:
+        state.record_transcripts(playlist, playlist_folder, seconds_per_video)
+        merge_transcripts_for_playlist(playlist_folder, playlist["entries"])
+        if search_index:
+            search_index.push(os.path.join(playlist_folder, MERGED_TRANSCRIPT_NAME))
+        if not args.full:
+            print(state.report(playlist["id"], [entry["id"] for entry in entries], seconds_per_video * len(entries)))
+    state.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,11 @@
 # %%
 import os
-import subprocess
-import mlx_whisper
+from A_mlxWhisperDaemon import transcribe  # goes through the shared daemon when it is running
+from A_whisperAudio import transcribe_speech_only, load_audio
+from transcriptionBatch import plan_batch, BatchProgress
+from transcriptIndex import TranscriptIndex
+from transcriptEmbeddings import EmbeddingStore
+from segmentWriters import TranscriptWriter, chain_hooks
 
 # --- Configuration ---
 AUDIO_FOLDERS = [
@@ -15,8 +19,23 @@ AUDIO_EXTENSIONS = [".wav", ".mp3", ".flac", ".ogg", ".m4a"]
 # Video file extensions that should be processed
 VIDEO_EXTENSIONS = [".mp4", ".mov", ".avi", ".mkv"]
 PROGRESS_INTERVAL = 300
+# Order of the whole batch: "longest-first" (shortest makespan), "shortest-first" (first transcripts
+# sooner), "name" or "listdir". Durations are probed up front and cached (see transcriptionBatch).
+ORDER_POLICY = "shortest-first"
 # Model repository identifier from Hugging Face.
 MODEL_ID = "mlx-community/whisper-large-v3-turbo"
+# Priority of this script's jobs in the shared transcription daemon (lower is served first).
+TRANSCRIPTION_PRIORITY = 10
+# Run a voice-activity pass first and send only the speech regions to the model.
+SKIP_SILENCE = True
+# Outputs written segment by segment while a file is transcribed ("txt", "jsonl", "srt", "vtt"; see
+# segmentWriters). They appear as <name>.<format>.partial until the file is done. Keep "txt": its
+# presence marks a file as already transcribed.
+OUTPUT_FORMATS = ["txt", "jsonl", "srt", "vtt"]
+# Add each finished transcript to the local search index (see transcriptIndex).
+SEARCH_INDEX = True
+# ...and embed it into the semantic search store (see transcriptEmbeddings) without waiting for an `update` run.
+EMBEDDINGS = True
 # ----------------------
 
 def is_audio_file(filename: str) -> bool:
@@ -27,14 +46,19 @@ def is_video_file(filename: str) -> bool:
     """Check if a file is a video file based on its extension."""
     return any(filename.lower().endswith(ext) for ext in VIDEO_EXTENSIONS)
 
-# Process each folder in AUDIO_FOLDERS.
+# Plan: collect the pending files of every folder, probe their durations and order the batch.
+pending = []
 for folder in AUDIO_FOLDERS:
-    print(f"\nProcessing folder: {folder}")
+    print(f"\nScanning folder: {folder}")
     for filename in os.listdir(folder):
         # Skip hidden files and system files.
         if filename.startswith('._'):
             continue
         
+        if not (is_audio_file(filename) or is_video_file(filename)):
+            # Skip files that are neither audio nor video.
+            continue
+        
         # Compute base name and output file path
         base_name = os.path.splitext(filename)[0]
         output_file = os.path.join(folder, base_name + ".txt")
@@ -44,48 +68,43 @@ for folder in AUDIO_FOLDERS:
             print(f"Output file {output_file} already exists. Skipping {filename}.")
             continue
         
-        file_path = os.path.join(folder, filename)
-        input_path = None  # will be set to the file to transcribe
-        
-        if is_audio_file(filename):
-            input_path = file_path
-        elif is_video_file(filename):
-            # Extract audio from video using ffmpeg.
-            temp_audio_path = os.path.join(folder, base_name + "_extracted.mp3")
-            print(f"\nExtracting audio from video file: {file_path}")
-            ffmpeg_command = ["ffmpeg", "-y", "-i", file_path, "-q:a", "0", "-map", "a", temp_audio_path]
-            subprocess.run(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            input_path = temp_audio_path
+        pending.append(os.path.join(folder, filename))
+
+search_index = TranscriptIndex() if SEARCH_INDEX else None
+embedding_store = EmbeddingStore() if EMBEDDINGS else None
+jobs = plan_batch(pending, ORDER_POLICY)
+progress = BatchProgress(jobs, PROGRESS_INTERVAL)
+
+for file_path, duration in jobs:
+    print(f"\nProcessing file: {file_path}")
+    progress.start_file(file_path, duration)
+    
+    # Decode the audio track (of audio and video files alike) to 16 kHz mono samples in memory
+    # through an ffmpeg pipe; nothing is written next to the source.
+    audio = load_audio(file_path)
+    
+    # Transcribe the file (shared daemon if running, otherwise mlx_whisper in-process).
+    # Every segment goes to disk as it arrives, and progress (with throughput and the batch ETA) is printed.
+    with TranscriptWriter(os.path.splitext(file_path)[0], OUTPUT_FORMATS, index=search_index, embeddings=embedding_store) as writer:
+        on_segment = chain_hooks(writer.write, progress.on_segment)
+        if SKIP_SILENCE:
+            # Segment timestamps come back on the original timeline.
+            transcribe_speech_only(
+                audio,
+                transcribe,
+                model_id=MODEL_ID,
+                priority=TRANSCRIPTION_PRIORITY,
+                on_segment=on_segment
+            )
         else:
-            # Skip files that are neither audio nor video.
-            continue
-        
-        print(f"\nProcessing file: {input_path}")
-        
-        # Transcribe the file using mlx_whisper.
-        result = mlx_whisper.transcribe(
-            input_path,
-            path_or_hf_repo=MODEL_ID
-        )
-        
-        # Use the full transcript from the "text" key.
-        full_transcript = result["text"]
-        
-        # Optionally, log progress based on the segments.
-        next_progress = PROGRESS_INTERVAL
-        for segment in result["segments"]:
-            if segment["start"] >= next_progress:
-                print(f"Reached approximately {int(segment['start'])} seconds in '{filename}'")
-                next_progress += PROGRESS_INTERVAL
-        
-        # Write the full transcript to a text file.
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(full_transcript)
-        
-        print(f"Transcription saved to: {output_file}")
-        
-        # If a temporary audio file was created from a video, remove it.
-        if is_video_file(filename) and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path) 
+            transcribe(
+                audio,
+                model_id=MODEL_ID,
+                priority=TRANSCRIPTION_PRIORITY,
+                on_segment=on_segment
+            )
+    
+    print(f"Transcription saved to: {', '.join(writer.paths)}")
+    progress.finish_file()
 
-# %%
+# %%
\ No newline at end of file
@@ -0,0 +1,735 @@
+"""
+Audio helpers for the Whisper scripts: decode to 16 kHz mono in memory and skip silence before decoding.
+
+Whisper spends the same decoder time on a minute of silence or music bed as on a minute of speech,
+and lectures/podcasts carry a lot of both. transcribe_speech_only() runs a cheap energy-based voice
+activity detection (VAD) pass, sends only the speech regions (joined with short gaps) to the model and
+maps the returned segment timestamps back onto the original timeline.
+
+Example Usages:
+
+1. Skip silence when transcribing from another script:
+   from A_mlxWhisperDaemon import transcribe
+   from A_whisperAudio import transcribe_speech_only
+   result = transcribe_speech_only(path, transcribe, model_id=MODEL_ID)
+
+2. Show the speech regions VAD finds in a file:
+   python A_whisperAudio.py regions /path/to/audio.mp3
+
+3. Check VAD on synthetic audio with known silences and measure the speedup with the fake backend:
+   python A_whisperAudio.py demo --silence-ratio 0.4 --realtime-factor 0.02
+   python -m pytest -q test_whisperAudio.py   # the same checks as assertions
+
+4. Compare decoding a video through a temporary _extracted.mp3 with the in-memory pipe:
+   python A_whisperAudio.py decode-bench /path/to/lecture.mp4 --temp-dir /Volumes/HezeSamsung/tmp
+   python A_whisperAudio.py decode-bench --synthetic 600
+
+5. Transcribe one long recording on 4 workers (windows cut at pauses, stitched back together):
+   python A_whisperAudio.py long /path/to/episode.mp3 --workers 4 --backend faster_whisper --model small
+
+6. Measure windowed vs serial transcription (speedup and word error) on a tone-coded fixture:
+   python A_whisperAudio.py long-demo --seconds 1800 --workers 1 2 4 8
+
+Notes:
+- Decoding needs ffmpeg on PATH; the demos do not. Video files are decoded directly from their first
+  audio track through a pipe, so no _extracted.mp3 is written next to them.
+- Long-file workers are private A_mlxWhisperDaemon processes, each holding its own model. The speedup
+  is real on CPU backends; on one GPU the workers share the device.
+- The detector is energy-based: it removes silence and near-silence, not loud music. Regions are padded
+  by VAD_PAD_MS on both sides so word onsets and tails are not clipped.
+"""
+import os
+import re
+import sys
+import time
+import queue
+import bisect
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SAMPLE_RATE = 16000  # what Whisper expects
+DECODE_CHUNK_SECONDS = 60.0  # size of the pieces read from the ffmpeg pipe
+
+# --- VAD settings ---
+VAD_FRAME_MS = 30
+# A frame is speech if it is this many dB above the noise floor (10th percentile of frame energy)...
+VAD_THRESHOLD_DB = 12.0
+# ...capped at this many dB below the loudest frames, so audio that is all speech is kept whole...
+VAD_HEADROOM_DB = 6.0
+# ...and never if it is quieter than this absolute level (dBFS).
+VAD_MIN_LEVEL_DB = -60.0
+VAD_MIN_SPEECH_MS = 250   # shorter bursts are clicks, not speech
+VAD_MIN_SILENCE_MS = 700  # shorter pauses stay inside the surrounding region
+VAD_PAD_MS = 200
+# Silence inserted between joined regions so the model does not run words from two regions together.
+JOIN_GAP_SECONDS = 0.5
+
+# --- Long-file mode ---
+LONG_WINDOW_SECONDS = 300.0   # target length of each parallel window
+LONG_OVERLAP_SECONDS = 5.0    # extra audio decoded on each side of a window for context
+CUT_SEARCH_SECONDS = 15.0     # how far a window boundary may move to land in a pause
+MAX_OVERLAP_WORDS = 20        # longest run of words de-duplicated across a window boundary
+DAEMON_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "A_mlxWhisperDaemon.py")
+
+def stream_audio(path, chunk_seconds=DECODE_CHUNK_SECONDS, sample_rate=SAMPLE_RATE):
+    """
+    Yield the first audio track of any audio or video file as mono float32 chunks of chunk_seconds,
+    decoded by ffmpeg straight into memory: no intermediate file and no lossy re-encode.
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error", "-i", path,
+        "-map", "0:a:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "-",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    chunk_bytes = 4 * int(chunk_seconds * sample_rate)
+    try:
+        while True:
+            buffer = bytearray(chunk_bytes)
+            view = memoryview(buffer)
+            filled = 0
+            while filled < chunk_bytes:
+                count = process.stdout.readinto(view[filled:])
+                if not count:
+                    break
+                filled += count
+            if filled >= 4:
+                yield np.frombuffer(buffer, dtype=np.float32, count=filled // 4)
+            if filled < chunk_bytes:
+                break
+        errors = process.stderr.read().decode(errors="replace").strip()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed on {path}: {errors}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """
+    Decode any audio or video file to one mono float32 array in [-1, 1] (see stream_audio).
+    """
+    chunks = list(stream_audio(path, sample_rate=sample_rate))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+def frame_energy_db(audio, sample_rate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS):
+    """
+    Mean-square energy in dBFS of each full frame_ms frame.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    count = len(audio) // frame
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float64)
+    return 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+def detect_speech(audio, sample_rate=SAMPLE_RATE, frame_ms=VAD_FRAME_MS, threshold_db=VAD_THRESHOLD_DB,
+                  min_speech_ms=VAD_MIN_SPEECH_MS, min_silence_ms=VAD_MIN_SILENCE_MS, pad_ms=VAD_PAD_MS):
+    """
+    Return the speech regions of audio as sorted, non-overlapping (start_sample, end_sample) pairs.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    energy = frame_energy_db(audio, sample_rate, frame_ms)
+    if len(energy) == 0:
+        return []
+    noise_floor = np.percentile(energy, 10)
+    loud = np.percentile(energy, 99)
+    threshold = min(noise_floor + threshold_db, loud - VAD_HEADROOM_DB)
+    voiced = (energy > threshold) & (energy > VAD_MIN_LEVEL_DB)
+
+    # Runs of voiced frames as [start_frame, end_frame).
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    runs = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    min_silence = max(1, min_silence_ms // frame_ms)
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_speech = max(1, min_speech_ms // frame_ms)
+    pad = int(sample_rate * pad_ms / 1000)
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        start_sample = max(0, int(start) * frame - pad)
+        end_sample = min(len(audio), int(end) * frame + pad)
+        if regions and start_sample <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end_sample)
+        else:
+            regions.append((start_sample, end_sample))
+    return regions
+
+class SpeechTimeline:
+    """
+    The speech regions of one recording joined into a single array, plus the mapping from a time in
+    that array back to a time in the original recording.
+    """
+
+    def __init__(self, audio, regions, sample_rate=SAMPLE_RATE, join_gap_seconds=JOIN_GAP_SECONDS):
+        self.sample_rate = sample_rate
+        self.total_seconds = len(audio) / sample_rate
+        gap = np.zeros(int(join_gap_seconds * sample_rate), dtype=np.float32)
+        pieces = []
+        self._joined_starts = []    # start of each region in the joined array (seconds)
+        self._original_starts = []  # start of the same region in the original (seconds)
+        self._durations = []
+        position = 0
+        for index, (start, end) in enumerate(regions):
+            if index:
+                pieces.append(gap)
+                position += len(gap)
+            pieces.append(audio[start:end].astype(np.float32, copy=False))
+            self._joined_starts.append(position / sample_rate)
+            self._original_starts.append(start / sample_rate)
+            self._durations.append((end - start) / sample_rate)
+            position += end - start
+        self.audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+        self.speech_seconds = sum(self._durations)
+
+    @property
+    def skipped_fraction(self):
+        if not self.total_seconds:
+            return 0.0
+        return 1.0 - self.speech_seconds / self.total_seconds
+
+    def to_original(self, t, is_end=False):
+        """
+        Map a time in the joined audio to the original recording. Times inside a join gap clamp to
+        the end of the region before it; an end time exactly on a region start belongs to the previous region.
+        """
+        if not self._joined_starts:
+            return t
+        if is_end:
+            index = bisect.bisect_left(self._joined_starts, t) - 1
+        else:
+            index = bisect.bisect_right(self._joined_starts, t) - 1
+        index = max(index, 0)
+        offset = min(max(t - self._joined_starts[index], 0.0), self._durations[index])
+        return self._original_starts[index] + offset
+
+    def remap_segments(self, segments):
+        remapped = []
+        for segment in segments:
+            segment = dict(segment)
+            segment["start"] = round(self.to_original(segment["start"]), 3)
+            segment["end"] = round(max(self.to_original(segment["end"], is_end=True), segment["start"]), 3)
+            remapped.append(segment)
+        return remapped
+
+def transcribe_speech_only(audio, transcribe_fn, sample_rate=SAMPLE_RATE, on_segment=None, **transcribe_kwargs):
+    """
+    VAD pre-pass around a transcribe function that accepts a float32 array (mlx_whisper.transcribe,
+    A_mlxWhisperDaemon.transcribe, ...). audio is a path or an already decoded array. Returns the usual
+    {"text", "segments", "language"} with timestamps on the original timeline, plus a "vad" stats dict.
+    on_segment, if given, is passed on to transcribe_fn and sees each segment on the original timeline.
+    """
+    if isinstance(audio, str):
+        audio = load_audio(audio, sample_rate)
+    vad_start = time.perf_counter()
+    timeline = SpeechTimeline(audio, detect_speech(audio, sample_rate), sample_rate)
+    vad_seconds = time.perf_counter() - vad_start
+    stats = {
+        "audio_seconds": round(timeline.total_seconds, 2),
+        "speech_seconds": round(timeline.speech_seconds, 2),
+        "skipped_percent": round(100 * timeline.skipped_fraction, 1),
+        "vad_seconds": round(vad_seconds, 3),
+    }
+    if timeline.speech_seconds == 0:
+        print(f"[VAD] No speech found in {timeline.total_seconds:.1f}s of audio; skipping the model.")
+        return {"text": "", "segments": [], "language": None, "vad": dict(stats, transcribe_seconds=0.0)}
+
+    if on_segment:
+        transcribe_kwargs["on_segment"] = lambda segment: on_segment(timeline.remap_segments([segment])[0])
+    start = time.perf_counter()
+    result = transcribe_fn(timeline.audio, **transcribe_kwargs)
+    stats["transcribe_seconds"] = round(time.perf_counter() - start, 2)
+    # Decoding time scales with audio length, so this is the expected speedup over a full-length pass.
+    stats["expected_speedup"] = round(timeline.total_seconds * sample_rate / len(timeline.audio), 2)
+    print(
+        f"[VAD] Skipped {stats['skipped_percent']}% of {stats['audio_seconds']:.0f}s "
+        f"({stats['speech_seconds']:.0f}s of speech sent, VAD took {vad_seconds:.2f}s); "
+        f"transcribed in {stats['transcribe_seconds']:.1f}s, ~{stats['expected_speedup']}x less audio to decode."
+    )
+    result = dict(result)
+    result["segments"] = timeline.remap_segments(result.get("segments", []))
+    result["vad"] = stats
+    return result
+
+# --- Long files: overlapping windows on parallel workers ---
+
+def find_cut_points(audio, window_seconds=LONG_WINDOW_SECONDS, search_seconds=CUT_SEARCH_SECONDS,
+                    sample_rate=SAMPLE_RATE):
+    """
+    Sample positions roughly every window_seconds, each moved to the quietest ~300 ms stretch within
+    +/- search_seconds so windows end in a pause rather than mid-word.
+    """
+    frame = int(sample_rate * VAD_FRAME_MS / 1000)
+    energy = frame_energy_db(audio, sample_rate)
+    width = max(1, 300 // VAD_FRAME_MS)
+    smooth = np.convolve(energy, np.ones(width) / width, mode="same")
+    frames_per_second = 1000 / VAD_FRAME_MS
+    total = len(audio) / sample_rate
+    cuts, target = [], window_seconds
+    while target < total - window_seconds / 4:
+        lo = int(max(0.0, target - search_seconds) * frames_per_second)
+        hi = max(lo + 1, int(min(total, target + search_seconds) * frames_per_second))
+        index = lo + int(np.argmin(smooth[lo:hi]))
+        cut = index * frame + frame // 2
+        if cuts and cut <= cuts[-1]:
+            cut = int(target * sample_rate)
+        cuts.append(cut)
+        target = cut / sample_rate + window_seconds
+    return cuts
+
+def plan_windows(audio, window_seconds=LONG_WINDOW_SECONDS, overlap_seconds=LONG_OVERLAP_SECONDS,
+                 sample_rate=SAMPLE_RATE):
+    """
+    Split audio at pauses into (own_start, own_end, window_start, window_end) sample ranges. Each window
+    owns [own_start, own_end) and also decodes overlap_seconds of its neighbours for context.
+    """
+    bounds = [0] + find_cut_points(audio, window_seconds, sample_rate=sample_rate) + [len(audio)]
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        (start, end, max(0, start - overlap), min(len(audio), end + overlap))
+        for start, end in zip(bounds, bounds[1:])
+    ]
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']+", "", word.lower())
+
+def _drop_repeated_words(previous, following, max_words=MAX_OVERLAP_WORDS):
+    """
+    Remove from the start of `following` the longest run of words that repeats the end of `previous`
+    (both lists of segment dicts, edited in place). Returns the number of words dropped.
+    """
+    tail = " ".join(segment["text"] for segment in previous[-3:]).split()[-max_words:]
+    head = " ".join(segment["text"] for segment in following[:3]).split()[:max_words]
+    tail_norm = [_normalize_word(w) for w in tail]
+    head_norm = [_normalize_word(w) for w in head]
+    repeated = 0
+    for k in range(min(len(tail_norm), len(head_norm)), 0, -1):
+        if tail_norm[-k:] == head_norm[:k]:
+            repeated = k
+            break
+    remaining = repeated
+    while remaining and following:
+        words = following[0]["text"].split()
+        if len(words) <= remaining:
+            remaining -= len(words)
+            following.pop(0)
+        else:
+            following[0]["text"] = " " + " ".join(words[remaining:])
+            remaining = 0
+    return repeated
+
+def stitch_windows(windows, window_segments, sample_rate=SAMPLE_RATE):
+    """
+    Merge per-window segment lists (timestamps relative to each window) into one transcript: shift to the
+    recording's timeline, keep each segment only in the window that owns its midpoint, drop words repeated
+    across a boundary and force timestamps to be monotonic.
+    """
+    stitched = []
+    for (own_start, own_end, window_start, _), segments in zip(windows, window_segments):
+        offset = window_start / sample_rate
+        kept = []
+        for segment in segments:
+            start, end = segment["start"] + offset, segment["end"] + offset
+            if own_start / sample_rate <= (start + end) / 2 < own_end / sample_rate:
+                kept.append(dict(segment, start=start, end=end))
+        # Only look for repeats when the two sides actually meet at the boundary.
+        if stitched and kept and kept[0]["start"] < stitched[-1]["end"] + JOIN_GAP_SECONDS:
+            _drop_repeated_words(stitched, kept)
+        stitched.extend(kept)
+
+    previous_end = 0.0
+    for index, segment in enumerate(stitched):
+        segment["id"] = index
+        segment["start"] = round(max(segment["start"], previous_end), 3)
+        segment["end"] = round(max(segment["end"], segment["start"]), 3)
+        previous_end = segment["end"]
+    return stitched
+
+def word_error_rate(reference, hypothesis):
+    """
+    Word-level Levenshtein distance divided by the reference length (case and punctuation ignored).
+    """
+    ref = [w for w in (_normalize_word(w) for w in reference.split()) if w]
+    hyp = [w for w in (_normalize_word(w) for w in hypothesis.split()) if w]
+    if not ref:
+        return float(bool(hyp))
+    vocabulary = {}
+    ref_ids = np.array([vocabulary.setdefault(w, len(vocabulary)) for w in ref])
+    hyp_ids = np.array([vocabulary.setdefault(w, len(vocabulary)) for w in hyp])
+    columns = np.arange(len(hyp_ids) + 1)
+    row = columns.astype(np.int64)
+    for i, word in enumerate(ref_ids, 1):
+        substitution = row[:-1] + (hyp_ids != word)
+        deletion = row[1:] + 1
+        best = np.concatenate(([i], np.minimum(substitution, deletion)))
+        # Insertions chain along the row: row[j] = min over k <= j of best[k] + (j - k).
+        row = np.minimum.accumulate(best - columns) + columns
+    return row[-1] / len(ref)
+
+class WorkerProcesses:
+    """
+    `count` private A_mlxWhisperDaemon processes, each with its own copy of the model on its own
+    socket (so each can run one job at a time, in parallel). Used by LongFileTranscriber and
+    transcriptionPool.TranscriptionPool. Call close() to stop them.
+    """
+
+    def __init__(self, count, backend_name="mlx_whisper", model_id=None, serve_args=(), startup_timeout=600,
+                 label="Workers"):
+        from A_mlxWhisperDaemon import DEFAULT_MODEL_ID, daemon_available
+        self._dir = tempfile.mkdtemp(prefix="whisper_workers_")
+        self.sockets = [os.path.join(self._dir, f"worker{i}.sock") for i in range(count)]
+        command = [sys.executable, DAEMON_SCRIPT]
+        serve = ["serve", "--backend", backend_name, "--model", model_id or DEFAULT_MODEL_ID, *serve_args]
+        self._processes = [
+            subprocess.Popen(command + ["--socket", path] + serve, stdout=subprocess.DEVNULL)
+            for path in self.sockets
+        ]
+        print(f"[{label}] Starting {count} {backend_name} worker(s)...")
+        start = time.perf_counter()
+        deadline = time.monotonic() + startup_timeout
+        for process, path in zip(self._processes, self.sockets):
+            while not daemon_available(path):
+                if process.poll() is not None or time.monotonic() > deadline:
+                    self.close()
+                    raise RuntimeError(f"Transcription worker on {path} failed to start")
+                time.sleep(0.1)
+        print(f"[{label}] Workers ready in {time.perf_counter() - start:.1f}s.")
+
+    def close(self):
+        for process in self._processes:
+            if process.poll() is None:
+                process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+class LongFileTranscriber:
+    """
+    Transcribes long recordings on several workers at once. Each worker is a private
+    A_mlxWhisperDaemon process with its own copy of the model (WorkerProcesses); the recording is cut
+    at pauses into overlapping windows (plan_windows), the windows are spread over the workers and the
+    results are stitched back together (stitch_windows). Use as a context manager, or call close().
+    """
+
+    def __init__(self, backend_name="mlx_whisper", model_id=None, workers=2,
+                 window_seconds=LONG_WINDOW_SECONDS, overlap_seconds=LONG_OVERLAP_SECONDS,
+                 serve_args=(), startup_timeout=600):
+        self.workers = workers
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self._executor = None
+        self._processes = WorkerProcesses(workers, backend_name, model_id, serve_args, startup_timeout, label="Long")
+        self.sockets = self._processes.sockets
+        self._free = queue.Queue()
+        for path in self.sockets:
+            self._free.put(path)
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def transcribe_window(self, samples, **options):
+        """
+        Send one array to the next free worker and return its segments (times relative to the array).
+        """
+        from A_mlxWhisperDaemon import stream_transcription
+        path = self._free.get()
+        try:
+            segments, language = [], None
+            for event in stream_transcription(samples, options=options, socket_path=path):
+                if event["type"] == "segment":
+                    segments.append({key: event[key] for key in ("id", "start", "end", "text")})
+                elif event["type"] == "done":
+                    language = event.get("language")
+            return segments, language
+        finally:
+            self._free.put(path)
+
+    def transcribe(self, audio, **options):
+        """
+        Same result shape as A_mlxWhisperDaemon.transcribe(); audio is a path or a 16 kHz float32 array.
+        """
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        start = time.perf_counter()
+        windows = plan_windows(audio, self.window_seconds, self.overlap_seconds)
+        futures = [
+            self._executor.submit(self.transcribe_window, audio[window_start:window_end], **options)
+            for _, _, window_start, window_end in windows
+        ]
+        results = [future.result() for future in futures]
+        segments = stitch_windows(windows, [segments for segments, _ in results])
+        language = next((language for _, language in results if language), None)
+        print(f"[Long] {len(audio) / SAMPLE_RATE:.0f}s in {len(windows)} windows on {self.workers} "
+              f"worker(s): {time.perf_counter() - start:.1f}s")
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": language}
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self._processes.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Synthetic audio for the demos ---
+
+def make_synthetic_speech(speech_spans, total_seconds, sample_rate=SAMPLE_RATE, noise_db=-55.0, seed=0):
+    """
+    Low-level noise with syllable-like bursts (amplitude-modulated harmonics) inside each (start, end)
+    span in seconds. Returns float32 samples.
+    """
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0.0, 10 ** (noise_db / 20), int(total_seconds * sample_rate)).astype(np.float32)
+    for start, end in speech_spans:
+        a, b = int(start * sample_rate), int(end * sample_rate)
+        t = np.arange(b - a) / sample_rate
+        pitch = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        syllables = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t)  # ~4 syllables per second
+        audio[a:b] += (0.15 * voice * syllables).astype(np.float32)
+    return audio
+
+def synthetic_spans(total_seconds, silence_ratio, seed=0):
+    """
+    Alternate speech and silence spans (2-12 s speech, silences sized to hit silence_ratio on average).
+    """
+    rng = np.random.default_rng(seed)
+    spans, position = [], rng.uniform(1.0, 4.0)
+    while position < total_seconds - 2:
+        speech = rng.uniform(2.0, 12.0)
+        end = min(position + speech, total_seconds - 1)
+        spans.append((position, end))
+        mean_silence = speech * silence_ratio / max(1e-6, 1 - silence_ratio)
+        position = end + max(1.0, rng.exponential(mean_silence))
+    return spans
+
+def detection_errors(spans, regions, total_samples, sample_rate=SAMPLE_RATE):
+    """
+    (missed, extra): the share of the known speech spans (seconds) outside the detected regions
+    (samples), and the share of the silence between them that was kept anyway.
+    """
+    truth = np.zeros(total_samples, dtype=bool)
+    for start, end in spans:
+        truth[int(start * sample_rate):int(end * sample_rate)] = True
+    detected = np.zeros(total_samples, dtype=bool)
+    for start, end in regions:
+        detected[start:end] = True
+    missed = np.sum(truth & ~detected) / max(1, np.sum(truth))
+    extra = np.sum(detected & ~truth) / max(1, np.sum(~truth))
+    return float(missed), float(extra)
+
+def make_tone_speech(total_seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """
+    Fixture for the tones backend: sentences of 3-12 tone-coded words (0.3 s each, 0.1 s apart)
+    separated by 0.8-3 s pauses over low-level noise. Returns (samples, reference transcript).
+    """
+    from A_mlxWhisperDaemon import TONE_WORDS, TONE_BASE_HZ, TONE_STEP_HZ
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0.0, 10 ** (-55 / 20), int(total_seconds * sample_rate)).astype(np.float32)
+    word_samples = int(0.3 * sample_rate)
+    t = np.arange(word_samples) / sample_rate
+    envelope = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01)  # 10 ms ramps, no clicks
+    words, position = [], rng.uniform(0.5, 2.0)
+    while True:
+        count = int(rng.integers(3, 13))
+        if position + 0.4 * count > total_seconds - 0.5:
+            break
+        for _ in range(count):
+            index = int(rng.integers(len(TONE_WORDS)))
+            start = int(position * sample_rate)
+            tone = np.sin(2 * np.pi * (TONE_BASE_HZ + index * TONE_STEP_HZ) * t) * envelope
+            audio[start:start + word_samples] += (0.3 * tone).astype(np.float32)
+            words.append(TONE_WORDS[index])
+            position += 0.4
+        position += rng.uniform(0.8, 3.0)
+    return audio, " ".join(words)
+
+def run_long_demo(total_seconds, worker_counts, work_factor, window_seconds):
+    """
+    Serial vs windowed transcription of a tone-coded fixture on the CPU-bound tones backend: wall time,
+    speedup and word error of each worker count against the serial transcript and the reference.
+    """
+    audio, reference = make_tone_speech(total_seconds)
+    serve_args = ["--tone-work-factor", str(work_factor)]
+    print(f"[Demo] {total_seconds:.0f}s fixture, {len(reference.split())} words, windows of {window_seconds:.0f}s.")
+    serial_text, serial_seconds = None, None
+    for workers in worker_counts:
+        with LongFileTranscriber("tones", "tones", workers, window_seconds=window_seconds, serve_args=serve_args) as transcriber:
+            if serial_text is None:
+                start = time.perf_counter()
+                segments, _ = transcriber.transcribe_window(audio)
+                serial_seconds = time.perf_counter() - start
+                serial_text = "".join(segment["text"] for segment in segments)
+                print(f"[Demo] Serial: {serial_seconds:.2f}s, WER vs reference {word_error_rate(reference, serial_text):.2%}")
+            start = time.perf_counter()
+            result = transcriber.transcribe(audio)
+            elapsed = time.perf_counter() - start
+        starts = [segment["start"] for segment in result["segments"]]
+        monotonic = all(a <= b for a, b in zip(starts, starts[1:]))
+        print(f"[Demo] {workers} worker(s): {elapsed:.2f}s ({serial_seconds / elapsed:.2f}x vs serial), "
+              f"WER vs serial {word_error_rate(serial_text, result['text']):.2%}, "
+              f"vs reference {word_error_rate(reference, result['text']):.2%}, monotonic timestamps: {monotonic}")
+
+def make_synthetic_video(path, seconds):
+    """
+    A test-pattern MP4 with a stereo AAC tone track, written by ffmpeg.
+    """
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-ac", "2", "-shortest", path,
+    ], check=True)
+
+def run_decode_benchmark(video_path, temp_dir):
+    """
+    Old path (ffmpeg -> _extracted.mp3 on disk -> decode the MP3 again) vs the in-memory pipe:
+    bytes written and wall time to get 16 kHz samples for the model.
+    """
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    temp_audio_path = os.path.join(temp_dir, base_name + "_extracted.mp3")
+    start = time.perf_counter()
+    subprocess.run(["ffmpeg", "-y", "-v", "error", "-i", video_path, "-q:a", "0", "-map", "a", temp_audio_path], check=True)
+    extract_seconds = time.perf_counter() - start
+    written = os.path.getsize(temp_audio_path)
+    via_file = load_audio(temp_audio_path)
+    file_seconds = time.perf_counter() - start
+    os.remove(temp_audio_path)
+
+    start = time.perf_counter()
+    via_pipe = load_audio(video_path)
+    pipe_seconds = time.perf_counter() - start
+
+    print(f"[Bench] {os.path.basename(video_path)}: {len(via_pipe) / SAMPLE_RATE:.1f}s of audio")
+    print(f"[Bench] Temp file: {file_seconds:.2f}s ({extract_seconds:.2f}s MP3 encode, {file_seconds - extract_seconds:.2f}s second decode), "
+          f"{written / 1e6:.2f} MB written, {len(via_file) / SAMPLE_RATE:.1f}s decoded")
+    print(f"[Bench] Pipe:      {pipe_seconds:.2f}s, 0 MB written -> {file_seconds / max(pipe_seconds, 1e-9):.2f}x faster")
+
+def run_demo(total_seconds, silence_ratio, realtime_factor):
+    """
+    Check detection against the known spans, then time the fake backend on the full audio and on
+    speech only.
+    """
+    from A_mlxWhisperDaemon import make_backend
+
+    spans = synthetic_spans(total_seconds, silence_ratio)
+    audio = make_synthetic_speech(spans, total_seconds)
+    regions = detect_speech(audio)
+
+    missed, extra = detection_errors(spans, regions, len(audio))
+    speech_seconds = sum(end - start for start, end in spans)
+    print(f"[Demo] {total_seconds:.0f}s synthetic audio, {len(spans)} speech spans, "
+          f"{100 * (1 - speech_seconds / total_seconds):.1f}% silence.")
+    print(f"[Demo] VAD found {len(regions)} regions: missed {100 * missed:.2f}% of speech, "
+          f"kept {100 * extra:.1f}% of silence (padding).")
+
+    backend = make_backend("fake", "fake", realtime_factor=realtime_factor)
+
+    def fake_transcribe(samples):
+        segments, info = backend.transcribe(samples)
+        segments = list(segments)
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": info["language"]}
+
+    start = time.perf_counter()
+    fake_transcribe(audio)
+    full_seconds = time.perf_counter() - start
+    result = transcribe_speech_only(audio, fake_transcribe)
+    speech_seconds = result["vad"]["transcribe_seconds"] + result["vad"]["vad_seconds"]
+    print(f"[Demo] Full pass {full_seconds:.2f}s, VAD + speech-only pass {speech_seconds:.2f}s "
+          f"-> {full_seconds / max(speech_seconds, 1e-9):.2f}x speedup.")
+
+    ends = [segment["end"] for segment in result["segments"]]
+    starts = [segment["start"] for segment in result["segments"]]
+    monotonic = all(a <= b for a, b in zip(starts, starts[1:])) and all(s <= e for s, e in zip(starts, ends))
+    inside = all(any(rs / SAMPLE_RATE - 1e-3 <= t <= re / SAMPLE_RATE + 1e-3 for rs, re in regions)
+                 for t in starts + ends)
+    print(f"[Demo] Remapped timestamps monotonic: {monotonic}; all segment boundaries inside speech regions: {inside}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper audio helpers: in-memory decoding and a VAD pre-pass.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    regions_parser = subparsers.add_parser("regions", help="Print the speech regions found in a file.")
+    regions_parser.add_argument("audio", help="Audio or video file (decoded with ffmpeg).")
+
+    demo_parser = subparsers.add_parser("demo", help="Run VAD on synthetic audio with known silences.")
+    demo_parser.add_argument("--seconds", type=float, default=600.0, help="Length of the synthetic recording.")
+    demo_parser.add_argument("--silence-ratio", type=float, default=0.4, help="Approximate share of silence.")
+    demo_parser.add_argument("--realtime-factor", type=float, default=0.01,
+                             help="Fake backend decode cost in seconds per second of audio.")
+    bench_parser = subparsers.add_parser("decode-bench", help="Compare the _extracted.mp3 temp-file path with the in-memory pipe.")
+    bench_parser.add_argument("video", nargs="?", help="Video file to decode (omit with --synthetic).")
+    bench_parser.add_argument("--synthetic", type=float, metavar="SECONDS", help="Generate a test MP4 of this length instead.")
+    bench_parser.add_argument("--temp-dir", default=tempfile.gettempdir(), help="Where the temp-file path writes its MP3 (e.g. the external drive).")
+
+    long_parser = subparsers.add_parser("long", help="Transcribe one long file in parallel windows.")
+    long_parser.add_argument("audio", help="Audio or video file (decoded with ffmpeg).")
+    long_parser.add_argument("--workers", type=int, default=2, help="Worker processes, each with its own model.")
+    long_parser.add_argument("--backend", default="mlx_whisper", help="Backend for the workers (see A_mlxWhisperDaemon).")
+    long_parser.add_argument("--model", help="Model for the workers (default: the daemon's default).")
+    long_parser.add_argument("--window-seconds", type=float, default=LONG_WINDOW_SECONDS, help="Target window length.")
+    long_parser.add_argument("--skip-silence", action="store_true", help="Run the VAD pre-pass first.")
+    long_parser.add_argument("--output", help="Write the transcript here instead of printing it.")
+
+    long_demo_parser = subparsers.add_parser("long-demo", help="Measure windowed transcription on a tone-coded fixture.")
+    long_demo_parser.add_argument("--seconds", type=float, default=1800.0, help="Length of the fixture.")
+    long_demo_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to measure.")
+    long_demo_parser.add_argument("--work-factor", type=int, default=20, help="CPU load of the tones backend per job.")
+    long_demo_parser.add_argument("--window-seconds", type=float, default=120.0, help="Target window length.")
+    args = parser.parse_args()
+
+    if args.command == "regions":
+        audio = load_audio(args.audio)
+        regions = detect_speech(audio)
+        for start, end in regions:
+            print(f"{start / SAMPLE_RATE:9.2f} -> {end / SAMPLE_RATE:9.2f}")
+        timeline = SpeechTimeline(audio, regions)
+        print(f"[VAD] {len(regions)} regions, {timeline.speech_seconds:.1f}s of speech in "
+              f"{timeline.total_seconds:.1f}s ({100 * timeline.skipped_fraction:.1f}% skippable).")
+    elif args.command == "demo":
+        run_demo(args.seconds, args.silence_ratio, args.realtime_factor)
+    elif args.command == "decode-bench":
+        if args.synthetic:
+            video_path = os.path.join(args.temp_dir, "decode_bench_synthetic.mp4")
+            make_synthetic_video(video_path, args.synthetic)
+            try:
+                run_decode_benchmark(video_path, args.temp_dir)
+            finally:
+                os.remove(video_path)
+        elif args.video:
+            run_decode_benchmark(args.video, args.temp_dir)
+        else:
+            parser.error("decode-bench needs a video file or --synthetic SECONDS")
+    elif args.command == "long":
+        with LongFileTranscriber(args.backend, args.model, args.workers, window_seconds=args.window_seconds) as transcriber:
+            if args.skip_silence:
+                result = transcribe_speech_only(args.audio, transcriber.transcribe)
+            else:
+                result = transcriber.transcribe(args.audio)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(result["text"])
+            print(f"Transcription saved to: {args.output}")
+        else:
+            print(result["text"])
+    elif args.command == "long-demo":
+        run_long_demo(args.seconds, args.workers, args.work_factor, args.window_seconds)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Audio-only downloads for speech recognition, shared by the YouTube download scripts.
+
+Instead of fetching the video and re-encoding it to MP3, download_audio asks yt-dlp for the
+smallest audio-only stream that is still fine for Whisper and copy_audio_stream moves that stream
+into a plain audio container with ffmpeg -c:a copy, so there is no transcoding at all.
+
+Example Usages:
+
+1. From a script:
+   from audioDownload import download_audio
+   audio_file = download_audio(video_url, folder, metadata_cache)   # e.g. "Title [id].opus"
+
+2. Stream-copy an already downloaded file:
+   from audioDownload import copy_audio_stream
+   audio_file = copy_audio_stream("Title [id].webm", "opus")
+
+Notes:
+- download_audio raises on a failed download so DownloadController can retry or report it.
+- A codec missing from AUDIO_COPY_EXTENSIONS keeps the downloaded file as it is.
+"""
+import os
+import subprocess
+
+import yt_dlp
+
+from playlistMetadata import extract_video
+
+# Smallest audio-only stream still fine for speech recognition (Whisper resamples to 16 kHz mono
+# anyway; YouTube's ~50 kbps Opus is plenty), then any audio, then a muxed file as a last resort.
+# ASR_FORMAT_SORT ranks lower bitrates first, so "best" here means the smallest that passes the filter.
+ASR_AUDIO_FORMAT = "bestaudio[abr>=48]/bestaudio/best"
+ASR_FORMAT_SORT = ["+abr"]
+# Audio container for each codec when copying the stream out without re-encoding.
+AUDIO_COPY_EXTENSIONS = {"opus": ".opus", "mp4a": ".m4a", "vorbis": ".ogg", "mp3": ".mp3"}
+
+def download_audio(video_url, output_folder, metadata_cache=None):
+    """
+    Download only the audio stream picked by ASR_AUDIO_FORMAT, then stream-copy it into a plain audio
+    container (no re-encode). video_url may also be an already extracted info dict; a fresh cached
+    info dict from metadata_cache is reused. Returns the audio filename; raises on a failed download.
+    """
+    outtmpl = os.path.join(output_folder, "%(title)s [%(id)s].%(ext)s")
+    ydl_opts = {
+        'format': ASR_AUDIO_FORMAT,
+        'format_sort': ASR_FORMAT_SORT,
+        'outtmpl': outtmpl,
+        'ignoreerrors': False,  # errors must reach DownloadController so it can retry or report them
+    }
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = extract_video(ydl, video_url, metadata_cache)
+            if info is None:
+                print(f"[Download] No info for video: {video_url}")
+                return None
+            media_file = ydl.prepare_filename(info)
+        size = os.path.getsize(media_file)
+        print(f"[Download] Downloaded audio: {media_file} "
+              f"({size / 1e6:.1f} MB, {info.get('acodec')} at {info.get('abr')} kbps)")
+        return copy_audio_stream(media_file, info.get("acodec"))
+    except Exception as e:
+        print(f"[Download] Error downloading audio {video_url}: {e}")
+        raise
+
+def copy_audio_stream(media_file, acodec):
+    """
+    Move the audio stream of media_file into the matching audio container with ffmpeg -c:a copy
+    (e.g. Opus in WebM -> .opus). No transcoding, so this costs almost no CPU.
+    Deletes media_file on success and returns the new path; returns media_file unchanged if it
+    is already in the right container or the codec is unknown.
+    """
+    extension = AUDIO_COPY_EXTENSIONS.get((acodec or "").split(".")[0])
+    base, ext = os.path.splitext(media_file)
+    if extension is None or ext.lower() == extension:
+        return media_file
+    audio_file = base + extension
+    try:
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error", "-i", media_file,
+            "-map", "0:a:0", "-c:a", "copy",
+            audio_file
+        ], check=True)
+        os.remove(media_file)
+        print(f"[Conversion] Stream-copied audio to: {audio_file}")
+        return audio_file
+    except subprocess.CalledProcessError as e:
+        print(f"[Conversion] Error copying audio out of {media_file}: {e}")
+        return media_file
@@ -0,0 +1,236 @@
+"""
+CPU-aware scheduler for ffmpeg conversion jobs, shared by the YouTube download scripts.
+
+The scripts used to start a fixed number of conversion threads (CONVERSION_CONCURRENCY = 8, or 3)
+no matter how many cores the machine has, and every ffmpeg took as many threads as it liked while
+the downloads competed for the same cores. ConversionScheduler sizes itself from os.cpu_count(),
+hands each job an ffmpeg thread budget, and every few seconds moves its concurrency limit up or
+down from the load average and from how full the downstream queue is.
+
+Example Usages:
+
+1. From a script (job_fn gets the item and the ffmpeg thread budget for it):
+   from conversionScheduler import ConversionScheduler
+   scheduler = ConversionScheduler(lambda path, threads: convert_to_mp3(path, threads))
+   scheduler.submit(video_file)      # blocks when input_queue_size jobs are already waiting
+   scheduler.close()                 # waits for the queued jobs, then prints the metrics
+
+2. Benchmark fixed concurrency without thread limits vs the scheduler on synthetic media:
+   python conversionScheduler.py --files 24 --seconds 120
+
+Notes:
+- The 1-minute load average reacts slowly, so the limit moves by one slot per ADJUST_INTERVAL_SECONDS.
+- metrics() returns queue depth, active jobs, the current limit and jobs/min; the same line is printed
+  every REPORT_INTERVAL_SECONDS while jobs are running.
+"""
+import os
+import sys
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+FFMPEG_THREADS_PER_JOB = 2
+# Load average per core above which a slot is taken away, and below which one is given back
+# (only while jobs are waiting).
+LOAD_HIGH_PER_CORE = 1.0
+LOAD_LOW_PER_CORE = 0.7
+# A downstream queue at least this full counts as backed up: converting faster would only pile up files.
+DOWNSTREAM_HIGH_WATER = 0.75
+ADJUST_INTERVAL_SECONDS = 5.0
+REPORT_INTERVAL_SECONDS = 30.0
+
+_DONE = object()
+
+class ConversionScheduler:
+    """
+    Worker threads that each run one conversion at a time (the work happens in the ffmpeg process),
+    with at most `limit` of them running at once. limit starts at max_jobs and is adjusted between
+    1 and max_jobs by a controller thread.
+    """
+
+    def __init__(self, job_fn, name="Conversion", max_jobs=None, threads_per_job=FFMPEG_THREADS_PER_JOB,
+                 input_queue_size=0, downstream=None, adjust_interval=ADJUST_INTERVAL_SECONDS,
+                 load_fn=None, verbose=True):
+        self.job_fn = job_fn
+        self.name = name
+        self.cores = os.cpu_count() or 1
+        self.threads_per_job = threads_per_job
+        self.max_jobs = max_jobs or max(1, self.cores // threads_per_job)
+        self.limit = self.max_jobs
+        self.jobs = queue.Queue(maxsize=input_queue_size)
+        self.downstream = downstream
+        self.adjust_interval = adjust_interval
+        self.load_fn = load_fn or (lambda: os.getloadavg()[0])
+        self.verbose = verbose
+        self.active = 0
+        self.done = 0
+        self.failed = 0
+        self.peak_load = 0.0
+        self.started = time.perf_counter()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(self.max_jobs)]
+        for worker in self._workers:
+            worker.start()
+        self._controller = threading.Thread(target=self._control, daemon=True)
+        self._controller.start()
+        if verbose:
+            print(f"[{name}] Up to {self.max_jobs} jobs at once ({self.cores} cores, "
+                  f"{threads_per_job} ffmpeg threads per job).")
+
+    def submit(self, item):
+        self.jobs.put(item)
+
+    def _work(self):
+        while True:
+            item = self.jobs.get()
+            if item is _DONE:
+                break
+            with self._cond:
+                while self.active >= self.limit:
+                    self._cond.wait()
+                self.active += 1
+            try:
+                self.job_fn(item, self.threads_per_job)
+            except Exception as e:
+                print(f"[{self.name}] Job failed for {item}: {e}")
+                with self._cond:
+                    self.failed += 1
+            finally:
+                with self._cond:
+                    self.active -= 1
+                    self.done += 1
+                    self._cond.notify_all()
+
+    def _control(self):
+        last_report = time.perf_counter()
+        while not self._stop.wait(self.adjust_interval):
+            self.adjust()
+            if self.verbose and time.perf_counter() - last_report >= REPORT_INTERVAL_SECONDS and (self.active or self.jobs.qsize()):
+                print(self.format_metrics())
+                last_report = time.perf_counter()
+
+    def adjust(self):
+        """
+        Move the concurrency limit by one slot based on the load average and the downstream queue.
+        """
+        load = self.load_fn() / self.cores
+        self.peak_load = max(self.peak_load, load)
+        downstream = self.downstream
+        backed_up = bool(downstream is not None and downstream.maxsize
+                         and downstream.qsize() >= DOWNSTREAM_HIGH_WATER * downstream.maxsize)
+        with self._cond:
+            previous = self.limit
+            if load > LOAD_HIGH_PER_CORE or backed_up:
+                self.limit = max(1, self.limit - 1)
+            elif load < LOAD_LOW_PER_CORE and self.jobs.qsize() > 0:
+                self.limit = min(self.max_jobs, self.limit + 1)
+            self._cond.notify_all()
+        if self.verbose and self.limit != previous:
+            reason = "downstream backed up" if backed_up else f"load {load:.2f}/core"
+            print(f"[{self.name}] Concurrency {previous} -> {self.limit} ({reason})")
+
+    def metrics(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "queued": self.jobs.qsize(),
+            "active": self.active,
+            "limit": self.limit,
+            "done": self.done,
+            "failed": self.failed,
+            "jobs_per_min": round(60 * self.done / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def format_metrics(self):
+        m = self.metrics()
+        return (f"[{self.name}] queued {m['queued']}, active {m['active']}/{m['limit']}, "
+                f"{m['done']} done ({m['failed']} failed), {m['jobs_per_min']:.1f} jobs/min")
+
+    def close(self):
+        """
+        Wait for every submitted job, stop the workers and print the final metrics.
+        """
+        for _ in self._workers:
+            self.jobs.put(_DONE)
+        for worker in self._workers:
+            worker.join()
+        self._stop.set()
+        self._controller.join()
+        if self.verbose:
+            print(self.format_metrics())
+
+# --- Benchmark ---
+
+def make_synthetic_videos(folder, count, seconds):
+    """
+    `count` test-pattern MP4s with an AAC tone track, like the downloads the scripts convert.
+    """
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, f"video{index:03d}.mp4")
+        subprocess.run([
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={seconds}",
+            "-f", "lavfi", "-i", f"sine=frequency={300 + 20 * index}:sample_rate=44100:duration={seconds}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-ac", "2", "-shortest", path,
+        ], check=True)
+        paths.append(path)
+    return paths
+
+def _convert(video_file, threads=None):
+    """
+    The scripts' MP4 -> 192k MP3 conversion, with an optional ffmpeg thread limit.
+    """
+    mp3_file = os.path.splitext(video_file)[0] + ".mp3"
+    limit = ["-threads", str(threads)] if threads else []  # decoder (before -i) and encoder (after)
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error", *limit, "-i", video_file,
+        "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k", *limit,
+        mp3_file
+    ], check=True)
+
+def run_benchmark(files, seconds, fixed_concurrency):
+    work_dir = tempfile.mkdtemp(prefix="conversion_bench_")
+    try:
+        print(f"[Benchmark] Building {files} synthetic {seconds:.0f}s videos in {work_dir}...")
+        videos = make_synthetic_videos(work_dir, files, seconds)
+
+        # Old design: a fixed number of threads, each ffmpeg free to use every core.
+        start = time.perf_counter()
+        fixed = ConversionScheduler(lambda path, threads: _convert(path), name="Fixed",
+                                    max_jobs=fixed_concurrency, adjust_interval=3600, verbose=False)
+        for video in videos:
+            fixed.submit(video)
+        fixed.close()
+        fixed_seconds = time.perf_counter() - start
+        print(f"[Benchmark] Fixed {fixed_concurrency} threads: {fixed_seconds:.1f}s, "
+              f"{60 * files / fixed_seconds:.1f} jobs/min")
+
+        start = time.perf_counter()
+        scheduler = ConversionScheduler(_convert, adjust_interval=1.0)
+        for video in videos:
+            scheduler.submit(video)
+        scheduler.close()
+        scheduled_seconds = time.perf_counter() - start
+        print(f"[Benchmark] Scheduler ({scheduler.max_jobs} x {scheduler.threads_per_job} threads): "
+              f"{scheduled_seconds:.1f}s, {60 * files / scheduled_seconds:.1f} jobs/min, "
+              f"peak load {scheduler.peak_load:.2f}/core -> {fixed_seconds / scheduled_seconds:.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fixed-concurrency ffmpeg conversions against ConversionScheduler.")
+    parser.add_argument("--files", type=int, default=24, help="Number of synthetic videos to convert.")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Length of each synthetic video.")
+    parser.add_argument("--fixed-concurrency", type=int, default=8, help="Thread count of the old fixed design.")
+    args = parser.parse_args()
+    if not shutil.which("ffmpeg"):
+        sys.exit("ffmpeg is required for the benchmark.")
+    run_benchmark(args.files, args.seconds, args.fixed_concurrency)
+
+if __name__ == "__main__":
+    main()
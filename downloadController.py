@@ -0,0 +1,390 @@
+"""
+Adaptive download concurrency, per-host rate limiting and retries for the YouTube download scripts.
+
+The scripts used to run a fixed DOWNLOAD_CONCURRENCY of yt-dlp calls with 'ignoreerrors': True. When
+the server started throttling, every in-flight download failed at once and the videos silently went
+missing. DownloadController wraps each download instead:
+
+- AIMD concurrency: one more slot after every window in which throughput held up, half the slots
+  after an HTTP 429 (once per burst: 429s from downloads already running at the last cut don't cut again),
+  a quarter fewer when throughput drops sharply (a slow-down without a 429).
+- Per-host token bucket, plus a pause for the whole host after a 429 (honouring Retry-After).
+- Retries with jittered exponential backoff for throttling and transient errors; other errors
+  (private/removed videos, 404s) fail at once.
+- A failure report listing every video that still failed after all attempts.
+
+Example Usages:
+
+1. From a script:
+   from downloadController import DownloadController
+   controller = DownloadController(initial=DOWNLOAD_CONCURRENCY, max_concurrency=DOWNLOAD_CONCURRENCY_MAX)
+   with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+       pool.map(lambda url: controller.run(download_audio, url, folder), urls)
+   controller.write_failure_report(download_folder)
+
+2. Benchmark against a local HTTP server that throttles (429 above a concurrency limit, shared bandwidth):
+   python downloadController.py --files 60 --server-limit 4
+
+Notes:
+- Download functions must raise on failure (yt-dlp with 'ignoreerrors': False); run() returns None
+  for a video that permanently failed.
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlparse
+
+# --- AIMD concurrency ---
+WINDOW_SECONDS = 10.0        # throughput is compared window to window
+DECREASE_FACTOR = 0.5        # after an HTTP 429
+SLOWDOWN_RATIO = 0.7         # throughput below this share of the previous window counts as a slow-down...
+SLOWDOWN_FACTOR = 0.75       # ...and scales the concurrency by this
+# --- Per-host rate limit ---
+HOST_REQUESTS_PER_SECOND = 2.0
+HOST_BURST = 4
+# --- Retries ---
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_CAP_SECONDS = 120.0
+FAILURE_REPORT_NAME = "failed_downloads.json"
+
+TRANSIENT_MARKERS = ("timed out", "timeout", "connection reset", "connection refused", "temporarily",
+                     "remote end closed", "incomplete", "http error 500", "http error 502", "http error 503",
+                     "http error 504")
+
+def _error_status(error):
+    """
+    HTTP status behind an error, if any: urllib's HTTPError.code, or yt-dlp's wrapped exception.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        for attribute in ("code", "status"):
+            value = getattr(error, attribute, None)
+            if isinstance(value, int):
+                return value
+        response = getattr(error, "response", None)
+        if response is not None and isinstance(getattr(response, "status", None), int):
+            return response.status
+        exc_info = getattr(error, "exc_info", None)
+        error = (exc_info[1] if exc_info else None) or error.__cause__ or error.__context__
+    return None
+
+def retry_after_seconds(error):
+    """
+    The Retry-After header (in seconds) of the HTTP response behind an error, if there is one.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                return float(headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                pass
+        exc_info = getattr(error, "exc_info", None)
+        error = (exc_info[1] if exc_info else None) or error.__cause__ or error.__context__
+    return None
+
+def classify_error(error):
+    """
+    "throttled" (HTTP 429), "transient" (worth retrying) or "permanent".
+    """
+    status = _error_status(error)
+    text = str(error).lower()
+    if status == 429 or "http error 429" in text or "too many requests" in text:
+        return "throttled"
+    if (status is not None and status >= 500) or any(marker in text for marker in TRANSIENT_MARKERS):
+        return "transient"
+    return "permanent"
+
+def backoff_seconds(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_CAP_SECONDS):
+    """
+    Full-jitter exponential backoff: uniform between 0 and min(cap, base * 2^(attempt - 1)).
+    """
+    return random.uniform(0.0, min(cap, base * 2 ** (attempt - 1)))
+
+class HostRateLimiter:
+    """
+    A token bucket per host, plus a pause for the whole host after it answers 429.
+    """
+
+    def __init__(self, rate=HOST_REQUESTS_PER_SECOND, burst=HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = {}        # host -> (tokens, last refill time)
+        self._paused_until = {}  # host -> monotonic time
+
+    def wait(self, host):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                pause = self._paused_until.get(host, 0.0) - now
+                if pause <= 0:
+                    tokens, last = self._tokens.get(host, (float(self.burst), now))
+                    tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+                    if tokens >= 1.0:
+                        self._tokens[host] = (tokens - 1.0, now)
+                        return
+                    self._tokens[host] = (tokens, now)
+                    pause = (1.0 - tokens) / self.rate
+            time.sleep(pause)
+
+    def pause(self, host, seconds):
+        with self._lock:
+            self._paused_until[host] = max(self._paused_until.get(host, 0.0), time.monotonic() + seconds)
+
+class DownloadController:
+    """
+    Gates downloads to `limit` at a time (adjusted AIMD-style between min and max_concurrency),
+    rate-limits requests per host and retries failures. Run it behind a thread pool of
+    max_concurrency workers; the extra workers wait for a slot.
+    """
+
+    def __init__(self, initial=10, max_concurrency=32, min_concurrency=1, max_attempts=MAX_ATTEMPTS,
+                 rate_limiter=None, size_fn=None, window_seconds=WINDOW_SECONDS, verbose=True):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(max_concurrency, initial)
+        self.limit = float(initial)
+        self.max_attempts = max_attempts
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        # Bytes a finished download produced; file size by default.
+        self.size_fn = size_fn or (lambda result: os.path.getsize(result) if isinstance(result, str) and os.path.exists(result) else 0)
+        self.window_seconds = window_seconds
+        self.verbose = verbose
+        self.active = 0
+        self.succeeded = 0
+        self.retries = 0
+        self.throttle_events = 0
+        self.failures = []
+        self.peak_limit = self.limit
+        self._cond = threading.Condition()
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_items = 0
+        self._last_throughput = None
+        self._last_cut = None  # monotonic time of the last 429 cut
+
+    def _acquire(self):
+        """
+        Wait for a slot; returns the monotonic time the download started.
+        """
+        with self._cond:
+            while self.active >= max(self.min_concurrency, int(self.limit)):
+                self._cond.wait()
+            self.active += 1
+            return time.monotonic()
+
+    def _release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def _set_limit(self, limit, reason):
+        # Caller holds self._cond.
+        previous = int(self.limit)
+        self.limit = min(float(self.max_concurrency), max(float(self.min_concurrency), limit))
+        self.peak_limit = max(self.peak_limit, self.limit)
+        if self.verbose and int(self.limit) != previous:
+            print(f"[Download] Concurrency {previous} -> {int(self.limit)} ({reason})")
+        self._cond.notify_all()
+
+    def _record_success(self, nbytes):
+        with self._cond:
+            self.succeeded += 1
+            self._window_bytes += nbytes
+            self._window_items += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed < self.window_seconds:
+                return
+            # Bytes per second when the downloads report sizes, otherwise downloads per second.
+            throughput = (self._window_bytes or self._window_items) / elapsed
+            previous = self._last_throughput
+            if previous is not None and throughput < SLOWDOWN_RATIO * previous:
+                self._set_limit(self.limit * SLOWDOWN_FACTOR, "throughput dropped")
+            elif self.active >= int(self.limit) - 1:
+                # Throughput held up and the slots are in use: probe one more.
+                self._set_limit(self.limit + 1, "throughput holding up")
+            self._last_throughput = throughput
+            self._window_start, self._window_bytes, self._window_items = now, 0, 0
+
+    def _record_throttle(self, started):
+        with self._cond:
+            self.throttle_events += 1
+            # Downloads that were already in flight at the last cut answer 429 together; they belong
+            # to that one congestion event, so only a 429 from a download started after it cuts again.
+            if self._last_cut is not None and started < self._last_cut:
+                return
+            self._last_cut = time.monotonic()
+            self._set_limit(self.limit * DECREASE_FACTOR, "HTTP 429")
+            # Throughput right after a cut is not comparable to before it.
+            self._last_throughput = None
+            self._window_start, self._window_bytes, self._window_items = time.monotonic(), 0, 0
+
+    def run(self, fn, video_url, *args):
+        """
+        Call fn(video_url, *args) under the controller. Returns its result, or None once the video
+        has permanently failed (it is then listed in the failure report).
+        """
+        # yt-dlp info dicts (the fixture benchmarks) are labelled by their page URL.
+        label = (video_url.get("webpage_url") or video_url.get("id")) if isinstance(video_url, dict) else str(video_url)
+        host = urlparse(label).netloc or "local"
+        for attempt in range(1, self.max_attempts + 1):
+            self.rate_limiter.wait(host)
+            started = self._acquire()
+            try:
+                result = fn(video_url, *args)
+            except Exception as e:
+                self._release()
+                kind = classify_error(e)
+                hint = retry_after_seconds(e)
+                if kind == "throttled":
+                    self._record_throttle(started)
+                    self.rate_limiter.pause(host, hint if hint is not None else backoff_seconds(attempt))
+                if kind == "permanent" or attempt == self.max_attempts:
+                    self.failures.append({"url": label, "attempts": attempt, "kind": kind, "error": str(e)})
+                    if self.verbose:
+                        print(f"[Download] Giving up on {label} after {attempt} attempt(s): {e}")
+                    return None
+                delay = max(hint or 0.0, backoff_seconds(attempt))
+                self.retries += 1
+                if self.verbose:
+                    print(f"[Download] {kind.capitalize()} on {label} (attempt {attempt}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self._release()
+            self._record_success(self.size_fn(result))
+            return result
+        return None
+
+    def summary(self):
+        return (f"[Download] {self.succeeded} downloaded, {len(self.failures)} failed permanently, "
+                f"{self.retries} retries, {self.throttle_events} throttle events, "
+                f"concurrency now {int(self.limit)} (peak {int(self.peak_limit)})")
+
+    def write_failure_report(self, folder):
+        """
+        Print the summary and write FAILURE_REPORT_NAME into folder if anything failed. Returns its path or None.
+        """
+        print(self.summary())
+        if not self.failures:
+            return None
+        path = os.path.join(folder, FAILURE_REPORT_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.failures, f, indent=2, ensure_ascii=False)
+        print(f"[Download] {len(self.failures)} video(s) permanently failed; see {path}")
+        for failure in self.failures:
+            print(f"    {failure['url']}: {failure['error']}")
+        return path
+
+# --- Benchmark ---
+
+def run_benchmark(files, server_limit, bandwidth_mbps, missing, fixed_concurrency):
+    """
+    A local server with a hard concurrency limit (429 + Retry-After above it) and shared bandwidth
+    serves `files` downloads, `missing` of them 404. Compares the old fixed pool without retries
+    with the controller.
+    """
+    import http.server
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+
+    payload = os.urandom(512 * 1024)
+    state = {"active": 0, "throttled": 0}
+    lock = threading.Lock()
+
+    class ThrottlingHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/missing"):
+                self.send_error(404)
+                return
+            with lock:
+                if state["active"] >= server_limit:
+                    state["throttled"] += 1
+                    throttled = True
+                else:
+                    state["active"] += 1
+                    throttled = False
+            if throttled:
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.end_headers()
+                return
+            try:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                chunk = 64 * 1024
+                for offset in range(0, len(payload), chunk):
+                    # Connections share the server's bandwidth.
+                    with lock:
+                        share = bandwidth_mbps * 1e6 / 8 / max(1, state["active"])
+                    time.sleep(chunk / share)
+                    self.wfile.write(payload[offset:offset + chunk])
+            finally:
+                with lock:
+                    state["active"] -= 1
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/missing/{i}" if i < missing else f"{base}/video/{i}" for i in range(files)]
+
+    def fetch(url):
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return len(response.read())
+
+    def fetch_or_none(url):
+        # The old behaviour: 'ignoreerrors': True turns every failure into a missing video.
+        try:
+            return fetch(url)
+        except Exception:
+            return None
+
+    try:
+        state["throttled"] = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=fixed_concurrency) as pool:
+            results = list(pool.map(fetch_or_none, urls))
+        elapsed = time.perf_counter() - start
+        print(f"[Benchmark] Fixed {fixed_concurrency}, no retries: {sum(r is not None for r in results)}/{files} "
+              f"downloaded in {elapsed:.1f}s, {state['throttled']} requests throttled, "
+              f"{sum(r is None for r in results)} missing without a report")
+
+        state["throttled"] = 0
+        controller = DownloadController(initial=fixed_concurrency, max_concurrency=2 * fixed_concurrency,
+                                        rate_limiter=HostRateLimiter(rate=20, burst=20),
+                                        size_fn=lambda nbytes: nbytes or 0, window_seconds=0.5, verbose=False)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=controller.max_concurrency) as pool:
+            results = list(pool.map(lambda url: controller.run(fetch, url), urls))
+        elapsed = time.perf_counter() - start
+        print(f"[Benchmark] Controller: {sum(r is not None for r in results)}/{files} downloaded in {elapsed:.1f}s, "
+              f"{state['throttled']} requests throttled, {controller.retries} retries, "
+              f"concurrency ended at {int(controller.limit)} (peak {int(controller.peak_limit)})")
+        print(f"[Benchmark] Permanent failures reported: {len(controller.failures)} "
+              f"({sum(f['kind'] == 'permanent' for f in controller.failures)} of them 404s)")
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the adaptive download controller against a throttling local server.")
+    parser.add_argument("--files", type=int, default=60, help="Downloads to run.")
+    parser.add_argument("--server-limit", type=int, default=4, help="Concurrent requests the server accepts before answering 429.")
+    parser.add_argument("--bandwidth-mbps", type=float, default=80.0, help="Server bandwidth shared by all connections.")
+    parser.add_argument("--missing", type=int, default=3, help="How many of the URLs are 404s (permanent failures).")
+    parser.add_argument("--fixed-concurrency", type=int, default=10, help="Pool size of the old fixed design.")
+    args = parser.parse_args()
+    run_benchmark(args.files, args.server_limit, args.bandwidth_mbps, args.missing, args.fixed_concurrency)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import os
 from faster_whisper import WhisperModel
+from transcriptIndex import TranscriptIndex
+from transcriptEmbeddings import EmbeddingStore
+from segmentWriters import TranscriptWriter
 from moviepy.editor import VideoFileClip
 
 # --- Configuration ---
@@ -13,6 +16,12 @@ PROGRESS_INTERVAL = 30
 LANGUAGE = "en"
 # Model identifier from Hugging Face (e.g., "distil-large-v3").
 MODEL_ID = "distil-large-v3"
+# Outputs written segment by segment next to the video ("txt", "jsonl", "srt", "vtt"; see segmentWriters).
+OUTPUT_FORMATS = ["txt", "jsonl", "srt", "vtt"]
+# Add each finished transcript to the local search index (see transcriptIndex).
+SEARCH_INDEX = True
+# ...and embed it into the semantic search store (see transcriptEmbeddings) without waiting for an `update` run.
+EMBEDDINGS = True
 # ----------------------
 
 def is_video_file(filename: str) -> bool:
@@ -21,6 +30,8 @@ def is_video_file(filename: str) -> bool:
 
 # Load the Whisper model once for processing.
 model = WhisperModel(MODEL_ID)
+search_index = TranscriptIndex() if SEARCH_INDEX else None
+embedding_store = EmbeddingStore() if EMBEDDINGS else None
 
 # Process each video file in the folder.
 for filename in os.listdir(VIDEO_FOLDER):
@@ -45,23 +56,16 @@ for filename in os.listdir(VIDEO_FOLDER):
             condition_on_previous_text=False
         )
         
-        transcript_lines = []
         next_progress = PROGRESS_INTERVAL
         
-        # Collect transcript text from each segment.
-        for segment in segments:
-            transcript_lines.append(segment.text)
-            # Print a progress message at every 30-second interval.
-            if segment.start >= next_progress:
-                print(f"Reached approximately {int(segment.start)} seconds in '{filename}'")
-                next_progress += PROGRESS_INTERVAL
+        # Write each segment to disk as soon as the generator yields it, so memory stays flat and the
+        # partial transcript (<name>.<format>.partial) can be read while a long file is still running.
+        with TranscriptWriter(os.path.join(VIDEO_FOLDER, base_name), OUTPUT_FORMATS, index=search_index, embeddings=embedding_store, text_separator="\n") as writer:
+            for segment in segments:
+                writer.write(segment)
+                # Print a progress message at every 30-second interval.
+                if segment.start >= next_progress:
+                    print(f"Reached approximately {int(segment.start)} seconds in '{filename}'")
+                    next_progress += PROGRESS_INTERVAL
         
-        # Combine all the segment texts into one full transcript.
-        full_transcript = "\n".join(transcript_lines)
-        
-        # Save the full transcript to a text file.
-        transcript_file = os.path.join(VIDEO_FOLDER, base_name + ".txt")
-        with open(transcript_file, "w", encoding="utf-8") as f:
-            f.write(full_transcript)
-        
-        print(f"Transcription saved to: {transcript_file}")
\ No newline at end of file
+        print(f"Transcription saved to: {', '.join(writer.paths)}")
\ No newline at end of file
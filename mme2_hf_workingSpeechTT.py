@@ -1,5 +1,8 @@
 import os
 from faster_whisper import WhisperModel
+from transcriptIndex import TranscriptIndex
+from transcriptEmbeddings import EmbeddingStore
+from segmentWriters import TranscriptWriter
 
 # --- Configuration ---
 # Folder where your audio files are located.
@@ -12,6 +15,12 @@ PROGRESS_INTERVAL = 30
 LANGUAGE = "en"
 # Model identifier from Hugging Face (e.g., "distil-large-v3").
 MODEL_ID = "distil-large-v3"
+# Outputs written segment by segment next to the audio ("txt", "jsonl", "srt", "vtt"; see segmentWriters).
+OUTPUT_FORMATS = ["txt", "jsonl", "srt", "vtt"]
+# Add each finished transcript to the local search index (see transcriptIndex).
+SEARCH_INDEX = True
+# ...and embed it into the semantic search store (see transcriptEmbeddings) without waiting for an `update` run.
+EMBEDDINGS = True
 # ----------------------
 
 
@@ -23,13 +32,14 @@ def is_audio_file(filename: str) -> bool:
 
 # Load the model once (this will process all files using the same instance)
 model = WhisperModel(MODEL_ID)
+search_index = TranscriptIndex() if SEARCH_INDEX else None
+embedding_store = EmbeddingStore() if EMBEDDINGS else None
 
 # Process each audio file in the folder.
 for filename in os.listdir(AUDIO_FOLDER):
     if is_audio_file(filename):
         audio_path = os.path.join(AUDIO_FOLDER, filename)
         base_name = os.path.splitext(filename)[0]
-        output_file = os.path.join(AUDIO_FOLDER, base_name + ".txt")
         
         print(f"\nProcessing file: {audio_path}")
         
@@ -40,22 +50,16 @@ for filename in os.listdir(AUDIO_FOLDER):
             condition_on_previous_text=False
         )
         
-        transcript_lines = []
         next_progress = PROGRESS_INTERVAL
         
-        # Iterate over all segments and collect text.
-        for segment in segments:
-            transcript_lines.append(segment.text)
-            # Every time we pass a 30-second boundary, print a progress message.
-            if segment.start >= next_progress:
-                print(f"Reached approximately {int(segment.start)} seconds in '{filename}'")
-                next_progress += PROGRESS_INTERVAL
+        # Write each segment to disk as soon as the generator yields it, so memory stays flat and the
+        # partial transcript (<name>.<format>.partial) can be read while a long file is still running.
+        with TranscriptWriter(os.path.join(AUDIO_FOLDER, base_name), OUTPUT_FORMATS, index=search_index, embeddings=embedding_store, text_separator="\n") as writer:
+            for segment in segments:
+                writer.write(segment)
+                # Every time we pass a 30-second boundary, print a progress message.
+                if segment.start >= next_progress:
+                    print(f"Reached approximately {int(segment.start)} seconds in '{filename}'")
+                    next_progress += PROGRESS_INTERVAL
         
-        # Combine all the segment texts into one full transcript.
-        full_transcript = "\n".join(transcript_lines)
-        
-        # Write the full transcript to a text file in the same folder as the audio.
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(full_transcript)
-        
-        print(f"Transcription saved to: {output_file}")
\ No newline at end of file
+        print(f"Transcription saved to: {', '.join(writer.paths)}")
\ No newline at end of file
@@ -0,0 +1,276 @@
+"""
+Single-pass playlist metadata and an on-disk metadata cache for the YouTube download scripts.
+
+The scripts used to extract every playlist three times over: a `yt-dlp --print playlist_title`
+subprocess for the title, a full (non-flat) extract_info that resolved every entry just to read its
+URL, and then one more extract_info per video at download time. Here one flat extraction
+('extract_flat': 'in_playlist') returns the title and the entries together, and both the playlist
+and the full per-video info dicts go into a JSON cache keyed by ID with a TTL, so re-runs skip the
+playlist extraction and retried or repeated downloads skip the video extraction.
+
+Example Usages:
+
+1. From a script:
+   from playlistMetadata import MetadataCache, process_playlist_metadata, extract_video
+   metadata_cache = MetadataCache()
+   title, video_urls = process_playlist_metadata(playlist_url, metadata_cache)
+   with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+       info = extract_video(ydl, video_url, metadata_cache)      # downloads, reusing a cached info dict
+
+2. Count extractor calls, old vs new, on a recorded fixture playlist (no network):
+   python playlistMetadata.py --videos 25
+
+Notes:
+- Cached video info dicts hold signed stream URLs, which expire after a few hours; VIDEO_TTL_SECONDS
+  stays below that, and a download that fails from a cached dict is retried once with a fresh extraction.
+- Delete METADATA_CACHE_DIR to force fresh extractions.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import yt_dlp
+
+METADATA_CACHE_DIR = os.path.expanduser("~/.cache/yt_playlist_metadata")
+PLAYLIST_TTL_SECONDS = 24 * 3600  # new uploads show up after a day at the latest
+VIDEO_TTL_SECONDS = 3 * 3600      # stream URLs in the info dict expire after ~6 hours
+
+def sanitize_title(title):
+    """
+    Keep alphanumerics, spaces, underscore and dash so the title is safe as a folder name.
+    """
+    safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in (title or "").strip())
+    return safe_title if safe_title else "playlist_unknown"
+
+def playlist_id(playlist_url):
+    """
+    The list= ID of a playlist URL, or a hash of the URL for anything else (channels, searches).
+    """
+    ids = parse_qs(urlparse(playlist_url).query).get("list")
+    return ids[0] if ids else hashlib.sha1(playlist_url.encode("utf-8")).hexdigest()[:16]
+
+def video_id(video_url):
+    """
+    The video ID of a watch, youtu.be or shorts URL (None if there is none).
+    """
+    parsed = urlparse(video_url)
+    ids = parse_qs(parsed.query).get("v")
+    if ids:
+        return ids[0]
+    parts = [part for part in parsed.path.split("/") if part]
+    if parsed.netloc.endswith("youtu.be") and parts:
+        return parts[0]
+    if len(parts) >= 2 and parts[0] in ("shorts", "live", "embed"):
+        return parts[1]
+    return None
+
+class MetadataCache:
+    """
+    One JSON file per playlist or video under `directory`, each stamped with its fetch time.
+    Entries older than their TTL are treated as missing. Safe to share between threads.
+    """
+
+    def __init__(self, directory=METADATA_CACHE_DIR, playlist_ttl=PLAYLIST_TTL_SECONDS, video_ttl=VIDEO_TTL_SECONDS):
+        self.directory = directory
+        self.ttl = {"playlist": playlist_ttl, "video": video_ttl}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, kind, key):
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return os.path.join(self.directory, kind, safe_key + ".json")
+
+    def get(self, kind, key):
+        path = self._path(kind, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            record = None
+        fresh = record is not None and time.time() - record.get("fetched_at", 0) < self.ttl[kind]
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return record["data"] if fresh else None
+
+    def put(self, kind, key, data):
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a reader never sees half a file.
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "data": data}, f)
+        os.replace(tmp_path, path)
+
+    def drop(self, kind, key):
+        try:
+            os.remove(self._path(kind, key))
+        except OSError:
+            pass
+
+def extract_playlist(playlist_url, cache=None, ydl_class=yt_dlp.YoutubeDL, refresh=False):
+    """
+    Title and entries of a playlist from one flat extraction (entries are not resolved).
+    Returns {"id", "title", "entries": [{"id", "url", "title"}, ...]} in playlist order.
+    refresh=True skips the cached copy (but still updates it), e.g. to see this week's uploads.
+    """
+    key = playlist_id(playlist_url)
+    if cache is not None and not refresh:
+        cached = cache.get("playlist", key)
+        if cached is not None:
+            return cached
+    ydl_opts = {'extract_flat': 'in_playlist', 'skip_download': True, 'ignoreerrors': True, 'quiet': True}
+    with ydl_class(ydl_opts) as ydl:
+        info = ydl.extract_info(playlist_url, download=False) or {}
+    entries = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        url = entry.get("webpage_url") or entry.get("url")
+        if entry.get("id") and url and not url.startswith("http"):
+            url = f"https://www.youtube.com/watch?v={entry['id']}"
+        if url:
+            entries.append({"id": entry.get("id") or video_id(url), "url": url, "title": entry.get("title")})
+    playlist = {"id": info.get("id") or key, "title": info.get("title"), "entries": entries}
+    if cache is not None and info:
+        cache.put("playlist", key, playlist)
+    return playlist
+
+def process_playlist_metadata(playlist_url, cache=None):
+    """
+    Retrieve metadata for a given playlist: its sanitized title and list of video URLs.
+    """
+    try:
+        playlist = extract_playlist(playlist_url, cache)
+    except Exception as e:
+        print(f"[Playlist] Error extracting playlist {playlist_url}: {e}")
+        return "playlist_unknown", []
+    return sanitize_title(playlist["title"]), [entry["url"] for entry in playlist["entries"]]
+
+def extract_video(ydl, video, cache=None, download=True):
+    """
+    extract_info for one video, reusing (and refreshing) its cached info dict.
+    `video` may also be an already extracted info dict (the fixture benchmarks build those).
+    """
+    if isinstance(video, dict):
+        return ydl.process_ie_result(video, download=download)
+    key = video_id(video)
+    if cache is not None and key:
+        cached = cache.get("video", key)
+        if cached is not None:
+            try:
+                return ydl.process_ie_result(cached, download=download)
+            except yt_dlp.utils.DownloadError as e:
+                # Most likely an expired stream URL: forget it and extract again.
+                print(f"[Metadata] Cached info for {key} failed ({e}); extracting again.")
+                cache.drop("video", key)
+    info = ydl.extract_info(video, download=download)
+    if cache is not None and key and info:
+        cache.put("video", key, ydl.sanitize_info(info))
+    return info
+
+# --- Benchmark ---
+
+def record_fixture_playlist(videos):
+    """
+    A recorded playlist: the full info dict of every video (title, formats) and the playlist around them.
+    """
+    entries = []
+    for index in range(videos):
+        vid = f"fixture{index:04d}"
+        entries.append({
+            "id": vid, "title": f"Fixture video {index}", "webpage_url": f"https://www.youtube.com/watch?v={vid}",
+            "extractor": "youtube", "extractor_key": "Youtube", "duration": 60 + index,
+            "formats": [{"format_id": "251", "url": f"http://127.0.0.1:9/{vid}.webm", "ext": "webm",
+                         "vcodec": "none", "acodec": "opus", "abr": 50}],
+        })
+    return {"id": "PLfixture", "title": "Fixture: recorded playlist", "entries": entries}
+
+def make_fixture_ydl(recording):
+    """
+    A YoutubeDL that answers extract_info from the recording and counts extractor calls the way
+    yt-dlp makes them: one for the playlist page, plus one per entry unless the extraction is flat.
+    """
+    videos = {entry["webpage_url"]: entry for entry in recording["entries"]}
+
+    class FixtureYoutubeDL(yt_dlp.YoutubeDL):
+        calls = 0
+
+        def extract_info(self, url, download=True, **kwargs):
+            if url in videos:
+                FixtureYoutubeDL.calls += 1
+                return self.process_ie_result(json.loads(json.dumps(videos[url])), download=download)
+            FixtureYoutubeDL.calls += 1
+            items = recording["entries"]
+            if self.params.get("playlist_items"):
+                items = items[:1]
+            if self.params.get("extract_flat"):
+                entries = [{"_type": "url", "id": e["id"], "url": e["webpage_url"], "title": e["title"],
+                            "ie_key": "Youtube"} for e in items]
+            else:
+                FixtureYoutubeDL.calls += len(items)
+                entries = [json.loads(json.dumps(e)) for e in items]
+            return {"_type": "playlist", "id": recording["id"], "title": recording["title"], "entries": entries}
+
+        def process_ie_result(self, ie_result, download=True, extra_info=None):
+            # Nothing to download from a recording; the benchmark only counts extractions.
+            return ie_result
+
+    return FixtureYoutubeDL
+
+def run_benchmark(videos, runs):
+    recording = record_fixture_playlist(videos)
+    fixture_ydl = make_fixture_ydl(recording)
+    playlist_url = f"https://www.youtube.com/playlist?list={recording['id']}"
+    quiet = {'quiet': True, 'skip_download': True}
+
+    # Old path: title (yt-dlp -I 1:1 --print playlist_title), a full extraction for the URLs, one per download.
+    fixture_ydl.calls = 0
+    for _ in range(runs):
+        with fixture_ydl({**quiet, 'playlist_items': '1:1'}) as ydl:
+            ydl.extract_info(playlist_url, download=False)
+        with fixture_ydl({**quiet, 'ignoreerrors': True}) as ydl:
+            info = ydl.extract_info(playlist_url, download=False)
+            urls = [entry["webpage_url"] for entry in info["entries"]]
+        for url in urls:
+            with fixture_ydl(quiet) as ydl:
+                ydl.extract_info(url, download=True)
+    old_calls = fixture_ydl.calls
+
+    fixture_ydl.calls = 0
+    per_run = []
+    with tempfile.TemporaryDirectory(prefix="metadata_cache_") as cache_dir:
+        cache = MetadataCache(cache_dir)
+        for _ in range(runs):
+            before = fixture_ydl.calls
+            urls = [entry["url"] for entry in extract_playlist(playlist_url, cache, ydl_class=fixture_ydl)["entries"]]
+            for url in urls:
+                with fixture_ydl(quiet) as ydl:
+                    extract_video(ydl, url, cache)
+            per_run.append(fixture_ydl.calls - before)
+    new_calls = fixture_ydl.calls
+
+    print(f"[Benchmark] Recorded playlist of {videos} videos, {runs} run(s):")
+    print(f"[Benchmark] Old (title subprocess + full extraction + per-download): {old_calls} extractor calls "
+          f"({old_calls // runs} per run)")
+    print(f"[Benchmark] New (one flat extraction + cache):                       {new_calls} extractor calls "
+          f"(per run: {', '.join(map(str, per_run))}; cache hits {cache.hits}, misses {cache.misses})")
+    print(f"[Benchmark] Saved {old_calls - new_calls} calls ({100 * (1 - new_calls / old_calls):.0f}%).")
+
+def main():
+    parser = argparse.ArgumentParser(description="Count yt-dlp extractor calls of the old and new playlist metadata paths on a recorded fixture.")
+    parser.add_argument("--videos", type=int, default=25, help="Videos in the recorded playlist.")
+    parser.add_argument("--runs", type=int, default=2, help="Back-to-back runs (later runs hit the cache).")
+    args = parser.parse_args()
+    run_benchmark(args.videos, args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Incremental playlist sync state for the playlist transcribers.
+
+A small SQLite database in the download folder remembers, per playlist, which folder it lives in and
+which video IDs are already transcribed (and how long each took). A re-run then reuses the folder
+instead of creating `<title>_1`, downloads and transcribes only the IDs it has not seen, and can say
+how much time the skipped videos would have cost.
+
+Example Usages:
+
+1. From a script:
+   from playlistSync import SyncState
+   state = SyncState(download_folder)
+   folder = state.playlist_folder(playlist["id"], default=os.path.join(download_folder, title))
+   new_entries = state.new_entries(playlist, folder)
+   ...                                    # download + transcribe new_entries
+   state.record_transcripts(playlist, folder, seconds_per_video)
+   print(state.report(playlist["id"], [entry["id"] for entry in new_entries], run_seconds))
+
+2. Inspect what a download folder has synced:
+   python playlistSync.py /path/to/download_folder
+
+Notes:
+- Transcripts already on disk are recognised by the `[<video id>]` in their filename (the scripts'
+  outtmpl), so folders created before the state database existed are picked up on the first sync.
+- Videos that failed to download or transcribe are not recorded, so the next sync tries them again.
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+
+STATE_DB_NAME = "sync_state.sqlite"
+# "<title> [<id>].txt", as written by transcribe_file from the downloader's outtmpl.
+TRANSCRIPT_ID_PATTERN = re.compile(r"\[([A-Za-z0-9_-]+)\]\.txt$")
+
+def find_transcripts(folder):
+    """
+    {video id: transcript filename} for the transcripts in folder.
+    """
+    transcripts = {}
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            match = TRANSCRIPT_ID_PATTERN.search(name)
+            if match:
+                transcripts[match.group(1)] = name
+    return transcripts
+
+class SyncState:
+    """
+    The sync database of one download folder. Safe to share between threads.
+    """
+
+    def __init__(self, download_folder, db_name=STATE_DB_NAME):
+        self.path = os.path.join(download_folder, db_name)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS playlists (
+                playlist_id TEXT PRIMARY KEY, title TEXT, folder TEXT, synced_at REAL)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS videos (
+                playlist_id TEXT, video_id TEXT, position INTEGER, title TEXT, transcript TEXT,
+                seconds REAL, transcribed_at REAL, PRIMARY KEY (playlist_id, video_id))""")
+
+    def playlist_folder(self, playlist_id, default):
+        """
+        The folder this playlist was synced into before, else `default` (created if missing).
+        """
+        with self._lock:
+            row = self._db.execute("SELECT folder FROM playlists WHERE playlist_id = ?", (playlist_id,)).fetchone()
+        folder = row[0] if row and os.path.isdir(row[0]) else default
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def done_ids(self, playlist_id):
+        with self._lock:
+            rows = self._db.execute("SELECT video_id FROM videos WHERE playlist_id = ?", (playlist_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def new_entries(self, playlist, folder):
+        """
+        The playlist entries that still need a transcript. Transcripts found on disk without a database
+        row (older runs) are recorded first, with no timing.
+        """
+        on_disk = find_transcripts(folder)
+        done = self.done_ids(playlist["id"])
+        adopted = [(position, entry) for position, entry in enumerate(playlist["entries"])
+                   if entry["id"] in on_disk and entry["id"] not in done]
+        if adopted:
+            self._record(playlist["id"], [(position, entry, on_disk[entry["id"]], None) for position, entry in adopted])
+            done.update(entry["id"] for _, entry in adopted)
+        return [entry for entry in playlist["entries"] if entry["id"] not in done]
+
+    def _record(self, playlist_id, rows):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(playlist_id, entry["id"], position, entry.get("title"), transcript, seconds, now)
+                 for position, entry, transcript, seconds in rows])
+
+    def record_transcripts(self, playlist, folder, seconds_per_video):
+        """
+        Record every entry whose transcript now exists in folder and remember the folder.
+        Returns the transcript filenames that are new since the last sync, in playlist order.
+        """
+        on_disk = find_transcripts(folder)
+        done = self.done_ids(playlist["id"])
+        new = [(position, entry, on_disk[entry["id"]], seconds_per_video)
+               for position, entry in enumerate(playlist["entries"])
+               if entry["id"] in on_disk and entry["id"] not in done]
+        self._record(playlist["id"], new)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?)",
+                             (playlist["id"], playlist.get("title"), folder, time.time()))
+        return [transcript for _, _, transcript, _ in new]
+
+    def report(self, playlist_id, synced_ids, run_seconds):
+        """
+        One line: how many videos this sync skipped and the time a full run would have spent on them
+        (their recorded times, or this run's time per video for those without one).
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT video_id, seconds FROM videos WHERE playlist_id = ?", (playlist_id,)).fetchall()
+        synced_ids = set(synced_ids)
+        skipped = [seconds for vid, seconds in rows if vid not in synced_ids]
+        known = [seconds for _, seconds in rows if seconds is not None]
+        per_video = run_seconds / len(synced_ids) if synced_ids else (sum(known) / len(known) if known else 0.0)
+        saved = sum(per_video if seconds is None else seconds for seconds in skipped)
+        return (f"[Sync] {len(synced_ids)} new video(s) in {run_seconds:.0f}s, {len(skipped)} already transcribed; "
+                f"a full run would have taken ~{run_seconds + saved:.0f}s (saved ~{saved:.0f}s)")
+
+    def playlists(self):
+        """
+        (playlist_id, title, folder, synced_at) of every synced playlist.
+        """
+        with self._lock:
+            return self._db.execute("SELECT playlist_id, title, folder, synced_at FROM playlists").fetchall()
+
+    def close(self):
+        self._db.close()
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python playlistSync.py <download_folder>")
+    state = SyncState(sys.argv[1])
+    for playlist_id, title, folder, synced_at in state.playlists():
+        done = state.done_ids(playlist_id)
+        print(f"{title} ({playlist_id}): {len(done)} transcribed, last sync "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(synced_at))} -> {folder}")
+    state.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Transcript writers that put every segment on disk as soon as the model produces it: plain text,
+JSONL, SRT and WebVTT.
+
+The Whisper scripts kept only result["text"] and wrote it after the whole file had finished, and the
+faster_whisper scripts collected every segment in a transcript_lines list first, so a 5-hour recording
+showed nothing on disk for hours and the segment timestamps were thrown away. TranscriptWriter fans
+each segment out to one writer per format; each writer appends and flushes one record at a time, so
+memory does not grow with the recording and a long job's partial output can be read (or tailed, or
+opened in a player as subtitles) while it runs.
+
+Example Usages:
+
+1. As the on_segment hook of A_mlxWhisperDaemon.transcribe():
+   from segmentWriters import TranscriptWriter
+   with TranscriptWriter(os.path.splitext(path)[0], ["txt", "jsonl", "srt", "vtt"]) as writer:
+       transcribe(path, model_id=MODEL_ID, on_segment=writer.write)
+
+2. Over faster_whisper's lazy segments generator (Segment objects work as well as dicts):
+   segments, info = model.transcribe(audio_path)
+   with TranscriptWriter(base_path, OUTPUT_FORMATS, text_separator="\\n") as writer:
+       for segment in segments:
+           writer.write(segment)
+
+3. Stream 5 hours of synthetic segments through the writers and compare peak memory with buffering:
+   python segmentWriters.py --hours 5
+
+Notes:
+- While a file is being transcribed its outputs are named `<base>.<format>.partial`; they are renamed
+  to `<base>.<format>` when the writer closes without an error, so the scripts' "transcript already
+  exists" checks never see a half-written file. After a crash the .partial files stay for inspection
+  and the next run starts them over.
+- JSONL records are {"id", "start", "end", "text"}, one segment per line.
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+OUTPUT_FORMATS = ["txt", "jsonl", "srt", "vtt"]
+PARTIAL_SUFFIX = ".partial"
+
+def segment_fields(segment):
+    """
+    (id, start, end, text) of a segment dict (mlx_whisper, the daemon) or object (faster_whisper).
+    """
+    if isinstance(segment, dict):
+        return segment.get("id"), segment["start"], segment["end"], segment["text"]
+    return getattr(segment, "id", None), segment.start, segment.end, segment.text
+
+def format_timestamp(seconds, decimal_marker):
+    """
+    HH:MM:SS,mmm (SRT) or HH:MM:SS.mmm (VTT).
+    """
+    milliseconds = int(round(max(seconds, 0.0) * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+class SegmentWriter:
+    """
+    Base class: one output file, written one segment at a time and flushed after each.
+    Subclasses set `extension` and implement format_segment() (and header() if they need one).
+    """
+    extension = None
+
+    def __init__(self, base_path):
+        self.path = f"{base_path}.{self.extension}"
+        self.partial_path = self.path + PARTIAL_SUFFIX
+        self.count = 0
+        self._file = open(self.partial_path, "w", encoding="utf-8")
+        self._file.write(self.header())
+
+    def header(self):
+        return ""
+
+    def format_segment(self, index, start, end, text):
+        raise NotImplementedError
+
+    def write(self, segment):
+        segment_id, start, end, text = segment_fields(segment)
+        self._file.write(self.format_segment(self.count if segment_id is None else segment_id, start, end, text))
+        self._file.flush()
+        self.count += 1
+
+    def close(self, complete=True):
+        self._file.close()
+        if complete:
+            os.replace(self.partial_path, self.path)
+
+class TextWriter(SegmentWriter):
+    """
+    The plain transcript: segment texts joined by `separator` ("" matches mlx_whisper's result["text"]).
+    """
+    extension = "txt"
+
+    def __init__(self, base_path, separator=""):
+        self.separator = separator
+        super().__init__(base_path)
+
+    def format_segment(self, index, start, end, text):
+        return text if self.count == 0 else self.separator + text
+
+class JsonlWriter(SegmentWriter):
+    extension = "jsonl"
+
+    def format_segment(self, index, start, end, text):
+        return json.dumps({"id": index, "start": round(start, 3), "end": round(end, 3), "text": text},
+                          ensure_ascii=False) + "\n"
+
+class SrtWriter(SegmentWriter):
+    extension = "srt"
+
+    def format_segment(self, index, start, end, text):
+        # SRT cues are numbered from 1 in file order, whatever ids the segments carry.
+        return (f"{self.count + 1}\n{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+                f"{text.strip()}\n\n")
+
+class VttWriter(SegmentWriter):
+    extension = "vtt"
+
+    def header(self):
+        return "WEBVTT\n\n"
+
+    def format_segment(self, index, start, end, text):
+        return f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text.strip()}\n\n"
+
+WRITERS = {writer.extension: writer for writer in (TextWriter, JsonlWriter, SrtWriter, VttWriter)}
+
+class TranscriptWriter:
+    """
+    All requested formats for one recording. write() is the on_segment hook; use as a context manager
+    (outputs are only renamed into place when the block finishes without an exception) or call close().
+    With an index (transcriptIndex.TranscriptIndex) and/or an embedding store
+    (transcriptEmbeddings.EmbeddingStore), the finished transcript is pushed into them on close.
+    """
+
+    def __init__(self, base_path, formats=OUTPUT_FORMATS, text_separator="", index=None, embeddings=None):
+        self.base_path = base_path
+        self.index = index
+        self.embeddings = embeddings
+        self.writers = []
+        for extension in formats:
+            if extension == "txt":
+                self.writers.append(TextWriter(base_path, text_separator))
+            else:
+                self.writers.append(WRITERS[extension](base_path))
+
+    @property
+    def paths(self):
+        return [writer.path for writer in self.writers]
+
+    def write(self, segment):
+        for writer in self.writers:
+            writer.write(segment)
+
+    def write_all(self, segments):
+        for segment in segments:
+            self.write(segment)
+
+    def close(self, complete=True):
+        for writer in self.writers:
+            writer.close(complete)
+        if not complete or not any(isinstance(writer, TextWriter) for writer in self.writers):
+            return
+        for store in (self.index, self.embeddings):
+            if store is not None:
+                store.push(f"{self.base_path}.txt")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+
+def chain_hooks(*hooks):
+    """
+    One on_segment hook that calls each of `hooks` (None entries are skipped) in turn.
+    """
+    hooks = [hook for hook in hooks if hook]
+    def on_segment(segment):
+        for hook in hooks:
+            hook(segment)
+    return on_segment
+
+# --- Benchmark ---
+
+def synthetic_segments(hours, segment_seconds=6.0):
+    """
+    A lazy stream of segments covering `hours` of audio, like faster_whisper's generator.
+    """
+    for index in range(int(hours * 3600 / segment_seconds)):
+        start = index * segment_seconds
+        yield {"id": index, "start": start, "end": start + segment_seconds - 0.4,
+               "text": f" Segment {index} of the synthetic lecture, about as long as a spoken sentence is."}
+
+def run_benchmark(hours, formats):
+    with tempfile.TemporaryDirectory(prefix="segment_writers_") as work_dir:
+        # Old way: collect every segment's text, join and write once at the end.
+        tracemalloc.start()
+        start = time.perf_counter()
+        transcript_lines = [segment["text"] for segment in synthetic_segments(hours)]
+        with open(os.path.join(work_dir, "buffered.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(transcript_lines))
+        buffered_peak = tracemalloc.get_traced_memory()[1]
+        buffered_seconds = time.perf_counter() - start
+        del transcript_lines
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        base_path = os.path.join(work_dir, "streamed")
+        halfway = int(hours * 3600 / 6.0) // 2
+        with TranscriptWriter(base_path, formats, text_separator="\n") as writer:
+            for segment in synthetic_segments(hours):
+                writer.write(segment)
+                if segment["id"] == halfway:
+                    with open(writer.writers[-1].partial_path, "r", encoding="utf-8") as f:
+                        readable = sum(1 for _ in f)
+        streamed_peak = tracemalloc.get_traced_memory()[1]
+        streamed_seconds = time.perf_counter() - start
+        tracemalloc.stop()
+
+        print(f"[Benchmark] {hours:g}h of audio, {halfway * 2} segments, formats: {', '.join(formats)}")
+        print(f"[Benchmark] Buffered txt : peak {buffered_peak / 1024:8.0f} KiB, {buffered_seconds:.2f}s, "
+              "nothing on disk until the end")
+        print(f"[Benchmark] Streamed     : peak {streamed_peak / 1024:8.0f} KiB, {streamed_seconds:.2f}s, "
+              f"{readable} lines of {os.path.basename(writer.writers[-1].path)} readable halfway through")
+        for path in writer.paths:
+            print(f"[Benchmark]   {os.path.basename(path):<14} {os.path.getsize(path) / 1024:8.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare buffered and streamed transcript writing on synthetic segments.")
+    parser.add_argument("--hours", type=float, default=5.0, help="Length of the synthetic recording.")
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=OUTPUT_FORMATS, help="Formats to write.")
+    args = parser.parse_args()
+    run_benchmark(args.hours, args.formats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Checks for the VAD pre-pass in A_whisperAudio on synthetic audio with known silences (no model,
+no ffmpeg): detection against the true spans, remapped timestamps, and SpeechTimeline at region edges.
+
+Example Usages:
+
+1. Run the checks:
+   python -m pytest -q test_whisperAudio.py
+"""
+import numpy as np
+import pytest
+
+from A_whisperAudio import (
+    SAMPLE_RATE, VAD_FRAME_MS, VAD_PAD_MS, SpeechTimeline, detect_speech, detection_errors,
+    make_synthetic_speech, synthetic_spans, transcribe_speech_only,
+)
+
+def fake_transcribe(samples):
+    """
+    The daemon's fake backend as a transcribe function: one segment per FAKE_SEGMENT_SECONDS of input.
+    """
+    from A_mlxWhisperDaemon import make_backend
+    segments, info = make_backend("fake", "fake").transcribe(samples)
+    segments = list(segments)
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": info["language"]}
+
+@pytest.mark.parametrize("silence_ratio", [0.2, 0.4, 0.7])
+def test_detection_against_known_spans(silence_ratio):
+    total_seconds = 300.0
+    spans = synthetic_spans(total_seconds, silence_ratio)
+    audio = make_synthetic_speech(spans, total_seconds)
+    regions = detect_speech(audio)
+
+    missed, extra = detection_errors(spans, regions, len(audio))
+    assert missed < 0.005
+    # Silence is only kept as padding: at most VAD_PAD_MS plus one frame of rounding on each side of a span.
+    silence_seconds = total_seconds - sum(end - start for start, end in spans)
+    allowed_seconds = len(spans) * 2 * (VAD_PAD_MS + VAD_FRAME_MS) / 1000
+    assert extra * silence_seconds <= allowed_seconds
+    assert all(start < end <= next_start for (start, end), (next_start, _) in zip(regions, regions[1:]))
+
+def test_remapped_timestamps_monotonic_and_inside_speech():
+    total_seconds = 300.0
+    audio = make_synthetic_speech(synthetic_spans(total_seconds, 0.4), total_seconds)
+    regions = detect_speech(audio)
+    result = transcribe_speech_only(audio, fake_transcribe)
+
+    segments = result["segments"]
+    assert segments
+    starts = [segment["start"] for segment in segments]
+    assert starts == sorted(starts)
+    assert all(segment["start"] <= segment["end"] for segment in segments)
+    for t in starts + [segment["end"] for segment in segments]:
+        assert any(start / SAMPLE_RATE - 1e-3 <= t <= end / SAMPLE_RATE + 1e-3 for start, end in regions)
+    assert 0 < result["vad"]["speech_seconds"] < result["vad"]["audio_seconds"]
+
+def test_silence_only_skips_the_model():
+    audio = make_synthetic_speech([], 30.0, noise_db=-80.0)  # below VAD_MIN_LEVEL_DB
+
+    def must_not_run(samples):
+        raise AssertionError("the model ran on silence")
+
+    result = transcribe_speech_only(audio, must_not_run)
+    assert result["segments"] == [] and result["text"] == ""
+
+def test_timeline_maps_region_edges():
+    # Regions 1-3 s and 5-6 s; joined with a 0.5 s gap they sit at 0-2 s and 2.5-3.5 s.
+    audio = np.ones(8 * SAMPLE_RATE, dtype=np.float32)
+    timeline = SpeechTimeline(audio, [(1 * SAMPLE_RATE, 3 * SAMPLE_RATE), (5 * SAMPLE_RATE, 6 * SAMPLE_RATE)],
+                              join_gap_seconds=0.5)
+    assert len(timeline.audio) == int(3.5 * SAMPLE_RATE)
+    assert timeline.speech_seconds == pytest.approx(3.0)
+    assert timeline.skipped_fraction == pytest.approx(5 / 8)
+
+    assert timeline.to_original(0.0) == pytest.approx(1.0)
+    assert timeline.to_original(2.0) == pytest.approx(3.0)
+    assert timeline.to_original(2.2) == pytest.approx(3.0)                # inside the gap: end of region 1
+    assert timeline.to_original(2.5) == pytest.approx(5.0)                # a start on a region start: region 2
+    assert timeline.to_original(2.5, is_end=True) == pytest.approx(3.0)   # an end there: still region 1
+    assert timeline.to_original(3.5) == pytest.approx(6.0)
+    assert timeline.to_original(10.0) == pytest.approx(6.0)               # past the end clamps
+
+    segments = timeline.remap_segments([{"start": 1.9, "end": 2.5, "text": "a"}, {"start": 2.5, "end": 3.0, "text": "b"}])
+    assert [(s["start"], s["end"]) for s in segments] == [(2.9, 3.0), (5.0, 5.5)]
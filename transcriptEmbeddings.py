@@ -0,0 +1,543 @@
+"""
+Semantic search over the transcripts: chunk embeddings in a memory-mapped float32 matrix.
+
+Keyword search (transcriptIndex) finds words; this finds passages that are about a question. Every
+transcript is cut into the same passages transcriptIndex uses (about PASSAGE_SECONDS of speech with
+timestamps, or PASSAGE_CHARS of text), each passage is embedded by a pluggable embedder, and the
+vectors are appended to one float32 file that is memory-mapped for search. A query is one matrix-
+vector product over all chunks and an argpartition for the top k; past IVF_MIN_CHUNKS chunks an
+IVF partition (k-means centroids) limits the product to the chunks of the nearest IVF_PROBES lists.
+`update` embeds only new or changed files; chunks of changed or deleted files are tombstoned and
+dropped by compact() once enough of them pile up.
+
+Example Usages:
+
+1. Embed the transcript folders (later runs only embed what changed), then ask a question:
+   python transcriptEmbeddings.py update /Volumes/HezeORICO/life /Volumes/HezeSamsung/Lectures
+   python transcriptEmbeddings.py search "how does caffeine affect sleep pressure" --k 5
+
+2. With a real embedding model instead of the hash stand-in:
+   python transcriptEmbeddings.py --embedder sentence-transformers update /Volumes/HezeORICO/life
+
+3. From a script:
+   from transcriptEmbeddings import EmbeddingStore
+   store = EmbeddingStore()
+   store.push(transcript_path)                  # a transcript that just landed
+   for hit in store.search("question", k=5):
+       print(hit["path"], hit["start"], hit["score"])
+
+4. Benchmark exact search (matmul + argpartition) against a Python loop and against IVF:
+   python transcriptEmbeddings.py benchmark --chunks 200000 --dim 384
+
+Notes:
+- Embedders: hash (deterministic feature hashing of words and word pairs; no model, for tests and as a
+  keyword-ish fallback) and sentence-transformers (all-MiniLM-L6-v2 by default; needs the package).
+  A store is tied to the embedder and dimension it was created with; use another --store to switch.
+- Vectors are L2-normalized, so scores are cosine similarities.
+- merged_transcript.txt files are skipped: their sections are the per-video transcripts again.
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+import threading
+
+import numpy as np
+
+from transcriptIndex import PASSAGE_CHARS, iter_documents, segment_passages, text_passages, file_hash, format_seconds
+
+STORE_DIR = os.path.expanduser("~/.cache/transcript_embeddings")
+VECTORS_NAME = "vectors.f32"
+HASH_EMBEDDING_DIM = 384
+EMBED_BATCH = 64
+# IVF partitioning: built once the store holds IVF_MIN_CHUNKS chunks and rebuilt when it has doubled.
+IVF_MIN_CHUNKS = 1_000_000
+IVF_PROBES = 8
+KMEANS_ITERATIONS = 10
+# compact() runs after an update when at least this share of the rows are tombstones.
+COMPACT_DEAD_FRACTION = 0.25
+SKIPPED_NAMES = ("merged_transcript.txt",)
+
+# --- Embedders ---
+# Every embedder has .name, .dim and embed(texts) -> float32 array (len(texts), dim), rows L2-normalized.
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+class HashEmbedder:
+    """
+    Feature hashing of lowercase words and adjacent word pairs into `dim` signed buckets.
+    Deterministic and model-free; similar wording gives similar vectors.
+    """
+
+    def __init__(self, dim=HASH_EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            # CJK characters count as words of their own.
+            words = re.findall(r"[㐀-鿿]|\w+", text.lower())
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        return _normalize(vectors)
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model_id="sentence-transformers/all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_id)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_id}"
+
+    def embed(self, texts):
+        return np.asarray(self.model.encode(list(texts), batch_size=EMBED_BATCH, normalize_embeddings=True),
+                          dtype=np.float32)
+
+EMBEDDERS = {
+    "hash": HashEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+def make_embedder(name):
+    return EMBEDDERS[name]()
+
+# --- Top-k ---
+
+def top_k(scores, k):
+    """
+    Indices of the k largest scores, best first: argpartition, then a sort of only those k.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best])]
+
+def kmeans(vectors, lists, iterations=KMEANS_ITERATIONS, seed=0):
+    """
+    Spherical k-means (dot-product assignment, normalized centroids) on a sample of rows.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=lists) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+def assign_lists(matrix, centroids, block=65536):
+    """
+    Nearest centroid of every row, computed block by block so the memmap is streamed.
+    """
+    assignment = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), block):
+        assignment[start:start + block] = np.argmax(np.asarray(matrix[start:start + block]) @ centroids.T, axis=1)
+    return assignment
+
+# --- Store ---
+
+class EmbeddingStore:
+    """
+    Vectors in <directory>/vectors.f32 (row i is chunk i), chunk and document metadata in SQLite, and the
+    IVF centroids/assignments as .npy files. Safe to share between threads.
+    """
+
+    def __init__(self, directory=STORE_DIR, embedder=None, ivf_min_chunks=IVF_MIN_CHUNKS, probes=IVF_PROBES):
+        self.directory = directory
+        self.ivf_min_chunks = ivf_min_chunks
+        self.probes = probes
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, VECTORS_NAME)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(directory, "chunks.sqlite"), check_same_thread=False, timeout=30)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, sha1 TEXT)""")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS chunks (
+                row INTEGER PRIMARY KEY, doc_id INTEGER, start REAL, end REAL, label TEXT, text TEXT, alive INTEGER)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (doc_id)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY)")
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        self.embedder = embedder or make_embedder(meta.get("embedder_kind", "hash"))
+        if meta.get("embedder") not in (None, self.embedder.name):
+            raise ValueError(f"{directory} holds {meta['embedder']} vectors; use another store for {self.embedder.name}")
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ("embedder", self.embedder.name), ("dim", str(self.embedder.dim)),
+                ("embedder_kind", next((kind for kind, cls in EMBEDDERS.items() if isinstance(self.embedder, cls)), "hash"))])
+        self.dim = self.embedder.dim
+        self._matrix = None
+        self._dead = None
+        self._ivf = None
+        self._refresh()
+
+    # -- matrix, tombstones and IVF --
+
+    def _refresh(self):
+        """
+        Re-map the vector file and reload the tombstones and IVF files after they changed.
+        """
+        rows = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else \
+            np.zeros((0, self.dim), dtype=np.float32)
+        self._dead = np.zeros(rows, dtype=bool)
+        recorded = self._db.execute("SELECT COUNT(*) FROM chunks WHERE row < ?", (rows,)).fetchone()[0]
+        if recorded < rows:
+            # Vectors whose chunk records never committed (add_file interrupted): dead until compacted.
+            self._dead[:] = True
+            self._dead[[row for (row,) in self._db.execute("SELECT row FROM chunks WHERE alive = 1 AND row < ?", (rows,))]] = False
+        else:
+            self._dead[[row for (row,) in self._db.execute("SELECT row FROM chunks WHERE alive = 0 AND row < ?", (rows,))]] = True
+        self._ivf = None
+        centroids_path = os.path.join(self.directory, "ivf_centroids.npy")
+        assign_path = os.path.join(self.directory, "ivf_assign.npy")
+        if os.path.exists(centroids_path) and os.path.exists(assign_path):
+            centroids, assignment = np.load(centroids_path), np.load(assign_path)
+            if len(assignment) < rows:  # rows appended since: assign them to the existing lists
+                assignment = np.concatenate([assignment, assign_lists(self._matrix[len(assignment):], centroids)])
+                np.save(assign_path, assignment)
+            self._ivf = (centroids, assignment[:rows])
+
+    @property
+    def rows(self):
+        return len(self._matrix)
+
+    def build_ivf(self, lists=None, sample=None, seed=0):
+        """
+        Partition the rows into `lists` k-means lists (default sqrt(rows)), trained on a sample.
+        """
+        with self._lock:
+            lists = lists or max(1, int(np.sqrt(self.rows)))
+            sample_rows = min(self.rows, sample or lists * 64)
+            rng = np.random.default_rng(seed)
+            training = np.asarray(self._matrix[np.sort(rng.choice(self.rows, sample_rows, replace=False))])
+            centroids = kmeans(training, lists, seed=seed)
+            np.save(os.path.join(self.directory, "ivf_centroids.npy"), centroids)
+            np.save(os.path.join(self.directory, "ivf_assign.npy"), assign_lists(self._matrix, centroids))
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('ivf_rows', ?)", (str(self.rows),))
+            self._refresh()
+
+    def drop_ivf(self):
+        with self._lock:
+            for name in ("ivf_centroids.npy", "ivf_assign.npy"):
+                if os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+            self._refresh()
+
+    def _maybe_build_ivf(self):
+        built_rows = int(dict(self._db.execute("SELECT key, value FROM meta")).get("ivf_rows", 0))
+        if self.rows >= self.ivf_min_chunks and (self._ivf is None or self.rows >= 2 * built_rows):
+            print(f"[Embeddings] Building IVF lists over {self.rows} chunks")
+            self.build_ivf()
+
+    # -- writing --
+
+    def _append_vectors(self, vectors):
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def _add_chunks(self, doc_id, passages):
+        """
+        Embed every passage of a document (in EMBED_BATCH batches) before anything is written, then append
+        the vectors and insert their chunk records, so a failure while reading or embedding leaves no
+        rows behind. Returns the number of chunks.
+        """
+        passages = list(passages)
+        if not passages:
+            return 0
+        vectors = np.concatenate([self.embedder.embed([text for _, _, _, text in passages[start:start + EMBED_BATCH]])
+                                  for start in range(0, len(passages), EMBED_BATCH)])
+        first_row = self.rows_on_disk()
+        self._append_vectors(vectors)
+        self._db.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, 1)",
+                             [(first_row + i, doc_id, start, end, label, text)
+                              for i, (label, start, end, text) in enumerate(passages)])
+        return len(passages)
+
+    def rows_on_disk(self):
+        return os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+
+    def add_file(self, path, refresh=True):
+        """
+        Embed one transcript if it is new or changed. Returns "added", "changed" or "unchanged".
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute("SELECT doc_id, size, mtime_ns, sha1 FROM documents WHERE path = ?", (path,)).fetchone()
+            if row and (row[1], row[2]) == (stat.st_size, stat.st_mtime_ns):
+                return "unchanged"
+            digest = file_hash(path)
+            if row and row[3] == digest:
+                with self._db:
+                    self._db.execute("UPDATE documents SET size = ?, mtime_ns = ? WHERE doc_id = ?",
+                                     (stat.st_size, stat.st_mtime_ns, row[0]))
+                return "unchanged"
+            jsonl_path = os.path.splitext(path)[0] + ".jsonl"
+            passages = segment_passages(jsonl_path) if os.path.exists(jsonl_path) else text_passages(path)
+            with self._db:
+                if row:
+                    doc_id = row[0]
+                    self._db.execute("UPDATE chunks SET alive = 0 WHERE doc_id = ?", (doc_id,))
+                    self._db.execute("UPDATE documents SET size = ?, mtime_ns = ?, sha1 = ? WHERE doc_id = ?",
+                                     (stat.st_size, stat.st_mtime_ns, digest, doc_id))
+                else:
+                    doc_id = self._db.execute("INSERT INTO documents (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)",
+                                              (path, stat.st_size, stat.st_mtime_ns, digest)).lastrowid
+                self._add_chunks(doc_id, passages)
+            if refresh:
+                self._refresh()
+                self._maybe_build_ivf()
+            return "changed" if row else "added"
+
+    def push(self, path):
+        """
+        add_file() for writers: never raises, so a failed update cannot fail a transcription.
+        """
+        try:
+            self.add_file(path)
+        except (OSError, sqlite3.Error, ValueError, KeyError) as e:
+            print(f"[Embeddings] Could not embed {path}: {e}")
+
+    def remove(self, path):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT doc_id FROM documents WHERE path = ?", (path,)).fetchone()
+            if row:
+                self._db.execute("UPDATE chunks SET alive = 0 WHERE doc_id = ?", (row[0],))
+                self._db.execute("DELETE FROM documents WHERE doc_id = ?", (row[0],))
+
+    def roots(self):
+        return [row[0] for row in self._db.execute("SELECT root FROM roots")]
+
+    def update(self, roots=None, verbose=True):
+        """
+        Embed new and changed transcripts under roots (default: the roots used before), tombstone the
+        chunks of deleted ones, then compact and (re)build the IVF lists when due.
+        """
+        roots = [os.path.abspath(root) for root in (roots or self.roots())]
+        start = time.perf_counter()
+        counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        with self._lock:
+            with self._db:
+                self._db.executemany("INSERT OR IGNORE INTO roots VALUES (?)", [(root,) for root in roots])
+            seen = set()
+            for path in iter_documents(roots):
+                if os.path.basename(path) in SKIPPED_NAMES:
+                    continue
+                seen.add(path)
+                try:
+                    counts[self.add_file(path, refresh=False)] += 1
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"[Embeddings] Skipping {path}: {e}")
+            for (path,) in self._db.execute("SELECT path FROM documents").fetchall():
+                under_root = any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+                if under_root and path not in seen:
+                    self.remove(path)
+                    counts["removed"] += 1
+            self._refresh()
+            if self.rows and self._dead.mean() >= COMPACT_DEAD_FRACTION:
+                self.compact()
+            self._maybe_build_ivf()
+        if verbose:
+            print(f"[Embeddings] {counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+                  f"{counts['removed']} removed; {self.rows - int(self._dead.sum())} chunks "
+                  f"in {time.perf_counter() - start:.2f}s")
+        return counts
+
+    def compact(self, block=65536):
+        """
+        Rewrite the vector file without tombstoned rows and renumber the chunks.
+        """
+        with self._lock:
+            alive = np.flatnonzero(~self._dead)
+            tmp_path = self.vectors_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(alive), block):
+                    f.write(np.ascontiguousarray(self._matrix[alive[start:start + block]]).tobytes())
+            with self._db:
+                self._db.execute("DELETE FROM chunks WHERE alive = 0")
+                self._db.execute("CREATE TEMP TABLE renumber (old INTEGER PRIMARY KEY, new INTEGER)")
+                self._db.executemany("INSERT INTO renumber VALUES (?, ?)", ((int(old), new) for new, old in enumerate(alive)))
+                # Offset first so the new numbers never collide with old ones still in the table.
+                self._db.execute("UPDATE chunks SET row = -1 - (SELECT new FROM renumber WHERE old = chunks.row)")
+                self._db.execute("UPDATE chunks SET row = -1 - row")
+                self._db.execute("DROP TABLE renumber")
+            self._matrix = None
+            os.replace(tmp_path, self.vectors_path)
+            self.drop_ivf()
+            print(f"[Embeddings] Compacted to {len(alive)} chunks")
+
+    # -- search --
+
+    def search_vector(self, query_vector, k=10, probes=None):
+        """
+        [(row, score), ...] of the k nearest live chunks. Exact (one matmul over the whole matrix)
+        unless IVF lists exist, then over the rows of the `probes` nearest lists.
+        """
+        with self._lock:
+            matrix, dead, ivf = self._matrix, self._dead, self._ivf
+        if not len(matrix):
+            return []
+        if ivf is not None:
+            centroids, assignment = ivf
+            lists = top_k(centroids @ query_vector, probes or self.probes)
+            rows = np.flatnonzero(np.isin(assignment, lists))
+            rows = rows[~dead[rows]]
+            scores = np.asarray(matrix[rows]) @ query_vector
+        else:
+            rows = None
+            scores = matrix @ query_vector
+            scores[dead] = -np.inf
+        best = top_k(scores, k)
+        best = best[np.isfinite(scores[best])]
+        return [(int(rows[i] if rows is not None else i), float(scores[i])) for i in best]
+
+    def search(self, query, k=10, probes=None):
+        """
+        The k chunks closest to the query: [{"path", "start", "end", "label", "text", "score"}, ...].
+        """
+        hits = []
+        for row, score in self.search_vector(self.embedder.embed([query])[0], k, probes):
+            record = self._db.execute("""SELECT d.path, c.start, c.end, c.label, c.text FROM chunks c
+                                         JOIN documents d ON d.doc_id = c.doc_id WHERE c.row = ?""", (row,)).fetchone()
+            if record:
+                path, start, end, label, text = record
+                hits.append({"path": path, "start": start, "end": end, "label": label, "text": text, "score": score})
+        return hits
+
+    def close(self):
+        self._db.close()
+
+def format_hit(hit, width=160):
+    where = hit["label"] or ""
+    if hit["start"] is not None:
+        where = f"{format_seconds(hit['start'])}-{format_seconds(hit['end'])}"
+    text = hit["text"] if len(hit["text"]) <= width else hit["text"][:width] + " ..."
+    return f"{hit['score']:.3f} {hit['path']}" + (f" [{where}]" if where else "") + f"\n    {text}"
+
+# --- Benchmark ---
+
+def run_benchmark(chunks, dim, queries, k, loop_rows, lists_per_probe):
+    """
+    Random clustered unit vectors (like topic-grouped passages): a Python loop over rows (timed on
+    loop_rows and scaled up), one matmul + argpartition, matmul + full argsort, and IVF with its recall.
+    """
+    rng = np.random.default_rng(0)
+    noise = 1.2 / np.sqrt(dim)  # per dimension, so a chunk sits about as far from its topic as the topic's length
+    topics = _normalize(rng.standard_normal((256, dim)))
+    data = _normalize(topics[rng.integers(0, len(topics), chunks)] + noise * rng.standard_normal((chunks, dim), dtype=np.float32))
+    query_vectors = _normalize(data[rng.integers(0, chunks, queries)] + noise * rng.standard_normal((queries, dim), dtype=np.float32))
+    with tempfile.TemporaryDirectory(prefix="embedding_store_") as work_dir:
+        store = EmbeddingStore(work_dir, HashEmbedder(dim), ivf_min_chunks=sys.maxsize)
+        store._append_vectors(data)
+        with store._db:
+            store._db.executemany("INSERT INTO chunks (row, alive) VALUES (?, 1)", ((row,) for row in range(chunks)))
+        store._refresh()
+        print(f"[Benchmark] {chunks} chunks x {dim} dims ({chunks * dim * 4 / 1e6:.0f} MB memory-mapped), {queries} queries, k={k}")
+
+        start = time.perf_counter()
+        for query in query_vectors[:3]:
+            scores = [float(np.dot(store._matrix[i], query)) for i in range(min(loop_rows, chunks))]
+            sorted(range(len(scores)), key=scores.__getitem__, reverse=True)[:k]
+        loop_seconds = (time.perf_counter() - start) / 3 * chunks / min(loop_rows, chunks)
+        print(f"[Benchmark] Python loop over rows        : {loop_seconds * 1000:9.1f} ms/query (extrapolated)")
+
+        start = time.perf_counter()
+        for query in query_vectors:
+            np.argsort(-(store._matrix @ query))[:k]
+        print(f"[Benchmark] matmul + full argsort        : {(time.perf_counter() - start) / queries * 1000:9.1f} ms/query")
+
+        start = time.perf_counter()
+        exact = [[row for row, _ in store.search_vector(query, k)] for query in query_vectors]
+        exact_seconds = (time.perf_counter() - start) / queries
+        print(f"[Benchmark] matmul + argpartition (exact): {exact_seconds * 1000:9.1f} ms/query "
+              f"({loop_seconds / exact_seconds:.0f}x the loop)")
+
+        start = time.perf_counter()
+        store.build_ivf()
+        lists = len(store._ivf[0])
+        print(f"[Benchmark] IVF build: {lists} lists in {time.perf_counter() - start:.1f}s")
+        for probes in lists_per_probe:
+            start = time.perf_counter()
+            approx = [[row for row, _ in store.search_vector(query, k, probes)] for query in query_vectors]
+            seconds = (time.perf_counter() - start) / queries
+            recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+            print(f"[Benchmark] IVF, {probes:3d} of {lists} lists probed  : {seconds * 1000:9.1f} ms/query, "
+                  f"recall@{k} {recall:.3f} ({exact_seconds / seconds:.1f}x exact)")
+        store.close()
+
+        # The older scripts wrote result["text"] as one line; it must still become many chunks.
+        store = EmbeddingStore(os.path.join(work_dir, "legacy"), HashEmbedder(dim))
+        legacy = os.path.join(work_dir, "legacy.txt")
+        with open(legacy, "w", encoding="utf-8") as f:
+            f.write("".join(f" Sentence {index} of a lecture transcribed before the segment writers existed."
+                            for index in range(3500)))
+        store.add_file(legacy)
+        expected = os.path.getsize(legacy) // PASSAGE_CHARS
+        print(f"[Benchmark] Single-line transcript of {os.path.getsize(legacy)} chars: {store.rows} chunks "
+              f"({'ok' if store.rows >= expected else 'NOT SPLIT'})")
+        store.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk embedding store and nearest-neighbor search over transcripts.")
+    parser.add_argument("--store", default=STORE_DIR, help="Store directory.")
+    parser.add_argument("--embedder", choices=sorted(EMBEDDERS), default=None,
+                        help="Embedder for a new store (default: the store's own, else hash).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Embed new and changed transcripts.")
+    update_parser.add_argument("roots", nargs="*", help="Folders or files (default: those embedded before).")
+    search_parser = subparsers.add_parser("search", help="Find the chunks closest to a question.")
+    search_parser.add_argument("query", help="Question or description.")
+    search_parser.add_argument("--k", type=int, default=5, help="Number of chunks.")
+    search_parser.add_argument("--probes", type=int, default=None, help="IVF lists to probe (when built).")
+    ivf_parser = subparsers.add_parser("build-ivf", help="Build the IVF lists now, whatever the store size.")
+    ivf_parser.add_argument("--lists", type=int, default=None, help="Number of lists (default sqrt(chunks)).")
+    subparsers.add_parser("stats", help="Documents and chunks in the store.")
+    benchmark_parser = subparsers.add_parser("benchmark", help="Search timings on random vectors.")
+    benchmark_parser.add_argument("--chunks", type=int, default=200000, help="Number of vectors.")
+    benchmark_parser.add_argument("--dim", type=int, default=384, help="Vector dimension.")
+    benchmark_parser.add_argument("--queries", type=int, default=50, help="Queries to time.")
+    benchmark_parser.add_argument("--k", type=int, default=10, help="Neighbors per query.")
+    benchmark_parser.add_argument("--loop-rows", type=int, default=20000, help="Rows the Python loop is timed on.")
+    benchmark_parser.add_argument("--probes", type=int, nargs="+", default=[4, 16, 64], help="IVF probe counts to compare.")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        run_benchmark(args.chunks, args.dim, args.queries, args.k, args.loop_rows, args.probes)
+        return
+    store = EmbeddingStore(args.store, make_embedder(args.embedder) if args.embedder else None)
+    if args.command == "update":
+        if not (args.roots or store.roots()):
+            sys.exit("Nothing embedded yet: pass the folders to embed.")
+        store.update(args.roots)
+    elif args.command == "search":
+        start = time.perf_counter()
+        hits = store.search(args.query, args.k, args.probes)
+        for hit in hits:
+            print(format_hit(hit))
+        print(f"[Embeddings] {len(hits)} hit(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    elif args.command == "build-ivf":
+        store.build_ivf(args.lists)
+        print(f"[Embeddings] {len(store._ivf[0])} IVF lists over {store.rows} chunks")
+    else:
+        documents = store._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        print(f"{store.embedder.name}: {documents} document(s), {store.rows - int(store._dead.sum())} live chunks, "
+              f"{int(store._dead.sum())} tombstones, IVF {'on' if store._ivf is not None else 'off'}; "
+              f"roots: {', '.join(store.roots()) or '-'}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
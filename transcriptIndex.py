@@ -0,0 +1,460 @@
+"""
+Full-text search over every transcript and OCR output, in a local SQLite FTS5 index.
+
+Finding a sentence in thousands of .txt files meant grepping across a slow external disk. The index
+lives on the local disk (INDEX_PATH) and holds passages rather than whole files: about
+PASSAGE_SECONDS of speech with their timestamps for transcripts that have a .jsonl next to them
+(segmentWriters), the `=== title ===` sections of merged transcripts, the `--- Page N ---` sections of
+OCR output, and PASSAGE_CHARS-sized pieces of anything else (cut at sentence ends, also inside the
+single-line transcripts the older scripts wrote). `update` re-reads only files whose size
+or mtime changed (and whose content hash then differs) and drops files that are gone; the writers can
+also push a finished file straight in (TranscriptIndex.push, or index= on TranscriptWriter).
+
+Example Usages:
+
+1. Index (or re-index) the transcript folders; later runs only look at what changed:
+   python transcriptIndex.py update /Volumes/HezeORICO/life /Volumes/HezeSamsung/Lectures
+   python transcriptIndex.py update            # the folders indexed before
+
+2. Search (FTS5 query syntax: words, "exact phrases", prefix*, AND/OR/NOT):
+   python transcriptIndex.py search "dopamine receptor" --limit 5
+   python transcriptIndex.py search "sleep NEAR/5 caffeine" --kind transcript
+
+3. From a writer, as soon as an output is complete:
+   from transcriptIndex import TranscriptIndex
+   search_index = TranscriptIndex()
+   search_index.push(output_file)
+
+4. Build, update and query a synthetic corpus, against scanning the files:
+   python transcriptIndex.py benchmark --docs 2000
+
+Notes:
+- Files ending in .partial and macOS "._" files are never indexed; neither are folders starting with ".".
+- CJK characters are indexed one per token and CJK query terms are searched as phrases, so Chinese
+  transcripts are searchable without a word segmenter.
+- The index uses WAL mode, so scripts can push while a search runs; delete INDEX_PATH to rebuild.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import itertools
+import argparse
+import tempfile
+import threading
+
+INDEX_PATH = os.path.expanduser("~/.cache/transcript_index.sqlite")
+PASSAGE_SECONDS = 30.0  # speech per passage for transcripts with segment timestamps
+PASSAGE_CHARS = 1200    # characters per passage for plain text
+SNIPPET_TOKENS = 16
+DOCUMENT_EXTENSIONS = (".txt",)
+# Section headers written by the merge (=== title ===) and by A_mlxOlmOCR (--- Page N --- / --- File: x ---).
+SECTION_HEADER = re.compile(r"^(?:=== (?P<title>.+) ===|--- (?P<ocr>Page \d+|File: .+) ---)\s*$")
+# Where split_text() prefers to cut plain text: after a sentence end, else after whitespace.
+SENTENCE_END = re.compile(r"[.!?\u3002\uff01\uff1f][\"')\]]*\s+|[\u3002\uff01\uff1f]")
+WHITESPACE = re.compile(r"\s+")
+CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+CJK_CHAR = re.compile(f"([{CJK_RANGES}])")
+# The spaces _space_cjk() added: between CJK characters, also when a snippet marker sits in between.
+CJK_GAP = re.compile(f"(?<=[{CJK_RANGES}]) (?=\\[?[{CJK_RANGES}])|(?<=[{CJK_RANGES}]\\]) (?=\\[?[{CJK_RANGES}])")
+
+def _space_cjk(text):
+    return CJK_CHAR.sub(r" \1 ", text)
+
+def _unspace_cjk(text):
+    return CJK_GAP.sub("", re.sub(r" {2,}", " ", text))
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def iter_documents(roots):
+    """
+    Every indexable file under roots (a root may also be a single file).
+    """
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.abspath(root)
+            continue
+        for folder, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.endswith(DOCUMENT_EXTENSIONS) and not name.startswith("._"):
+                    yield os.path.abspath(os.path.join(folder, name))
+
+def segment_passages(jsonl_path):
+    """
+    (label, start, end, text) passages of about PASSAGE_SECONDS from a segment JSONL file.
+    """
+    texts, start, end = [], None, None
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                segment = json.loads(line)
+            except ValueError:
+                continue
+            if start is None:
+                start = segment["start"]
+            texts.append(segment["text"].strip())
+            end = segment["end"]
+            if end - start >= PASSAGE_SECONDS:
+                yield None, start, end, " ".join(texts)
+                texts, start = [], None
+    if texts:
+        yield None, start, end, " ".join(texts)
+
+def split_text(text, limit=PASSAGE_CHARS):
+    """
+    Pieces of at most `limit` characters, each cut at the last line break, else sentence end, else
+    whitespace in its second half (hard cut when there is none). The last piece is the remainder.
+    """
+    pieces = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = window.rfind("\n") + 1
+        if cut <= limit // 2:
+            ends = [match.end() for match in SENTENCE_END.finditer(window, limit // 2)]
+            cut = ends[-1] if ends else 0
+        if cut <= limit // 2:
+            spaces = [match.end() for match in WHITESPACE.finditer(window, limit // 2)]
+            cut = spaces[-1] if spaces else limit
+        pieces.append(text[:cut])
+        text = text[cut:]
+    pieces.append(text)
+    return pieces
+
+def text_passages(path):
+    """
+    (label, None, None, text) passages of a text file: one per section header, split further into
+    PASSAGE_CHARS pieces (see split_text). Old transcripts and merged sections are a single line of
+    text, so the split goes inside lines too.
+    """
+    label, lines, size = None, [], 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            header = SECTION_HEADER.match(line)
+            if header:
+                if "".join(lines).strip():
+                    yield label, None, None, "".join(lines).strip()
+                label = header.group("title") or header.group("ocr")
+                lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line)
+            if size > PASSAGE_CHARS:
+                *pieces, rest = split_text("".join(lines))
+                for piece in pieces:
+                    if piece.strip():
+                        yield label, None, None, piece.strip()
+                lines, size = [rest], len(rest)
+    if "".join(lines).strip():
+        yield label, None, None, "".join(lines).strip()
+
+def document_kind(path):
+    """
+    "merged", "transcript" (has segment timestamps or no OCR headers) or "ocr".
+    """
+    if os.path.basename(path) == "merged_transcript.txt":
+        return "merged"
+    if os.path.exists(os.path.splitext(path)[0] + ".jsonl"):
+        return "transcript"
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        first_line = f.readline()
+    match = SECTION_HEADER.match(first_line)
+    return "ocr" if match and match.group("ocr") else "transcript"
+
+class TranscriptIndex:
+    """
+    The FTS5 index. Safe to share between threads; several processes may use the same file.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute("""CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY, path TEXT UNIQUE, kind TEXT, size INTEGER, mtime_ns INTEGER,
+                sha1 TEXT, indexed_at REAL)""")
+            self._db.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY)")
+            # Passages are stored once, in this table; the FTS5 table only indexes them (external content).
+            self._db.execute("""CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY, doc_id INTEGER, start REAL, end REAL, label TEXT, text TEXT)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS passages_doc ON passages (doc_id)")
+            self._db.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                text, content='passages', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""")
+            self._db.execute("""CREATE TRIGGER IF NOT EXISTS passages_ai AFTER INSERT ON passages BEGIN
+                INSERT INTO passages_fts (rowid, text) VALUES (new.id, new.text); END""")
+            self._db.execute("""CREATE TRIGGER IF NOT EXISTS passages_ad AFTER DELETE ON passages BEGIN
+                INSERT INTO passages_fts (passages_fts, rowid, text) VALUES ('delete', old.id, old.text); END""")
+
+    def add_file(self, path, kind=None):
+        """
+        Index one file if it is new or changed. Returns "added", "changed" or "unchanged".
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._db.execute("SELECT doc_id, size, mtime_ns, sha1 FROM documents WHERE path = ?", (path,)).fetchone()
+        if row and (row[1], row[2]) == (stat.st_size, stat.st_mtime_ns):
+            return "unchanged"
+        digest = file_hash(path)
+        if row and row[3] == digest:
+            with self._lock, self._db:
+                self._db.execute("UPDATE documents SET size = ?, mtime_ns = ? WHERE doc_id = ?",
+                                 (stat.st_size, stat.st_mtime_ns, row[0]))
+            return "unchanged"
+        jsonl_path = os.path.splitext(path)[0] + ".jsonl"
+        passages = segment_passages(jsonl_path) if os.path.exists(jsonl_path) else text_passages(path)
+        kind = kind or document_kind(path)
+        with self._lock, self._db:
+            if row:
+                doc_id = row[0]
+                self._db.execute("DELETE FROM passages WHERE doc_id = ?", (doc_id,))
+                self._db.execute("UPDATE documents SET kind = ?, size = ?, mtime_ns = ?, sha1 = ?, indexed_at = ? WHERE doc_id = ?",
+                                 (kind, stat.st_size, stat.st_mtime_ns, digest, time.time(), doc_id))
+            else:
+                doc_id = self._db.execute("INSERT INTO documents (path, kind, size, mtime_ns, sha1, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                          (path, kind, stat.st_size, stat.st_mtime_ns, digest, time.time())).lastrowid
+            self._db.executemany("INSERT INTO passages (doc_id, start, end, label, text) VALUES (?, ?, ?, ?, ?)",
+                                 ((doc_id, start, end, label, _space_cjk(text)) for label, start, end, text in passages))
+        return "changed" if row else "added"
+
+    def push(self, path, kind=None):
+        """
+        add_file() for writers: never raises, so a failed index update cannot fail a transcription.
+        A malformed .jsonl (missing fields, invalid UTF-8) counts as a failed update too.
+        """
+        try:
+            self.add_file(path, kind)
+        except (OSError, sqlite3.Error, ValueError, KeyError) as e:
+            print(f"[Index] Could not index {path}: {e}")
+
+    def remove(self, path):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT doc_id FROM documents WHERE path = ?", (path,)).fetchone()
+            if row:
+                self._db.execute("DELETE FROM passages WHERE doc_id = ?", (row[0],))
+                self._db.execute("DELETE FROM documents WHERE doc_id = ?", (row[0],))
+
+    def roots(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT root FROM roots")]
+
+    def update(self, roots=None, verbose=True):
+        """
+        Bring the index up to date with roots (default: every root indexed before).
+        Returns {"added", "changed", "unchanged", "removed"} counts.
+        """
+        roots = [os.path.abspath(root) for root in (roots or self.roots())]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO roots VALUES (?)", [(root,) for root in roots])
+        start = time.perf_counter()
+        counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+        seen = set()
+        for path in iter_documents(roots):
+            seen.add(path)
+            try:
+                counts[self.add_file(path)] += 1
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[Index] Skipping {path}: {e}")
+        with self._lock:
+            indexed = [row[0] for row in self._db.execute("SELECT path FROM documents")]
+        for path in indexed:
+            under_root = any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+            if under_root and path not in seen:
+                self.remove(path)
+                counts["removed"] += 1
+        if verbose:
+            print(f"[Index] {counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged, "
+                  f"{counts['removed']} removed in {time.perf_counter() - start:.2f}s")
+        return counts
+
+    @staticmethod
+    def _match_expression(query, quote_all=False):
+        terms = []
+        for term in re.findall(r'"[^"]*"|\S+', query):
+            if quote_all or CJK_CHAR.search(term):
+                # CJK terms become phrases of single characters, matching how they were indexed.
+                term = '"' + _space_cjk(term.strip('"')).replace('"', '""').strip() + '"'
+            terms.append(term)
+        return " ".join(terms)
+
+    def search(self, query, limit=10, kind=None):
+        """
+        Best-matching passages first: [{"path", "kind", "start", "end", "label", "snippet", "score"}, ...].
+        start/end are seconds into the recording (None for text without timestamps).
+        """
+        sql = """SELECT d.path, d.kind, p.start, p.end, p.label,
+                        snippet(passages_fts, 0, '[', ']', ' ... ', ?), bm25(passages_fts)
+                 FROM passages_fts JOIN passages p ON p.id = passages_fts.rowid JOIN documents d ON d.doc_id = p.doc_id
+                 WHERE passages_fts MATCH ?""" + (" AND d.kind = ?" if kind else "") + " ORDER BY bm25(passages_fts) LIMIT ?"
+        for quote_all in (False, True):
+            params = [SNIPPET_TOKENS, self._match_expression(query, quote_all)] + ([kind] if kind else []) + [limit]
+            try:
+                with self._lock:
+                    rows = self._db.execute(sql, params).fetchall()
+                break
+            except sqlite3.OperationalError:
+                if quote_all:
+                    raise
+                # Not valid FTS5 syntax (e.g. a stray '-' or ':'): search the words literally instead.
+        return [{"path": path, "kind": kind, "start": start, "end": end, "label": label,
+                 "snippet": _unspace_cjk(snippet), "score": -score}
+                for path, kind, start, end, label, snippet, score in rows]
+
+    def stats(self):
+        with self._lock:
+            documents = self._db.execute("SELECT kind, COUNT(*), SUM(size) FROM documents GROUP BY kind").fetchall()
+            passages = self._db.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return documents, passages
+
+    def close(self):
+        self._db.close()
+
+def format_hit(hit):
+    where = hit["label"] or ""
+    if hit["start"] is not None:
+        where = f"{format_seconds(hit['start'])}-{format_seconds(hit['end'])}"
+    return f"{hit['path']}" + (f" [{where}]" if where else "") + f"\n    {hit['snippet']}"
+
+# --- Benchmark ---
+
+def make_corpus(folder, docs, words_per_doc, seed=0):
+    """
+    Synthetic transcripts (half with segment JSONL, like segmentWriters output) and OCR outputs.
+    """
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "so", "ta", "vi", "do", "pe", "zu", "gar", "lin", "ost", "ber", "tex"]
+    vocabulary = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(30000)})
+    rng.shuffle(vocabulary)
+    # Word frequencies fall off as 1/rank, as in natural language.
+    cum_weights = list(itertools.accumulate(1.0 / rank for rank in range(1, len(vocabulary) + 1)))
+    for index in range(docs):
+        sub = os.path.join(folder, f"show{index % 20:02d}")
+        os.makedirs(sub, exist_ok=True)
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_doc)
+        base = os.path.join(sub, f"episode {index:05d}")
+        if index % 4 == 3:
+            pages = [words[i:i + 300] for i in range(0, len(words), 300)]
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                for page_number, page in enumerate(pages, 1):
+                    f.write(f"--- Page {page_number} ---\n{' '.join(page)}\n")
+            continue
+        segments = [words[i:i + 15] for i in range(0, len(words), 15)]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("".join(" " + " ".join(segment) for segment in segments))
+        if index % 2 == 0:
+            with open(base + ".jsonl", "w", encoding="utf-8") as f:
+                for number, segment in enumerate(segments):
+                    f.write(json.dumps({"id": number, "start": number * 5.0, "end": number * 5.0 + 4.6,
+                                        "text": " " + " ".join(segment)}) + "\n")
+    return vocabulary[50:2000]  # mid-frequency words as query terms
+
+def scan_files(folder, term):
+    """
+    The old way: read every file and look for the term.
+    """
+    hits = []
+    for path in iter_documents([folder]):
+        with open(path, "r", encoding="utf-8") as f:
+            if term in f.read():
+                hits.append(path)
+    return hits
+
+def run_benchmark(docs, words_per_doc, queries):
+    with tempfile.TemporaryDirectory(prefix="transcript_index_") as work_dir:
+        corpus = os.path.join(work_dir, "corpus")
+        terms = make_corpus(corpus, docs, words_per_doc)
+        megabytes = sum(os.path.getsize(path) for path in iter_documents([corpus])) / 1e6
+        print(f"[Benchmark] {docs} documents, {megabytes:.0f} MB of text")
+        index = TranscriptIndex(os.path.join(work_dir, "index.sqlite"))
+        for label in ("build", "no changes"):
+            start = time.perf_counter()
+            index.update([corpus], verbose=False)
+            print(f"[Benchmark] Update ({label}): {time.perf_counter() - start:.2f}s")
+        changed = list(iter_documents([corpus]))[:10]
+        for path in changed:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(" appended sentence")
+        os.remove(changed[-1])
+        start = time.perf_counter()
+        counts = index.update([corpus], verbose=False)
+        print(f"[Benchmark] Update (10 touched, 1 deleted): {time.perf_counter() - start:.2f}s {counts}")
+        # The older scripts wrote result["text"] as one line; it must still become many passages.
+        legacy = os.path.join(work_dir, "legacy.txt")
+        with open(legacy, "w", encoding="utf-8") as f:
+            while f.tell() < 250000:
+                f.write(" " + " ".join(random.choices(terms, k=12)).capitalize() + ".")
+        passages = sum(1 for _ in text_passages(legacy))
+        print(f"[Benchmark] Single-line transcript of {os.path.getsize(legacy)} chars: {passages} passages "
+              f"({'ok' if passages >= os.path.getsize(legacy) // PASSAGE_CHARS else 'NOT SPLIT'})")
+
+        rng = random.Random(1)
+        sample = [rng.choice(terms) + (" " + rng.choice(terms) if rng.random() < 0.5 else "") for _ in range(queries)]
+        start = time.perf_counter()
+        for query in sample:
+            index.search(query, limit=10)
+        per_query = (time.perf_counter() - start) / queries
+        start = time.perf_counter()
+        scan_files(corpus, sample[0].split()[0])
+        scan_seconds = time.perf_counter() - start
+        print(f"[Benchmark] Search: {per_query * 1000:.1f} ms/query over {queries} queries; "
+              f"scanning the files for one term: {scan_seconds * 1000:.0f} ms ({scan_seconds / per_query:.0f}x)")
+        for hit in index.search(sample[0], limit=2):
+            print("  " + format_hit(hit))
+        index.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search index over transcripts and OCR output.")
+    parser.add_argument("--index", default=INDEX_PATH, help="Index database file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update_parser = subparsers.add_parser("update", help="Index new and changed files, drop deleted ones.")
+    update_parser.add_argument("roots", nargs="*", help="Folders or files (default: those indexed before).")
+    search_parser = subparsers.add_parser("search", help="Search the index.")
+    search_parser.add_argument("query", help="Words, \"phrases\", prefix* or any FTS5 query.")
+    search_parser.add_argument("--limit", type=int, default=10, help="Maximum number of hits.")
+    search_parser.add_argument("--kind", choices=("transcript", "merged", "ocr"), help="Only this kind of document.")
+    subparsers.add_parser("stats", help="Documents and passages in the index.")
+    benchmark_parser = subparsers.add_parser("benchmark", help="Build and query a synthetic corpus.")
+    benchmark_parser.add_argument("--docs", type=int, default=2000, help="Documents in the synthetic corpus.")
+    benchmark_parser.add_argument("--words", type=int, default=3000, help="Words per document.")
+    benchmark_parser.add_argument("--queries", type=int, default=200, help="Queries to time.")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        run_benchmark(args.docs, args.words, args.queries)
+        return
+    index = TranscriptIndex(args.index)
+    if args.command == "update":
+        if not (args.roots or index.roots()):
+            sys.exit("Nothing indexed yet: pass the folders to index.")
+        index.update(args.roots)
+    elif args.command == "search":
+        start = time.perf_counter()
+        hits = index.search(args.query, args.limit, args.kind)
+        for hit in hits:
+            print(format_hit(hit))
+        print(f"[Index] {len(hits)} hit(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        documents, passages = index.stats()
+        for kind, count, size in documents:
+            print(f"{kind}: {count} file(s), {size / 1e6:.1f} MB")
+        print(f"{passages} passages; roots: {', '.join(index.roots()) or '-'}")
+    index.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Batch planning for the folder transcribers: probe every pending file's duration, order the batch,
+and report live throughput and an ETA for the whole batch.
+
+The folder scripts walked os.listdir() in whatever order the filesystem returned and only printed
+"Reached approximately N seconds" inside the current file, so a run over a few hundred episodes gave
+no idea when it would end. plan_batch() probes all pending files concurrently (container headers
+first, ffprobe/ffmpeg otherwise; results cached on disk by path, size and mtime) and orders them by
+a policy. BatchProgress follows the segments as they arrive (the on_segment hook) and prints audio
+seconds transcribed per wall second and the time left for the batch.
+
+Example Usages:
+
+1. From a folder script:
+   from transcriptionBatch import plan_batch, BatchProgress
+   jobs = plan_batch(pending_paths, policy="longest-first")   # [(path, seconds), ...]
+   progress = BatchProgress(jobs)
+   for path, duration in jobs:
+       progress.start_file(path, duration)
+       result = transcribe(path, on_segment=progress.on_segment)
+       progress.finish_file()
+
+2. Show the plan for folders (probing cold, then again from the cache):
+   python transcriptionBatch.py /Volumes/HezeORICO/life/Huberman\\ Lab --policy shortest-first
+
+Notes:
+- Policies: longest-first (shortest makespan when files run in parallel), shortest-first (first
+  transcripts sooner), name (alphabetical), listdir (as given).
+- WAV, FLAC and MP4/M4A/MOV durations are read from the file header; other formats go through
+  ffprobe, or `ffmpeg -i` when ffprobe is missing. Files nothing can read count as 0 seconds.
+"""
+import os
+import re
+import json
+import time
+import wave
+import struct
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from transcriptIndex import format_seconds
+
+DURATION_CACHE_PATH = os.path.expanduser("~/.cache/whisper_durations.json")
+PROBE_WORKERS = 8
+PROGRESS_INTERVAL = 300  # seconds of audio between progress lines within a file
+ORDER_POLICIES = {
+    "longest-first": lambda job: -job[1],
+    "shortest-first": lambda job: job[1],
+    "name": lambda job: os.path.basename(job[0]).lower(),
+    "listdir": None,
+}
+MP4_EXTENSIONS = (".mp4", ".m4a", ".mov", ".m4v")
+
+# --- Duration probing ---
+
+def _wav_duration(path):
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+def _flac_duration(path):
+    with open(path, "rb") as f:
+        data = f.read(42)
+    if data[:4] != b"fLaC" or len(data) < 42:
+        return None
+    info = data[8:42]  # STREAMINFO, always the first metadata block
+    sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+    total_samples = ((info[13] & 0x0F) << 32) | struct.unpack(">I", info[14:18])[0]
+    return total_samples / sample_rate if sample_rate and total_samples else None
+
+def _mp4_duration(path):
+    """
+    Timescale and duration from the moov/mvhd box; the moov box may come before or after mdat.
+    """
+    def boxes(f, end):
+        while f.tell() + 8 <= end:
+            start = f.tell()
+            size, kind = struct.unpack(">I4s", f.read(8))
+            header = 8
+            if size == 1:
+                size = struct.unpack(">Q", f.read(8))[0]
+                header = 16
+            elif size == 0:
+                size = end - start
+            if size < header:
+                return
+            yield kind, start + header, start + size
+            f.seek(start + size)
+
+    with open(path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        for kind, body, box_end in boxes(f, end):
+            if kind != b"moov":
+                continue
+            f.seek(body)
+            for inner, inner_body, _ in boxes(f, box_end):
+                if inner == b"mvhd":
+                    f.seek(inner_body)
+                    version = f.read(4)[0]
+                    if version == 1:
+                        timescale, duration = struct.unpack(">16xIQ", f.read(28))
+                    else:
+                        timescale, duration = struct.unpack(">8xII", f.read(16))
+                    return duration / timescale if timescale else None
+            return None
+    return None
+
+def _tool_duration(path):
+    if shutil.which("ffprobe"):
+        try:
+            output = subprocess.check_output([
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", path
+            ], universal_newlines=True, stderr=subprocess.DEVNULL)
+            return float(output.strip())
+        except (subprocess.CalledProcessError, ValueError):
+            return None
+    if shutil.which("ffmpeg"):
+        # Without an output file ffmpeg exits with an error, after printing the input's duration.
+        output = subprocess.run(["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True).stderr
+        match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", output)
+        if match:
+            hours, minutes, seconds = match.groups()
+            return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return None
+
+def probe_duration(path):
+    """
+    Duration of a media file in seconds (None if it cannot be read).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    header_parsers = {".wav": _wav_duration, ".flac": _flac_duration}
+    header_parsers.update(dict.fromkeys(MP4_EXTENSIONS, _mp4_duration))
+    parser = header_parsers.get(extension)
+    if parser:
+        try:
+            duration = parser(path)
+            if duration:
+                return duration
+        except (OSError, EOFError, wave.Error, struct.error, IndexError):
+            pass
+    return _tool_duration(path)
+
+class DurationCache:
+    """
+    Probed durations in a JSON file, keyed by absolute path; an entry is only used while the file's
+    size and mtime still match.
+    """
+
+    def __init__(self, path=DURATION_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, path):
+        entry = self._entries.get(os.path.abspath(path))
+        if entry and entry["stamp"] == self._stamp(path):
+            return entry["seconds"]
+        return None
+
+    def put(self, path, seconds):
+        with self._lock:
+            self._entries[os.path.abspath(path)] = {"stamp": self._stamp(path), "seconds": seconds}
+
+    def save(self):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            # A temp file of our own, so concurrent runs saving the same cache don't write into each other's.
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=folder)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+def probe_durations(paths, cache=None, workers=PROBE_WORKERS):
+    """
+    {path: seconds} for all paths, probing the ones missing from the cache concurrently.
+    """
+    durations = {}
+    missing = []
+    for path in paths:
+        cached = cache.get(path) if cache else None
+        if cached is None:
+            missing.append(path)
+        else:
+            durations[path] = cached
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, seconds in zip(missing, executor.map(probe_duration, missing)):
+            durations[path] = seconds or 0.0
+            if cache and seconds is not None:
+                cache.put(path, seconds)
+    if cache and missing:
+        cache.save()
+    return durations
+
+def plan_batch(paths, policy="longest-first", cache=None):
+    """
+    [(path, seconds), ...] for the pending files, ordered by policy (see ORDER_POLICIES).
+    """
+    start = time.perf_counter()
+    cache = cache if cache is not None else DurationCache()
+    durations = probe_durations(paths, cache)
+    jobs = [(path, durations[path]) for path in paths]
+    key = ORDER_POLICIES[policy]
+    if key:
+        jobs.sort(key=key)
+    total = sum(seconds for _, seconds in jobs)
+    print(f"[Plan] {len(jobs)} file(s), {total / 3600:.1f}h of audio, probed in "
+          f"{time.perf_counter() - start:.1f}s; order: {policy}")
+    return jobs
+
+# --- Progress ---
+
+class BatchProgress:
+    """
+    Throughput (audio seconds per wall second) and ETA over a planned batch. Feed it with
+    start_file(), on_segment() for each segment as it arrives, and finish_file().
+    """
+
+    def __init__(self, jobs, interval=PROGRESS_INTERVAL):
+        self.total = sum(seconds for _, seconds in jobs)
+        self.files = len(jobs)
+        self.interval = interval
+        self.done_seconds = 0.0
+        self.done_files = 0
+        self.started = time.perf_counter()
+        self._name = None
+        self._duration = 0.0
+        self._position = 0.0
+        self._next_report = interval
+
+    def start_file(self, path, duration):
+        self._name = os.path.basename(path)
+        self._duration = duration
+        self._position = 0.0
+        self._next_report = self.interval
+
+    def on_segment(self, segment):
+        """
+        Progress hook: pass as on_segment= to transcribe(); reports every `interval` seconds of audio.
+        """
+        self._position = max(self._position, min(segment["end"], self._duration or segment["end"]))
+        if segment["start"] >= self._next_report:
+            print(f"Reached approximately {int(segment['start'])} seconds in '{self._name}' | {self.status()}")
+            while self._next_report <= segment["start"]:
+                self._next_report += self.interval
+
+    def finish_file(self):
+        self.done_seconds += self._duration
+        self.done_files += 1
+        self._position = 0.0
+        print(f"[Progress] {self.done_files}/{self.files} files | {self.status()}")
+
+    def status(self):
+        elapsed = time.perf_counter() - self.started
+        transcribed = self.done_seconds + self._position
+        rate = transcribed / elapsed if elapsed else 0.0
+        remaining = max(0.0, self.total - transcribed)
+        eta = format_seconds(remaining / rate) if rate else "?"
+        return (f"{format_seconds(transcribed)} of {format_seconds(self.total)} audio, "
+                f"{rate:.1f}x realtime, ETA {eta}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe and order the media files of folders the way the folder transcribers plan a batch.")
+    parser.add_argument("folders", nargs="+", help="Folders to scan.")
+    parser.add_argument("--policy", choices=sorted(ORDER_POLICIES), default="longest-first", help="Job order.")
+    parser.add_argument("--cache", default=DURATION_CACHE_PATH, help="Duration cache file.")
+    args = parser.parse_args()
+    media = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".opus", ".mp4", ".mov", ".avi", ".mkv")
+    paths = [os.path.join(folder, name) for folder in args.folders for name in sorted(os.listdir(folder))
+             if name.lower().endswith(media) and not name.startswith("._")]
+    # Cold vs cached timing runs on a throwaway cache, so the real one keeps its entries for other folders.
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for label in ("cold", "cached"):
+            cache = DurationCache(os.path.join(temp_dir, "durations.json"))
+            start = time.perf_counter()
+            probe_durations(paths, cache)
+            print(f"[Plan] Probed {len(paths)} file(s) {label} in {time.perf_counter() - start:.2f}s")
+    for path, seconds in plan_batch(paths, args.policy, DurationCache(args.cache)):
+        print(f"  {format_seconds(seconds)}  {os.path.basename(path)}")
+
+if __name__ == "__main__":
+    main()
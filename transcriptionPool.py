@@ -0,0 +1,244 @@
+"""
+A pool of model-holding transcription workers with a bounded queue and longest-first scheduling.
+
+The playlist transcriber had exactly one transcription thread in front of one model, so nothing past
+the downloads could scale. TranscriptionPool runs N worker processes (private A_mlxWhisperDaemon
+instances: the backends hold the GIL while decoding, so threads would not help), keeps at most
+max_pending jobs waiting, returns a Future per job and shuts down gracefully. Among the waiting jobs
+the longest audio goes first (LPT), which keeps one long episode from being the last job running on
+one worker while the others sit idle.
+
+Example Usages:
+
+1. From a script:
+   from transcriptionPool import TranscriptionPool
+   with TranscriptionPool(workers=2, backend_name="mlx_whisper", model_id=MODEL_ID) as pool:
+       futures = [pool.submit(path) for path in audio_files]   # blocks while max_pending jobs wait
+       for future in futures:
+           print(future.result()["text"])
+
+2. Benchmark 1 vs N workers, arrival order vs longest-first, with the fake backend (sleeps in
+   proportion to the audio length):
+   python transcriptionPool.py --jobs 24 --workers 1 2 4 --realtime-factor 0.0005
+
+Notes:
+- Durations come from ffprobe when it is installed, else from the file size (about 128 kbps); pass
+  duration= to submit() when you already know it.
+- close() waits for the queued jobs; close(cancel_pending=True) cancels the ones not started yet.
+- Each worker loads its own copy of the model: size N by memory as well as cores.
+"""
+import os
+import time
+import heapq
+import random
+import shutil
+import argparse
+import tempfile
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future
+
+from A_whisperAudio import SAMPLE_RATE, WorkerProcesses
+
+POOL_WORKERS = 2
+POOL_MAX_PENDING = 16
+# Without ffprobe a file's duration is estimated from its size at this bitrate.
+FALLBACK_BYTES_PER_SECOND = 16000
+
+def estimate_duration(audio):
+    """
+    Seconds of audio in a path (ffprobe, else file size) or in a 16 kHz array.
+    """
+    if not isinstance(audio, str):
+        return len(audio) / SAMPLE_RATE
+    if shutil.which("ffprobe"):
+        try:
+            output = subprocess.check_output([
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", audio
+            ], universal_newlines=True)
+            return float(output.strip())
+        except (subprocess.CalledProcessError, ValueError):
+            pass
+    try:
+        return os.path.getsize(audio) / FALLBACK_BYTES_PER_SECOND
+    except OSError:
+        return 0.0
+
+class TranscriptionPool:
+    """
+    N worker processes fed from one bounded queue. A dispatcher thread per worker takes the waiting
+    job with the longest audio (or the oldest, with longest_first=False), sends it to its worker over
+    the daemon socket and resolves the job's Future with {"text", "segments", "language"}.
+    """
+
+    def __init__(self, workers=POOL_WORKERS, backend_name="mlx_whisper", model_id=None, max_pending=POOL_MAX_PENDING,
+                 longest_first=True, duration_fn=estimate_duration, serve_args=(), startup_timeout=600, verbose=True):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.longest_first = longest_first
+        self.duration_fn = duration_fn
+        self.verbose = verbose
+        self.busy = 0.0     # summed worker seconds
+        self.done = 0
+        self.failed = 0
+        self._pending = []  # heap of (key, seq, audio, options, future)
+        self._seq = itertools.count()
+        self._active = 0
+        self._closing = False
+        self._cond = threading.Condition()
+        self._processes = WorkerProcesses(workers, backend_name, model_id, serve_args, startup_timeout, label="Pool")
+        self._dispatchers = [threading.Thread(target=self._dispatch, args=(path,), daemon=True)
+                             for path in self._processes.sockets]
+        for dispatcher in self._dispatchers:
+            dispatcher.start()
+
+    def submit(self, audio, duration=None, **options):
+        """
+        Queue a path or 16 kHz array for transcription and return its Future. Blocks while
+        max_pending jobs are already waiting.
+        """
+        if duration is None:
+            duration = self.duration_fn(audio)
+        future = Future()
+        with self._cond:
+            while len(self._pending) >= self.max_pending and not self._closing:
+                self._cond.wait()
+            if self._closing:
+                raise RuntimeError("TranscriptionPool is closed")
+            seq = next(self._seq)
+            key = -duration if self.longest_first else seq
+            heapq.heappush(self._pending, (key, seq, audio, options, future))
+            self._cond.notify_all()
+        return future
+
+    def transcribe(self, audio, **options):
+        """
+        Blocking call with the same result shape as A_mlxWhisperDaemon.transcribe().
+        """
+        return self.submit(audio, **options).result()
+
+    def _dispatch(self, socket_path):
+        from A_mlxWhisperDaemon import stream_transcription
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                _, _, audio, options, future = heapq.heappop(self._pending)
+                self._active += 1
+                self._cond.notify_all()
+            if future.set_running_or_notify_cancel():
+                start = time.perf_counter()
+                try:
+                    segments, result = [], None
+                    for event in stream_transcription(audio, options=options, socket_path=socket_path):
+                        if event["type"] == "segment":
+                            segments.append({key: event[key] for key in ("id", "start", "end", "text")})
+                        elif event["type"] == "done":
+                            result = {"text": event["text"], "segments": segments, "language": event.get("language")}
+                    if result is None:
+                        raise RuntimeError("Worker closed the connection before finishing")
+                    future.set_result(result)
+                except Exception as e:
+                    future.set_exception(e)
+                with self._cond:
+                    self.busy += time.perf_counter() - start
+                    self.done += 1
+                    self.failed += future.exception() is not None
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def wait(self):
+        """
+        Block until every submitted job has finished.
+        """
+        with self._cond:
+            while self._pending or self._active:
+                self._cond.wait()
+
+    def close(self, cancel_pending=False):
+        """
+        Stop accepting jobs, finish the queued ones (or cancel them), then stop the workers.
+        """
+        with self._cond:
+            self._closing = True
+            if cancel_pending:
+                for _, _, _, _, future in self._pending:
+                    future.cancel()
+                self._pending = []
+            self._cond.notify_all()
+        for dispatcher in self._dispatchers:
+            dispatcher.join()
+        self._processes.close()
+        if self.verbose:
+            print(f"[Pool] {self.done} job(s) on {self.workers} worker(s), {self.failed} failed, "
+                  f"{self.busy:.1f} worker-seconds busy")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- Benchmark ---
+
+def run_benchmark(jobs, worker_counts, realtime_factor, seed):
+    """
+    Fake-backend workers that sleep realtime_factor seconds per second of audio; jobs are files of
+    mixed length (a few long episodes among short clips) submitted in a random order.
+    """
+    from A_mlxWhisperDaemon import FAKE_BYTES_PER_SECOND
+    rng = random.Random(seed)
+    durations = [rng.choice([rng.uniform(60, 600)] * 4 + [rng.uniform(3600, 7200)]) for _ in range(jobs)]
+    work_dir = tempfile.mkdtemp(prefix="pool_bench_")
+    try:
+        paths = []
+        for index, duration in enumerate(durations):
+            # The fake backend reads the duration from the file size.
+            path = os.path.join(work_dir, f"job{index:03d}.bin")
+            with open(path, "wb") as f:
+                f.truncate(int(duration * FAKE_BYTES_PER_SECOND))
+            paths.append(path)
+        total = sum(durations) * realtime_factor
+        print(f"[Benchmark] {jobs} jobs, {sum(durations) / 3600:.1f}h of audio, longest {max(durations) / 60:.0f} min; "
+              f"{total:.1f}s of fake decoding in total")
+        serve_args = ["--fake-realtime-factor", str(realtime_factor)]
+        results = {}
+        for workers in worker_counts:
+            for longest_first in (False, True):
+                label = f"{workers} worker(s), {'longest-first' if longest_first else 'arrival order'}"
+                pool = TranscriptionPool(workers, backend_name="fake", longest_first=longest_first,
+                                         max_pending=jobs, serve_args=serve_args, verbose=False,
+                                         duration_fn=lambda path: os.path.getsize(path) / FAKE_BYTES_PER_SECOND)
+                start = time.perf_counter()
+                futures = [pool.submit(path) for path in paths]
+                for future in futures:
+                    future.result()
+                makespan = time.perf_counter() - start
+                pool.close()
+                results[label] = makespan
+                bound = max(total / workers, max(durations) * realtime_factor)
+                print(f"[Benchmark] {label:<36}: makespan {makespan:6.2f}s (lower bound {bound:.2f}s, "
+                      f"{pool.busy / (workers * makespan):.0%} utilized)")
+        baseline = results[f"{worker_counts[0]} worker(s), arrival order"]
+        best = min(results, key=results.get)
+        print(f"[Benchmark] Best: {best}, {baseline / results[best]:.2f}x faster than "
+              f"{worker_counts[0]} worker(s) in arrival order")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TranscriptionPool with the fake backend.")
+    parser.add_argument("--jobs", type=int, default=24, help="Number of fake audio files.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare.")
+    parser.add_argument("--realtime-factor", type=float, default=0.0005, help="Fake decoding seconds per second of audio.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the job lengths and order.")
+    args = parser.parse_args()
+    run_benchmark(args.jobs, args.workers, args.realtime_factor, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,35 @@
 import os
 import sys
 import threading
-import queue
 import time
 import yt_dlp
 import subprocess
 import concurrent.futures
+from downloadController import DownloadController
+from playlistMetadata import MetadataCache, process_playlist_metadata, extract_video
+from conversionScheduler import ConversionScheduler
+from audioDownload import download_audio
 import re
+import argparse
 
 # Concurrency limits for each group
+# Downloads start at DOWNLOAD_CONCURRENCY; DownloadController raises that up to DOWNLOAD_CONCURRENCY_MAX
+# while throughput holds up and cuts it on HTTP 429s or slow-downs.
 DOWNLOAD_CONCURRENCY = 15
-CONVERSION_CONCURRENCY = 8
+DOWNLOAD_CONCURRENCY_MAX = 32
+# None sizes the conversion pool from os.cpu_count() // FFMPEG_THREADS_PER_JOB; ConversionScheduler
+# then lowers or raises it at runtime from the load average (and the downstream queue).
+CONVERSION_CONCURRENCY = None
 METADATA_CONCURRENCY = 50
 
+# Download only an audio stream and stream-copy it instead of fetching the video and re-encoding
+# to MP3 (see audioDownload.py). False restores the old MP4 download + 192k MP3 conversion.
+AUDIO_ONLY = True
+
+# Playlist and video metadata cached on disk (see playlistMetadata.METADATA_CACHE_DIR): re-runs skip the
+# playlist extraction, and downloads reuse a video's info dict while it is fresh.
+metadata_cache = MetadataCache()
+
 def canonical_input(prompt):
     """
     Force the terminal into a sane state before prompting.
@@ -20,73 +37,29 @@ def canonical_input(prompt):
     os.system("stty sane")
     return input(prompt)
 
-def get_playlist_title(playlist_url):
-    """
-    Retrieve the playlist title using yt-dlp with --skip-download, --no-warnings, and --print playlist_title.
-    Returns a sanitized title string safe for a folder name.
-    """
-    try:
-        cmd = [
-            "yt-dlp",
-            playlist_url,
-            "-I", "1:1",
-            "--skip-download",
-            "--no-warnings",
-            "--print", "playlist_title"
-        ]
-        output = subprocess.check_output(cmd, universal_newlines=True)
-        title = output.strip()
-        # Sanitize: allow alphanumerics, spaces, underscore, dash.
-        safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
-        return safe_title if safe_title else "playlist_unknown"
-    except Exception as e:
-        print(f"[Title] Error retrieving playlist title for {playlist_url}: {e}")
-        return "playlist_unknown"
-
-def get_playlist_video_urls(playlist_url):
-    """
-    Extract a list of video URLs from the given playlist using yt-dlp.
-    """
-    video_urls = []
-    ydl_opts = {
-        'skip_download': True,
-        'ignoreerrors': True,
-    }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_url, download=False)
-            if info and 'entries' in info:
-                for entry in info['entries']:
-                    if entry and entry.get("webpage_url"):
-                        video_urls.append(entry["webpage_url"])
-    except Exception as e:
-        print(f"[Playlist] Error extracting video URLs from {playlist_url}: {e}")
-    return video_urls
-
-def process_playlist_metadata(playlist_url):
+def extract_and_download(ydl, video):
     """
-    Retrieve metadata for a given playlist: its title and list of video URLs.
+    Run yt-dlp on a video URL (reusing its cached info dict when fresh), or on an already extracted
+    info dict (the fixture benchmark builds those).
     """
-    title = get_playlist_title(playlist_url)
-    video_urls = get_playlist_video_urls(playlist_url)
-    return title, video_urls
+    return extract_video(ydl, video, metadata_cache)
 
 def download_video(video_url, output_folder):
     """
     Download a single video (merged into MP4) using yt-dlp.
-    Returns the filename of the downloaded video (or None on failure).
+    Returns the filename of the downloaded video; raises on a failed download.
     """
     outtmpl = os.path.join(output_folder, "%(title)s [%(id)s].%(ext)s")
     ydl_opts = {
         'format': 'best',  # downloads the best merged format
         'outtmpl': outtmpl,
-        'ignoreerrors': True,
+        'ignoreerrors': False,  # errors must reach DownloadController so it can retry or report them
         'merge_output_format': 'mp4',
         'keepvideo': True,  # we need the merged MP4 for conversion
     }
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
+            info = extract_and_download(ydl, video_url)
             if info is None:
                 print(f"[Download] No info for video: {video_url}")
                 return None
@@ -95,29 +68,36 @@ def download_video(video_url, output_folder):
             return video_file
     except Exception as e:
         print(f"[Download] Error downloading video {video_url}: {e}")
-        return None
+        raise
 
-def download_task(video_url, folder, download_queue):
+def download_task(video_url, folder, download_queue, controller):
     """
-    Download a single video and, if successful, immediately put its filename into the download_queue.
+    Download a single video through the DownloadController (adaptive concurrency, retries) and, if
+    successful, immediately put its filename into the download_queue.
+    With AUDIO_ONLY the downloaded audio is already final, so nothing is queued for conversion.
     """
-    video_file = download_video(video_url, folder)
+    if AUDIO_ONLY:
+        controller.run(download_audio, video_url, folder, metadata_cache)
+        return
+    video_file = controller.run(download_video, video_url, folder)
     if video_file:
         download_queue.put(video_file)
 
-def convert_to_mp3(video_file):
+def convert_to_mp3(video_file, threads=None):
     """
     Convert a downloaded merged video (MP4) to MP3 using FFmpeg.
+    threads caps ffmpeg's decoder and encoder threads (the conversion scheduler passes its per-job budget).
     On success, delete the original video file.
     Returns the path to the MP3 file.
     """
     base, _ = os.path.splitext(video_file)
     mp3_file = base + ".mp3"
+    limit = ["-threads", str(threads)] if threads else []
     print(f"[Conversion] Converting {video_file} to MP3...")
     try:
         subprocess.run([
-            "ffmpeg", "-y", "-i", video_file,
-            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k",
+            "ffmpeg", "-y", *limit, "-i", video_file,
+            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k", *limit,
             mp3_file
         ], check=True)
         print(f"[Conversion] Conversion complete: {mp3_file}")
@@ -127,20 +107,100 @@ def convert_to_mp3(video_file):
         print(f"[Conversion] Error converting {video_file}: {e}")
     return mp3_file
 
-def conversion_worker(download_queue):
+def run_fixture_benchmark(seconds):
     """
-    Continuously pull a downloaded video filename from download_queue and convert it to MP3.
-    When a sentinel value (None) is encountered, exit.
+    Serve a synthetic muxed MP4 and two audio-only renditions from a local HTTP server and download
+    the same "video" both ways: best muxed format + MP3 re-encode, and audio-only + stream copy.
+    Reports bytes downloaded and CPU-seconds (this process plus ffmpeg) for each.
     """
-    while True:
-        video_file = download_queue.get()
-        if video_file is None:
-            download_queue.task_done()
-            break
-        convert_to_mp3(video_file)
-        download_queue.task_done()
+    import http.server
+    import resource
+    import shutil
+    import tempfile
+    from functools import partial
+
+    work_dir = tempfile.mkdtemp(prefix="yt_fixture_")
+    media_dir = os.path.join(work_dir, "media")
+    os.makedirs(media_dir)
+    print(f"[Benchmark] Building {seconds:.0f}s fixture media in {work_dir}...")
+    tone = ["-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=44100:duration={seconds}"]
+    subprocess.run(["ffmpeg", "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc=size=1280x720:rate=30:duration={seconds}",
+                    *tone, "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k", "-ac", "2",
+                    "-shortest", os.path.join(media_dir, "muxed.mp4")], check=True)
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *tone, "-c:a", "aac", "-b:a", "128k",
+                    os.path.join(media_dir, "audio_128k.m4a")], check=True)
+    subprocess.run(["ffmpeg", "-y", "-v", "error", *tone, "-c:a", "libopus", "-b:a", "50k",
+                    os.path.join(media_dir, "audio_50k.webm")], check=True)
+    formats = [
+        # (format_id, file, ext, vcodec, acodec, abr) shaped like YouTube's 18 / 140 / 249
+        ("18", "muxed.mp4", "mp4", "avc1.42001E", "mp4a.40.2", 128),
+        ("140", "audio_128k.m4a", "m4a", "none", "mp4a.40.2", 128),
+        ("249", "audio_50k.webm", "webm", "none", "opus", 50),
+    ]
+
+    class CountingHandler(http.server.SimpleHTTPRequestHandler):
+        bytes_sent = 0
+
+        def copyfile(self, source, outputfile):
+            while True:
+                chunk = source.read(1 << 16)
+                if not chunk:
+                    break
+                outputfile.write(chunk)
+                CountingHandler.bytes_sent += len(chunk)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=media_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def fixture_info():
+        return {
+            "id": "fixture0001", "title": "Fixture video", "webpage_url": base_url,
+            "extractor": "generic", "extractor_key": "Generic",
+            "formats": [
+                {"format_id": format_id, "url": base_url + name, "ext": ext, "vcodec": vcodec,
+                 "acodec": acodec, "abr": abr, "filesize": os.path.getsize(os.path.join(media_dir, name))}
+                for format_id, name, ext, vcodec, acodec, abr in formats
+            ],
+        }
+
+    def measure(label, run):
+        folder = os.path.join(work_dir, label)
+        os.makedirs(folder)
+        CountingHandler.bytes_sent = 0
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        output = run(folder)
+        wall = time.perf_counter() - wall_start
+        children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = (time.process_time() - cpu_start
+               + children_after.ru_utime - children.ru_utime + children_after.ru_stime - children.ru_stime)
+        print(f"[Benchmark] {label:10s}: {CountingHandler.bytes_sent / 1e6:7.2f} MB downloaded, {cpu:6.2f} CPU-s, "
+              f"{wall:6.2f}s wall -> {os.path.basename(output)} ({os.path.getsize(output) / 1e6:.2f} MB)")
+        return CountingHandler.bytes_sent, cpu
+
+    try:
+        old_bytes, old_cpu = measure("video+mp3", lambda folder: convert_to_mp3(download_video(fixture_info(), folder)))
+        new_bytes, new_cpu = measure("audio-only", lambda folder: download_audio(fixture_info(), folder))
+        print(f"[Benchmark] Saved per video: {(old_bytes - new_bytes) / 1e6:.2f} MB "
+              f"({100 * (1 - new_bytes / old_bytes):.0f}% fewer bytes), {old_cpu - new_cpu:.2f} CPU-s.")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 def main():
+    parser = argparse.ArgumentParser(description="Download YouTube playlists as audio files (prompts for the playlist URLs).")
+    parser.add_argument("--benchmark", type=float, metavar="SECONDS",
+                        help="Instead of downloading, compare the video+MP3 path with the audio-only path on a "
+                             "local HTTP fixture of this many seconds and report bytes and CPU-seconds per video.")
+    args = parser.parse_args()
+    if args.benchmark:
+        run_fixture_benchmark(args.benchmark)
+        return
+
     # Collect playlist URLs one by one.
     playlist_urls = []
     while True:
@@ -160,7 +220,7 @@ def main():
     playlist_info_list = []  # Each entry: (playlist_url, title, video_urls)
     with concurrent.futures.ThreadPoolExecutor(max_workers=METADATA_CONCURRENCY) as executor:
         future_to_url = {
-            executor.submit(process_playlist_metadata, p_url): p_url
+            executor.submit(process_playlist_metadata, p_url, metadata_cache): p_url
             for p_url in playlist_urls
         }
         for future in concurrent.futures.as_completed(future_to_url):
@@ -172,8 +232,6 @@ def main():
                 print(f"[Metadata] Retrieval for {p_url} generated an exception: {exc}")
 
     # --- Setup Download Tasks ---
-    # Create a global queue for conversion tasks.
-    downloaded_queue = queue.Queue()
     tasks = []  # List of (video_url, target_folder) tasks.
     playlist_folders = []
     for p_url, title, video_urls in playlist_info_list:
@@ -189,29 +247,24 @@ def main():
         for video_url in video_urls:
             tasks.append((video_url, playlist_folder))
 
-    # --- Start Conversion Workers BEFORE Download Tasks ---
-    conversion_threads = []
-    for _ in range(CONVERSION_CONCURRENCY):
-        t = threading.Thread(target=conversion_worker, args=(downloaded_queue,))
-        t.start()
-        conversion_threads.append(t)
+    # --- Start the Conversion Scheduler BEFORE Download Tasks ---
+    # Downloads go straight into its job queue.
+    scheduler = ConversionScheduler(convert_to_mp3, max_jobs=CONVERSION_CONCURRENCY)
 
     # --- Download Group: Run download tasks concurrently ---
-    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY) as download_executor:
+    # The pool has a thread per possible slot; the controller decides how many of them download at once.
+    controller = DownloadController(initial=DOWNLOAD_CONCURRENCY, max_concurrency=DOWNLOAD_CONCURRENCY_MAX)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_concurrency) as download_executor:
         futures = [
-            download_executor.submit(download_task, video_url, folder, downloaded_queue)
+            download_executor.submit(download_task, video_url, folder, scheduler.jobs, controller)
             for video_url, folder in tasks
         ]
         for future in concurrent.futures.as_completed(futures):
             future.result()
 
-    # All download tasks are submitted and will continue adding items to the queue.
-    # Signal conversion workers that no more files will be added.
-    for _ in range(CONVERSION_CONCURRENCY):
-        downloaded_queue.put(None)
-    downloaded_queue.join()
-    for t in conversion_threads:
-        t.join()
+    # All downloads are done; wait for the queued conversions and print the scheduler's metrics.
+    scheduler.close()
+    controller.write_failure_report(download_folder)
 
     print("Finish: All download and conversion tasks are complete.")
     # (Later, you can proceed to processing MP3 files with Whisper.)
@@ -2,17 +2,27 @@
 
 import os
 import sys
-import threading
-import queue
 import time
 import yt_dlp
 import subprocess
 import concurrent.futures
+from downloadController import DownloadController
+from playlistMetadata import MetadataCache, process_playlist_metadata, extract_video
+from conversionScheduler import ConversionScheduler
 import re
 
 # Concurrency limits
+# Downloads start at DOWNLOAD_CONCURRENCY; DownloadController raises that up to DOWNLOAD_CONCURRENCY_MAX
+# while throughput holds up and cuts it on HTTP 429s or slow-downs.
 DOWNLOAD_CONCURRENCY = 10
-CONVERSION_CONCURRENCY = 3
+DOWNLOAD_CONCURRENCY_MAX = 32
+# None sizes the conversion pool from os.cpu_count() // FFMPEG_THREADS_PER_JOB; ConversionScheduler
+# then lowers or raises it at runtime from the load average (and the downstream queue).
+CONVERSION_CONCURRENCY = None
+
+# Playlist and video metadata cached on disk (see playlistMetadata.METADATA_CACHE_DIR): re-runs skip the
+# playlist extraction, and downloads reuse a video's info dict while it is fresh.
+metadata_cache = MetadataCache()
 
 def canonical_input(prompt):
     """
@@ -22,66 +32,22 @@ def canonical_input(prompt):
     os.system("stty sane")
     return input(prompt)
 
-def get_playlist_title(playlist_url):
-    """
-    Retrieve the playlist title using yt-dlp.
-    Uses --skip-download, --no-warnings, and --print playlist_title.
-    Returns a sanitized title string safe for a folder name.
-    """
-    try:
-        cmd = [
-            "yt-dlp",
-            playlist_url,
-            "-I", "1:1",
-            "--skip-download",
-            "--no-warnings",
-            "--print", "playlist_title"
-        ]
-        output = subprocess.check_output(cmd, universal_newlines=True)
-        title = output.strip()
-        # Sanitize: allow alphanumerics, spaces, underscore, dash.
-        safe_title = "".join(c if c.isalnum() or c in " _-" else "_" for c in title)
-        return safe_title if safe_title else "playlist_unknown"
-    except Exception as e:
-        print(f"[Title] Error retrieving playlist title for {playlist_url}: {e}")
-        return "playlist_unknown"
-
-def get_playlist_video_urls(playlist_url):
-    """
-    Extract a list of video URLs from the given playlist URL using yt-dlp.
-    """
-    video_urls = []
-    ydl_opts = {
-        'skip_download': True,
-        'ignoreerrors': True,
-    }
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(playlist_url, download=False)
-            if info and 'entries' in info:
-                for entry in info['entries']:
-                    if entry and entry.get("webpage_url"):
-                        video_urls.append(entry["webpage_url"])
-    except Exception as e:
-        print(f"[Playlist] Error extracting video URLs from {playlist_url}: {e}")
-    return video_urls
-
 def download_video(video_url, output_folder):
     """
     Download a single video (merged into MP4) using yt-dlp.
-    Returns the filename of the downloaded video (or None on failure).
+    Returns the filename of the downloaded video; raises on a failed download.
     """
     outtmpl = os.path.join(output_folder, "%(title)s [%(id)s].%(ext)s")
     ydl_opts = {
         'format': 'best',  # downloads the best merged format
         'outtmpl': outtmpl,
-        'ignoreerrors': True,
+        'ignoreerrors': False,  # errors must reach DownloadController so it can retry or report them
         'merge_output_format': 'mp4',
         'keepvideo': True,  # we need the merged MP4 for conversion
     }
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
+            info = extract_video(ydl, video_url, metadata_cache)
             if info is None:
                 print(f"[Download] No info for video: {video_url}")
                 return None
@@ -90,21 +56,23 @@ def download_video(video_url, output_folder):
             return video_file
     except Exception as e:
         print(f"[Download] Error downloading video {video_url}: {e}")
-        return None
+        raise
 
-def convert_to_mp3(video_file):
+def convert_to_mp3(video_file, threads=None):
     """
     Convert a downloaded merged video (MP4) to MP3 using FFmpeg.
+    threads caps ffmpeg's decoder and encoder threads (the conversion scheduler passes its per-job budget).
     On success, delete the original video file.
     Returns the path to the MP3 file.
     """
     base, _ = os.path.splitext(video_file)
     mp3_file = base + ".mp3"
+    limit = ["-threads", str(threads)] if threads else []
     print(f"[Conversion] Converting {video_file} to MP3...")
     try:
         subprocess.run([
-            "ffmpeg", "-y", "-i", video_file,
-            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k",
+            "ffmpeg", "-y", *limit, "-i", video_file,
+            "-vn", "-ar", "44100", "-ac", "2", "-b:a", "192k", *limit,
             mp3_file
         ], check=True)
         print(f"[Conversion] Conversion complete: {mp3_file}")
@@ -114,20 +82,6 @@ def convert_to_mp3(video_file):
         print(f"[Conversion] Error converting {video_file}: {e}")
     return mp3_file
 
-def conversion_worker(download_queue):
-    """
-    Worker function that continuously takes a downloaded video filename
-    from download_queue, converts it to MP3, and then moves on.
-    When a sentinel (None) is encountered, the worker exits.
-    """
-    while True:
-        video_file = download_queue.get()
-        if video_file is None:
-            download_queue.task_done()
-            break
-        convert_to_mp3(video_file)
-        download_queue.task_done()
-
 def main():
     # Collect playlist URLs one by one.
     playlist_urls = []
@@ -149,7 +103,8 @@ def main():
     # Build a global list of download tasks: each is (video_url, target_folder)
     tasks = []
     for p_url in playlist_urls:
-        title = get_playlist_title(p_url)
+        # One flat extraction gives both the title and the video URLs.
+        title, video_urls = process_playlist_metadata(p_url, metadata_cache)
         playlist_folder = os.path.join(download_folder, title)
         # If folder already exists, append a counter.
         base_folder = playlist_folder
@@ -159,42 +114,31 @@ def main():
             counter += 1
         os.makedirs(playlist_folder, exist_ok=True)
         playlist_folders.append(playlist_folder)
-        video_urls = get_playlist_video_urls(p_url)
         print(f"[Playlist] Found {len(video_urls)} videos in playlist '{title}'.")
         for video_url in video_urls:
             tasks.append((video_url, playlist_folder))
 
-    # Create a queue for conversion tasks.
-    downloaded_queue = queue.Queue()
-
     # Start the download tasks in a ThreadPoolExecutor.
     download_results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=DOWNLOAD_CONCURRENCY) as download_executor:
+    controller = DownloadController(initial=DOWNLOAD_CONCURRENCY, max_concurrency=DOWNLOAD_CONCURRENCY_MAX)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_concurrency) as download_executor:
         futures = {
-            download_executor.submit(download_video, video_url, folder): (video_url, folder)
+            download_executor.submit(controller.run, download_video, video_url, folder): (video_url, folder)
             for video_url, folder in tasks
         }
         for future in concurrent.futures.as_completed(futures):
             result = future.result()
             if result:
-                # As soon as a download finishes, add its filename to the conversion queue.
-                downloaded_queue.put(result)
-
-    # Start conversion worker threads.
-    conversion_threads = []
-    for _ in range(CONVERSION_CONCURRENCY):
-        t = threading.Thread(target=conversion_worker, args=(downloaded_queue,))
-        t.start()
-        conversion_threads.append(t)
+                download_results.append(result)
+    controller.write_failure_report(download_folder)
 
-    # Signal conversion workers that no more downloads will be added.
-    for _ in range(CONVERSION_CONCURRENCY):
-        downloaded_queue.put(None)
+    # Convert everything that was downloaded, as many at once as the machine allows.
+    scheduler = ConversionScheduler(convert_to_mp3, max_jobs=CONVERSION_CONCURRENCY)
+    for video_file in download_results:
+        scheduler.submit(video_file)
 
     # Wait for all conversion tasks to finish.
-    downloaded_queue.join()
-    for t in conversion_threads:
-        t.join()
+    scheduler.close()
 
     print("Finish: All download and conversion tasks are complete.")
     # (Later, after this point you could start running Whisper on the MP3 files one by one.)